@@ -75,6 +75,11 @@ class CarlaLinkServiceStub(object):
                 request_serializer=CarlaLink__pb2.Sensor.SerializeToString,
                 response_deserializer=CarlaLink__pb2.Empty.FromString,
                 )
+        self.SetSensorActive = channel.unary_unary(
+                '/org.eclipse.mosaic.fed.carla.grpc.CarlaLinkService/SetSensorActive',
+                request_serializer=CarlaLink__pb2.Sensor.SerializeToString,
+                response_deserializer=CarlaLink__pb2.Empty.FromString,
+                )
 
 
 class CarlaLinkServiceServicer(object):
@@ -153,6 +158,13 @@ class CarlaLinkServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SetSensorActive(self, request, context):
+        """Pauses (attributes['active'] == 'false') or resumes the sensor with the given id.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_CarlaLinkServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -216,6 +228,11 @@ def add_CarlaLinkServiceServicer_to_server(servicer, server):
                     request_deserializer=CarlaLink__pb2.Sensor.FromString,
                     response_serializer=CarlaLink__pb2.Empty.SerializeToString,
             ),
+            'SetSensorActive': grpc.unary_unary_rpc_method_handler(
+                    servicer.SetSensorActive,
+                    request_deserializer=CarlaLink__pb2.Sensor.FromString,
+                    response_serializer=CarlaLink__pb2.Empty.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'org.eclipse.mosaic.fed.carla.grpc.CarlaLinkService', rpc_method_handlers)
@@ -430,3 +447,20 @@ class CarlaLinkService(object):
             CarlaLink__pb2.Empty.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def SetSensorActive(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/org.eclipse.mosaic.fed.carla.grpc.CarlaLinkService/SetSensorActive',
+            CarlaLink__pb2.Sensor.SerializeToString,
+            CarlaLink__pb2.Empty.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -0,0 +1,683 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Synthetic mosaic load generator. It drives a running bridge (run_synchronization.py) through the
+CarlaLink grpc service as mosaic does (vehicles, traffic lights, sensors and simulation steps) and
+reports the achieved throughput, the step latencies and the exchanged bytes.
+
+The bridge can run against the carla stand-in (CARLA_MOCK=1) to benchmark without a simulator:
+
+    CARLA_MOCK=1 python run_synchronization.py example/Town01.sumocfg &
+    python benchmark/load_generator.py --vehicles 500 --churn 5 --steps 1000
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+
+import grpc
+import lxml.etree as ET  # pylint: disable=import-error
+import numpy as np
+
+# Makes the CarlaLink modules available when running this script from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import CarlaLink_pb2  # pylint: disable=wrong-import-position
+import CarlaLink_pb2_grpc  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- constants -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+# Traffic light cycle, as mosaic signal states (see MosaicSignalState): (state, seconds).
+TRAFFIC_LIGHT_CYCLE = (('G', 10.0), ('y', 3.0), ('r', 13.0))
+
+# Mosaic vehicle signals (see MosaicVehSignal).
+SIGNAL_BLINKER_RIGHT = 1 << 0
+SIGNAL_BLINKER_LEFT = 1 << 1
+SIGNAL_BRAKELIGHT = 1 << 3
+SIGNAL_FRONTLIGHT = 1 << 4
+
+SIGNAL_PERIOD = 2.0  # seconds
+
+# ==================================================================================================
+# -- trajectories ----------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class Trajectory(object):
+    """
+    Polyline followed at constant speed.
+    """
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=np.float64)
+        segments = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+        self.distances = np.concatenate(([0.0], np.cumsum(segments)))
+
+    @property
+    def length(self):
+        return self.distances[-1]
+
+    def get_pose(self, distance):
+        """
+        Returns the (x, y) location and the mosaic heading (degrees, clockwise from north) at the
+        given distance from the start.
+        """
+        index = int(np.searchsorted(self.distances, distance, side='right')) - 1
+        index = min(max(index, 0), len(self.points) - 2)
+
+        start, end = self.points[index], self.points[index + 1]
+        length = self.distances[index + 1] - self.distances[index]
+        alpha = (distance - self.distances[index]) / length if length > 0 else 0.0
+        alpha = min(max(alpha, 0.0), 1.0)
+
+        x, y = start + alpha * (end - start)
+        heading = (90.0 - math.degrees(math.atan2(end[1] - start[1], end[0] - start[0]))) % 360.0
+        return x, y, heading
+
+
+def read_lane_shapes(net_file):
+    """
+    Returns the shape of the first lane of each (non internal) edge of the given net.
+
+        :return: {edge_id: (N, 2) array}
+    """
+    shapes = {}
+    for _, edge in ET.iterparse(net_file, tag='edge'):
+        if edge.get('function') != 'internal':
+            lane = edge.find('lane')
+            if lane is not None:
+                shapes[edge.get('id')] = np.array(
+                    [[float(value) for value in point.split(',')[:2]]
+                     for point in lane.get('shape').split()])
+        edge.clear()
+    return shapes
+
+
+def read_routes(route_file):
+    """
+    Returns the vehicle type and the list of edges of each vehicle of the given route file.
+    """
+    routes = []
+    for _, vehicle in ET.iterparse(route_file, tag='vehicle'):
+        route = vehicle.find('route')
+        if route is not None:
+            routes.append((vehicle.get('type'), route.get('edges').split()))
+        vehicle.clear()
+    return routes
+
+
+class RouteTrajectoryModel(object):
+    """
+    Trajectories along the net edges of the routes of a mosaic route file.
+    """
+    def __init__(self, net_file, route_file, rng):
+        self.rng = rng
+
+        shapes = read_lane_shapes(net_file)
+        self.routes = []
+        for type_id, edges in read_routes(route_file):
+            points = [point for edge in edges if edge in shapes for point in shapes[edge]]
+            if len(points) >= 2:
+                trajectory = Trajectory(points)
+                if trajectory.length > 0:
+                    self.routes.append((type_id, trajectory))
+
+        if not self.routes:
+            raise RuntimeError('no route of {} matches the edges of {}'.format(route_file, net_file))
+
+    def create(self):
+        """
+        Returns the vehicle type and the trajectory of a new vehicle.
+        """
+        return self.rng.choice(self.routes)
+
+
+class CircleTrajectoryModel(object):
+    """
+    Synthetic trajectories along concentric circles (no net needed).
+    """
+    def __init__(self, center, radius, lanes, type_ids, rng):
+        self.rng = rng
+        self.type_ids = type_ids
+
+        angles = np.linspace(0.0, 2.0 * math.pi, 73)
+        self.trajectories = []
+        for lane in range(lanes):
+            r = radius + 4.0 * lane
+            self.trajectories.append(
+                Trajectory(np.stack([center[0] + r * np.cos(angles), center[1] + r * np.sin(angles)],
+                                    axis=1)))
+
+    def create(self):
+        return self.rng.choice(self.type_ids), self.rng.choice(self.trajectories)
+
+
+def read_vclasses(vtypes_file):
+    """
+    Returns the mosaic vehicle class of each carla blueprint.
+    """
+    with open(vtypes_file, encoding='utf-8') as f:
+        specs = json.load(f)
+    return {type_id: spec['vClass'] for type_id, spec in specs['carla_blueprints'].items()}
+
+
+# ==================================================================================================
+# -- load generator --------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class _Vehicle(object):
+    def __init__(self, vehicle_id, type_id, vclass, trajectory, distance, speed, carrier=False):
+        self.id = vehicle_id
+        self.type_id = type_id
+        self.vclass = vclass
+        self.trajectory = trajectory
+        self.distance = distance
+        self.speed = speed
+        self.carrier = carrier
+        self.signals = SIGNAL_FRONTLIGHT
+
+
+class LoadGenerator(object):
+    """
+    LoadGenerator plays the mosaic side of the co-simulation against a CarlaLink server.
+
+    Each step, vehicles arrive (end of trajectory or churn) and are replaced by new ones to keep the
+    fleet size, the remaining vehicles move along their trajectories, the traffic lights follow a
+    fixed cycle and a SimulationStep is requested. The first vehicles carry the lidars, which are
+    added once the bridge knows them (second step).
+
+        :param stub: CarlaLinkService stub.
+        :param trajectory_model: provides the type and trajectory of new vehicles.
+        :param vehicles: fleet size.
+        :param churn: vehicles replaced per second (besides the ones finishing their trajectory).
+        :param step_length: simulated seconds per step.
+        :param speed: mean vehicle speed (m/s).
+        :param lidars: number of lidars.
+        :param lidar_attributes: carla attributes of the lidars.
+        :param sensor_type: AddSensor type of the lidars (e.g., LiDAR, Radar or Perception).
+        :param traffic_lights: landmark ids of the traffic lights controlled by mosaic.
+        :param signals: whether the vehicles change their signals (lights synchronization).
+        :param concurrency: maximum number of vehicle/traffic light calls in flight (1 to wait for
+            each call, as mosaic does).
+    """
+    def __init__(self, stub, trajectory_model, vehicles, churn=0.0, step_length=0.05, speed=10.0,
+                 lidars=0, lidar_attributes=None, traffic_lights=(), signals=False, concurrency=1,
+                 vclasses=None, seed=0, sensor_type='LiDAR'):
+        self.stub = stub
+        self.trajectory_model = trajectory_model
+        self.fleet_size = vehicles
+        self.churn = churn
+        self.step_length = step_length
+        self.speed = speed
+        self.lidars = min(lidars, vehicles)
+        self.lidar_attributes = dict(lidar_attributes or {})
+        self.sensor_type = sensor_type
+        self.traffic_lights = list(traffic_lights)
+        self.signals = signals
+        self.concurrency = max(concurrency, 1)
+        self.vclasses = vclasses or {}
+        self.rng = random.Random(seed)
+
+        self.vehicles = {}  # {vehicle_id: _Vehicle}
+        self.sensor_ids = []
+        self._next_id = 0
+        self._churn_credit = 0.0
+        self._traffic_light_states = {}
+        self._pending = []
+
+        self.step_count = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Forgets the measurements so far (e.g., after warm up).
+        """
+        self.step_latencies = []
+        self.simulation_step_latencies = []
+        self.rpcs = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.spawned = 0
+        self.arrived = 0
+        self.sensor_points = 0
+
+    # -- calls -------------------------------------------------------------------------------------
+
+    def _call(self, method, request):
+        self.rpcs += 1
+        self.bytes_sent += request.ByteSize()
+        if self.concurrency == 1:
+            return method(request)
+
+        self._pending.append(method.future(request))
+        if len(self._pending) >= self.concurrency:
+            self._flush()
+        return None
+
+    def _flush(self):
+        for future in self._pending:
+            future.result()
+        del self._pending[:]
+
+    def _get_vehicle_request(self, vehicle):
+        x, y, heading = vehicle.trajectory.get_pose(vehicle.distance)
+        return CarlaLink_pb2.Vehicle(id=vehicle.id,
+                                     type_id=vehicle.type_id,
+                                     vclass=vehicle.vclass,
+                                     location=CarlaLink_pb2.Location(x=x, y=y, z=0.0),
+                                     rotation=CarlaLink_pb2.Rotation(slope=0.0, angle=heading),
+                                     signals=vehicle.signals)
+
+    # -- step --------------------------------------------------------------------------------------
+
+    def _depart(self, carrier=False):
+        type_id, trajectory = self.trajectory_model.create()
+        vehicle_id = 'veh_{}'.format(self._next_id)
+        self._next_id += 1
+
+        # Vehicles start spread along their trajectories, so that the fleet does not bunch up.
+        distance = self.rng.uniform(0.0, 0.5 * trajectory.length)
+        speed = self.speed * self.rng.uniform(0.8, 1.2)
+        vehicle = _Vehicle(vehicle_id, type_id, self.vclasses.get(type_id, 'passenger'), trajectory,
+                           distance, speed, carrier)
+        self.vehicles[vehicle_id] = vehicle
+
+        self._call(self.stub.AddVehicle, self._get_vehicle_request(vehicle))
+        self.spawned += 1
+
+    def _arrive(self, vehicle):
+        del self.vehicles[vehicle.id]
+        self._call(self.stub.RemoveVehicle, CarlaLink_pb2.Vehicle(id=vehicle.id))
+        self.arrived += 1
+
+    def _update_vehicles(self):
+        time_now = self.step_count * self.step_length
+
+        # Churn: randomly chosen vehicles (but the sensor carriers) leave the simulation.
+        self._churn_credit += self.churn * self.step_length
+        candidates = [vehicle for vehicle in self.vehicles.values() if not vehicle.carrier]
+        while self._churn_credit >= 1.0 and candidates:
+            self._churn_credit -= 1.0
+            self._arrive(candidates.pop(self.rng.randrange(len(candidates))))
+
+        for vehicle in list(self.vehicles.values()):
+            vehicle.distance += vehicle.speed * self.step_length
+            if vehicle.distance >= vehicle.trajectory.length:
+                if not vehicle.carrier:
+                    self._arrive(vehicle)
+                    continue
+                vehicle.distance %= vehicle.trajectory.length
+
+            if self.signals and int(time_now / SIGNAL_PERIOD) != int(
+                    (time_now - self.step_length) / SIGNAL_PERIOD):
+                vehicle.signals = SIGNAL_FRONTLIGHT | self.rng.choice(
+                    (0, SIGNAL_BRAKELIGHT, SIGNAL_BLINKER_LEFT, SIGNAL_BLINKER_RIGHT))
+
+            self._call(self.stub.UpdateVehicle, self._get_vehicle_request(vehicle))
+
+        while len(self.vehicles) < self.fleet_size:
+            self._depart(carrier=sum(v.carrier for v in self.vehicles.values()) < self.lidars)
+
+    def _update_traffic_lights(self):
+        time_now = self.step_count * self.step_length
+        cycle = sum(duration for _, duration in TRAFFIC_LIGHT_CYCLE)
+
+        for i, landmark_id in enumerate(self.traffic_lights):
+            # Each traffic light starts at a different point of the cycle.
+            t = (time_now + i * cycle / max(len(self.traffic_lights), 1)) % cycle
+            for state, duration in TRAFFIC_LIGHT_CYCLE:
+                if t < duration:
+                    break
+                t -= duration
+
+            if self._traffic_light_states.get(landmark_id) != state:
+                self._traffic_light_states[landmark_id] = state
+                self._call(self.stub.UpdateTrafficLight,
+                           CarlaLink_pb2.TrafficLight(landmark_id=landmark_id, state=state))
+
+    def _add_sensors(self):
+        carriers = [vehicle for vehicle in self.vehicles.values() if vehicle.carrier]
+        for vehicle in carriers[len(self.sensor_ids):]:
+            request = CarlaLink_pb2.Sensor(id='lidar_{}'.format(len(self.sensor_ids)),
+                                           type_id=self.sensor_type,
+                                           location=CarlaLink_pb2.Location(x=0.0, y=0.0, z=2.4),
+                                           rotation=CarlaLink_pb2.Rotation(slope=0.0, angle=0.0),
+                                           attached=vehicle.id,
+                                           attributes=self.lidar_attributes)
+            self.rpcs += 1
+            self.bytes_sent += request.ByteSize()
+            response = self.stub.AddSensor(request)
+            self.bytes_received += response.ByteSize() if response is not None else 0
+            self.sensor_ids.append(request.id)
+
+    def step(self):
+        """
+        Runs one co-simulation step.
+
+            :return: StepResult of the bridge.
+        """
+        start = time.perf_counter()
+
+        self._update_vehicles()
+        self._update_traffic_lights()
+        self._flush()
+
+        # Sensors are attached once the bridge has seen their carriers.
+        if self.step_count > 0 and len(self.sensor_ids) < self.lidars:
+            self._add_sensors()
+
+        step_start = time.perf_counter()
+        request = CarlaLink_pb2.Step()
+        self.rpcs += 1
+        self.bytes_sent += request.ByteSize()
+        result = self.stub.SimulationStep(request)
+        end = time.perf_counter()
+
+        self.bytes_received += result.ByteSize()
+        self.sensor_points += sum(len(data.lidar_points) for data in result.sensor_data)
+        self.step_latencies.append(end - start)
+        self.simulation_step_latencies.append(end - step_start)
+        self.step_count += 1
+        return result
+
+    def run(self, steps, step_rate=0.0):
+        """
+        Runs the given number of steps, at most step_rate steps per second (0, as fast as possible).
+
+            :return: number of steps that missed their deadline.
+        """
+        late = 0
+        start = time.perf_counter()
+        for i in range(steps):
+            self.step()
+
+            if step_rate > 0:
+                # Absolute deadlines, so that late steps do not accumulate drift.
+                remaining = start + (i + 1) / step_rate - time.perf_counter()
+                if remaining > 0:
+                    time.sleep(remaining)
+                else:
+                    late += 1
+        return late
+
+    def close(self):
+        """
+        Removes all the vehicles from the bridge.
+        """
+        try:
+            for sensor_id in self.sensor_ids:
+                self.stub.RemoveSensor(CarlaLink_pb2.Sensor(id=sensor_id))
+            for vehicle in list(self.vehicles.values()):
+                self._arrive(vehicle)
+            self._flush()
+            self.stub.SimulationStep(CarlaLink_pb2.Step())
+        except grpc.RpcError as error:
+            logging.warning('Could not clean up the bridge: %s', error.code())
+
+    # -- report ------------------------------------------------------------------------------------
+
+    def report(self, elapsed):
+        """
+        Returns the measurements since the last reset as a json serializable dict.
+        """
+        steps = len(self.step_latencies)
+
+        def percentiles(values):
+            if not values:
+                return {}
+            values = 1000.0 * np.asarray(values)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {'p50': p50, 'p95': p95, 'p99': p99, 'max': values.max(), 'mean': values.mean()}
+
+        return {
+            'steps': steps,
+            'vehicles': self.fleet_size,
+            'lidars': self.lidars,
+            'traffic_lights': len(self.traffic_lights),
+            'elapsed': elapsed,
+            'steps_per_second': steps / elapsed if elapsed > 0 else 0.0,
+            'real_time_factor': steps * self.step_length / elapsed if elapsed > 0 else 0.0,
+            'step_latency_ms': percentiles(self.step_latencies),
+            'simulation_step_latency_ms': percentiles(self.simulation_step_latencies),
+            'rpcs_per_step': self.rpcs / steps if steps else 0.0,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'bytes_sent_per_step': self.bytes_sent / steps if steps else 0.0,
+            'bytes_received_per_step': self.bytes_received / steps if steps else 0.0,
+            'sensor_points_per_step': self.sensor_points / steps if steps else 0.0,
+            'spawned': self.spawned,
+            'arrived': self.arrived,
+        }
+
+
+def format_report(report):
+    """
+    Returns a human readable summary of the given report.
+    """
+    lines = [
+        '{steps} steps, {vehicles} vehicles, {lidars} lidars, {traffic_lights} traffic lights in '
+        '{elapsed:.2f} s'.format(**report),
+        '  throughput      {:>10.1f} steps/s ({:.2f}x real time)'.format(
+            report['steps_per_second'], report['real_time_factor'])
+    ]
+    for name, key in (('step', 'step_latency_ms'), ('SimulationStep', 'simulation_step_latency_ms')):
+        latencies = report[key]
+        if latencies:
+            lines.append('  {:<15} {:>10.3f} / {:.3f} / {:.3f} / {:.3f} ms (p50 / p95 / p99 / max)'
+                         .format(name, latencies['p50'], latencies['p95'], latencies['p99'],
+                                 latencies['max']))
+    lines.append('  rpcs            {:>10.1f} per step'.format(report['rpcs_per_step']))
+    lines.append('  sent            {:>10.1f} kB per step ({:.1f} MB total)'.format(
+        report['bytes_sent_per_step'] / 1024.0, report['bytes_sent'] / 1024.0 / 1024.0))
+    lines.append('  received        {:>10.1f} kB per step ({:.1f} MB total)'.format(
+        report['bytes_received_per_step'] / 1024.0, report['bytes_received'] / 1024.0 / 1024.0))
+    lines.append('  sensor points   {:>10.1f} per step'.format(report['sensor_points_per_step']))
+    lines.append('  vehicles        {:>10} spawned, {} arrived'.format(report['spawned'],
+                                                                      report['arrived']))
+    return '\n'.join(lines)
+
+
+def create_trajectory_model(args, rng):
+    """
+    Returns the trajectory model selected by the given arguments.
+    """
+    if args.trajectories == 'routes':
+        return RouteTrajectoryModel(args.net_file, args.route_file, rng)
+
+    type_ids = sorted(read_vclasses(os.path.join(BASE_DIR, 'data', 'vtypes.json')))
+    return CircleTrajectoryModel((args.circle_radius, args.circle_radius), args.circle_radius,
+                                 args.circle_lanes, type_ids, rng)
+
+
+def main(args):
+    """
+    Main method.
+    """
+    rng = random.Random(args.seed)
+    trajectory_model = create_trajectory_model(args, rng)
+
+    lidar_attributes = {
+        'range': str(args.lidar_range),
+        'points_per_second': str(args.lidar_points_per_second),
+    }
+    traffic_lights = [str(args.traffic_light_first_id + i) for i in range(args.traffic_lights)]
+
+    channel = grpc.insecure_channel('{}:{}'.format(args.host, args.port),
+                                    options=[('grpc.max_receive_message_length', -1)])
+    grpc.channel_ready_future(channel).result(timeout=args.timeout)
+    stub = CarlaLink_pb2_grpc.CarlaLinkServiceStub(channel)
+
+    generator = LoadGenerator(stub, trajectory_model, args.vehicles, args.churn, args.step_length,
+                              args.speed, args.lidars, lidar_attributes, traffic_lights,
+                              args.signals, args.concurrency,
+                              read_vclasses(os.path.join(BASE_DIR, 'data', 'vtypes.json')), args.seed,
+                              args.sensor_type)
+    try:
+        generator.run(args.warmup, args.step_rate)
+        generator.reset_stats()
+
+        start = time.perf_counter()
+        late = generator.run(args.steps, args.step_rate)
+        report = generator.report(time.perf_counter() - start)
+        report['late_steps'] = late
+    finally:
+        generator.close()
+        channel.close()
+
+    print(format_report(report))
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    return report
+
+
+def add_arguments(argparser):
+    """
+    Adds the load generator arguments to the given parser (shared with the scaling benchmark).
+    """
+    argparser.add_argument('--vehicles',
+                           '-n',
+                           metavar='N',
+                           default=100,
+                           type=int,
+                           help='number of mosaic vehicles (default: 100)')
+    argparser.add_argument('--churn',
+                           metavar='R',
+                           default=0.0,
+                           type=float,
+                           help='vehicles replaced per second, besides the ones finishing their '
+                           'trajectory (default: 0)')
+    argparser.add_argument('--trajectories',
+                           type=str,
+                           choices=['routes', 'circle'],
+                           default='routes',
+                           help='trajectory model: mosaic routes along the net edges or synthetic '
+                           'concentric circles (default: routes)')
+    argparser.add_argument('--net-file',
+                           default=os.path.join(BASE_DIR, 'example', 'net', 'Town01.net.xml'),
+                           help='net of the routes (default: example/net/Town01.net.xml)')
+    argparser.add_argument('--route-file',
+                           default=os.path.join(BASE_DIR, 'example', 'rou', 'Town01.rou.xml'),
+                           help='mosaic routes (default: example/rou/Town01.rou.xml)')
+    argparser.add_argument('--circle-radius',
+                           metavar='R',
+                           default=150.0,
+                           type=float,
+                           help='radius of the innermost circle, in meters (default: 150.0)')
+    argparser.add_argument('--circle-lanes',
+                           metavar='N',
+                           default=4,
+                           type=int,
+                           help='number of concentric circles (default: 4)')
+    argparser.add_argument('--speed',
+                           metavar='V',
+                           default=10.0,
+                           type=float,
+                           help='mean vehicle speed, in m/s (default: 10.0)')
+    argparser.add_argument('--signals',
+                           action='store_true',
+                           help='change the vehicle signals periodically (default: False)')
+    argparser.add_argument('--lidars',
+                           metavar='N',
+                           default=0,
+                           type=int,
+                           help='number of lidars, carried by the first vehicles (default: 0)')
+    argparser.add_argument('--lidar-range',
+                           metavar='R',
+                           default=50.0,
+                           type=float,
+                           help='lidar range, in meters (default: 50.0)')
+    argparser.add_argument('--lidar-points-per-second',
+                           metavar='P',
+                           default=56000,
+                           type=int,
+                           help='lidar points per second (default: 56000)')
+    argparser.add_argument('--sensor-type',
+                           choices=['LiDAR', 'SemanticLiDAR', 'Radar', 'Perception'],
+                           default='LiDAR',
+                           help='sensor type of the lidars (default: LiDAR)')
+    argparser.add_argument('--traffic-lights',
+                           metavar='N',
+                           default=0,
+                           type=int,
+                           help='number of traffic lights controlled by mosaic (default: 0)')
+    argparser.add_argument('--traffic-light-first-id',
+                           metavar='ID',
+                           default=1000,
+                           type=int,
+                           help='landmark id of the first traffic light, the rest are consecutive '
+                           '(default: 1000, as in the carla stand-in)')
+    argparser.add_argument('--step-length',
+                           default=0.05,
+                           type=float,
+                           help='simulated seconds per step (default: 0.05s)')
+    argparser.add_argument('--concurrency',
+                           metavar='K',
+                           default=1,
+                           type=int,
+                           help='vehicle and traffic light calls in flight (default: 1, as mosaic)')
+    argparser.add_argument('--seed', default=0, type=int, help='random seed (default: 0)')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argparser.add_argument('--host',
+                           metavar='H',
+                           default='127.0.0.1',
+                           help='IP of the bridge grpc server (default: 127.0.0.1)')
+    argparser.add_argument('--port',
+                           metavar='P',
+                           default=50051,
+                           type=int,
+                           help='TCP port of the bridge grpc server (default: 50051)')
+    argparser.add_argument('--timeout',
+                           metavar='S',
+                           default=30.0,
+                           type=float,
+                           help='seconds to wait for the bridge (default: 30.0)')
+    add_arguments(argparser)
+    argparser.add_argument('--steps',
+                           metavar='N',
+                           default=500,
+                           type=int,
+                           help='number of measured steps (default: 500)')
+    argparser.add_argument('--warmup',
+                           metavar='N',
+                           default=10,
+                           type=int,
+                           help='number of steps before measuring (default: 10)')
+    argparser.add_argument('--step-rate',
+                           metavar='HZ',
+                           default=0.0,
+                           type=float,
+                           help='steps per second (default: 0, as fast as possible)')
+    argparser.add_argument('--output',
+                           '-o',
+                           metavar='FILE',
+                           default=None,
+                           help='write the report to the given json file')
+    arguments = argparser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+    main(arguments)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Micro-benchmarks of the per vehicle and per sensor frame functions of the bridge (BridgeHelper
+conversions and lidar processing). The carla value types are provided by the carla stand-in of
+util/carla_mock, so no simulator is needed.
+
+    python benchmark/micro.py run                          # prints the results
+    python benchmark/micro.py run --save                   # stores a baseline
+    python benchmark/micro.py compare                      # fails on regressions above 10%
+
+Timings depend on the machine, so no baseline is versioned: record one locally (by default in
+benchmark/micro_baseline.json, ignored by git) from the reference revision, on the machine and
+python version used to compare.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import collections
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+# The carla stand-in always takes precedence, so that results do not depend on the carla version.
+sys.path.insert(0, os.path.join(BASE_DIR, 'util', 'carla_mock'))
+sys.path.append(BASE_DIR)
+
+# BridgeHelper reads data/vtypes.json relative to the working directory.
+os.chdir(BASE_DIR)
+
+import carla  # pylint: disable=import-error, wrong-import-position
+
+from mosaic_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+from mosaic_integration.mosaic_simulation import MosaicActor, MosaicSimulation  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- constants -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'micro_baseline.json')
+
+# ==================================================================================================
+# -- inputs ----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def _random_transform(rng):
+    return carla.Transform(
+        carla.Location(rng.uniform(0.0, 400.0), rng.uniform(0.0, 400.0), rng.uniform(0.0, 2.0)),
+        carla.Rotation(rng.uniform(-5.0, 5.0), rng.uniform(0.0, 360.0), 0.0))
+
+
+def _random_extent(rng):
+    return carla.Vector3D(rng.uniform(1.0, 3.0), rng.uniform(0.5, 1.2), rng.uniform(0.6, 1.0))
+
+
+class _LidarData(object):
+    """
+    Lidar measurement with the attributes read by MosaicSimulation.process_lidar.
+    """
+    def __init__(self, points, transform, timestamp):
+        self.raw_data = points.astype(np.float32).tobytes()
+        self.transform = transform
+        self.timestamp = timestamp
+        self._count = len(points)
+
+    def __len__(self):
+        return self._count
+
+
+def _random_lidar_data(rng, count, max_range=50.0):
+    np_rng = np.random.default_rng(rng.randrange(1 << 31))
+    points = np.empty((count, 4))
+    points[:, :3] = np_rng.uniform(-max_range, max_range, (count, 3))
+    # About half of the points are dropped (zero intensity), as with the default dropoff.
+    points[:, 3] = np_rng.random(count) * (np_rng.random(count) >= 0.45)
+    return _LidarData(points, _random_transform(rng), 12.5)
+
+
+# ==================================================================================================
+# -- benchmarks ------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# A benchmark prepares its inputs and returns the function running one operation and the list of
+# arguments of each operation. Vectorized functions process ops_per_call vehicles per operation.
+Benchmark = collections.namedtuple('Benchmark', 'name setup ops_per_call')
+
+
+def _setup_carla_transform(rng, vehicles):
+    inputs = [(_random_transform(rng), _random_extent(rng)) for _ in range(vehicles)]
+    return BridgeHelper.get_carla_transform, inputs
+
+
+def _setup_mosaic_transform(rng, vehicles):
+    inputs = [(_random_transform(rng), _random_extent(rng)) for _ in range(vehicles)]
+    return BridgeHelper.get_mosaic_transform, inputs
+
+
+def _setup_carla_lights_state(rng, vehicles):
+    inputs = [(rng.randrange(1 << 11), rng.randrange(1 << 14)) for _ in range(vehicles)]
+    return BridgeHelper.get_carla_lights_state, inputs
+
+
+def _setup_mosaic_lights_state(rng, vehicles):
+    inputs = [(rng.randrange(1 << 14), rng.randrange(1 << 11)) for _ in range(vehicles)]
+    return BridgeHelper.get_mosaic_lights_state, inputs
+
+
+def _setup_carla_lights_states(rng, vehicles):
+    carla_lights = np.array([rng.randrange(1 << 11) for _ in range(vehicles)])
+    mosaic_lights = np.array([rng.randrange(1 << 14) for _ in range(vehicles)])
+    return BridgeHelper.get_carla_lights_states, [(carla_lights, mosaic_lights)]
+
+
+def _setup_mosaic_lights_states(rng, vehicles):
+    mosaic_lights = np.array([rng.randrange(1 << 14) for _ in range(vehicles)])
+    carla_lights = np.array([rng.randrange(1 << 11) for _ in range(vehicles)])
+    return BridgeHelper.get_mosaic_lights_states, [(mosaic_lights, carla_lights)]
+
+
+def _setup_carla_blueprint(rng, vehicles, sync_color):
+    BridgeHelper.set_blueprint_library(carla.Client().get_world().get_blueprint_library())
+
+    type_ids = sorted(BridgeHelper._VTYPES)  # pylint: disable=protected-access
+    inputs = [(MosaicActor(rng.choice(type_ids), 'passenger', _random_transform(rng), 0,
+                           _random_extent(rng),
+                           (rng.randrange(256), rng.randrange(256), rng.randrange(256), 255)),
+               sync_color) for _ in range(vehicles)]
+    return BridgeHelper.get_carla_blueprint, inputs
+
+
+def _setup_process_lidar(rng, points, frames):
+    mosaic = MosaicSimulation(os.path.join(BASE_DIR, 'example', 'Town01.sumocfg'), 0.05)
+
+    def process_lidar(data):
+        mosaic.process_lidar(data, 'lidar_0')
+        mosaic.take_sensor_data()
+
+    return process_lidar, [(_random_lidar_data(rng, points),) for _ in range(frames)]
+
+
+def get_benchmarks(args):
+    """
+    Returns the benchmarks for the given input sizes.
+    """
+    vehicles = args.vehicles
+    benchmarks = [
+        Benchmark('get_carla_transform', lambda rng: _setup_carla_transform(rng, vehicles), 1),
+        Benchmark('get_mosaic_transform', lambda rng: _setup_mosaic_transform(rng, vehicles), 1),
+        Benchmark('get_carla_lights_state', lambda rng: _setup_carla_lights_state(rng, vehicles), 1),
+        Benchmark('get_mosaic_lights_state', lambda rng: _setup_mosaic_lights_state(rng, vehicles),
+                  1),
+        Benchmark('get_carla_lights_states', lambda rng: _setup_carla_lights_states(rng, vehicles),
+                  vehicles),
+        Benchmark('get_mosaic_lights_states',
+                  lambda rng: _setup_mosaic_lights_states(rng, vehicles), vehicles),
+        Benchmark('get_carla_blueprint', lambda rng: _setup_carla_blueprint(rng, vehicles, False), 1),
+        Benchmark('get_carla_blueprint[sync_color]',
+                  lambda rng: _setup_carla_blueprint(rng, vehicles, True), 1),
+    ]
+    for points in args.lidar_points:
+        benchmarks.append(
+            Benchmark('process_lidar[{}]'.format(points),
+                      lambda rng, points=points: _setup_process_lidar(rng, points, args.lidar_frames),
+                      1))
+    return benchmarks
+
+
+def measure(benchmark, repeat, seed, min_time=0.05, allocation_samples=100):
+    """
+    Runs the given benchmark. Each timed sample runs all the inputs as many times as needed to last
+    at least min_time seconds. Times are per vehicle for the vectorized functions.
+
+        :return: (best time per operation in ns, mean of the memory allocated while running one
+            operation in bytes)
+    """
+    operation, inputs = benchmark.setup(random.Random(seed))
+    operations = len(inputs) * benchmark.ops_per_call
+
+    def run():
+        for arguments in inputs:
+            operation(*arguments)
+
+    # Warm up (caches, lazy initializations) and calibration.
+    start = time.perf_counter_ns()
+    run()
+    loops = max(1, int(math.ceil(1e9 * min_time / max(time.perf_counter_ns() - start, 1))))
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            run()
+        best = min(best, (time.perf_counter_ns() - start) / loops)
+
+    # Allocations are traced in a separate run (tracemalloc slows down the code a lot), one operation
+    # at a time: the peak of traced memory of an operation is the memory it allocates, even if freed
+    # before returning.
+    samples = inputs[:allocation_samples]
+    allocated = 0
+    tracemalloc.start()
+    for arguments in samples:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        operation(*arguments)
+        allocated += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+
+    return best / operations, allocated / (len(samples) * benchmark.ops_per_call)
+
+
+def run_benchmarks(args):
+    """
+    Runs all the benchmarks matching the filter.
+
+        :return: {name: {'ns_per_op': ..., 'bytes_per_op': ...}}
+    """
+    results = collections.OrderedDict()
+    for benchmark in get_benchmarks(args):
+        if args.filter and not any(pattern in benchmark.name for pattern in args.filter):
+            continue
+        ns_per_op, bytes_per_op = measure(benchmark, args.repeat, args.seed, args.min_time)
+        results[benchmark.name] = {'ns_per_op': ns_per_op, 'bytes_per_op': bytes_per_op}
+    return results
+
+
+def format_results(results, baseline=None, threshold=0.0):
+    """
+    Returns the table of the given results, compared against the baseline if given.
+
+        :return: (table, names of the regressed benchmarks)
+    """
+    lines = ['{:<34} {:>14} {:>14} {:>14}'.format('benchmark', 'ns/op', 'ops/s', 'alloc B/op')]
+    if baseline is not None:
+        lines[0] += ' {:>14} {:>9}'.format('baseline ns/op', 'change')
+    lines.append('-' * len(lines[0]))
+
+    regressions = []
+    for name, result in results.items():
+        ns_per_op = result['ns_per_op']
+        line = '{:<34} {:>14.1f} {:>14.0f} {:>14.1f}'.format(name, ns_per_op, 1e9 / ns_per_op,
+                                                            result['bytes_per_op'])
+        if baseline is not None:
+            reference = baseline.get(name)
+            if reference is None:
+                line += ' {:>14} {:>9}'.format('-', 'new')
+            else:
+                change = ns_per_op / reference['ns_per_op'] - 1.0
+                line += ' {:>14.1f} {:>+8.1f}%'.format(reference['ns_per_op'], 100.0 * change)
+                if change > threshold:
+                    line += '  REGRESSION'
+                    regressions.append(name)
+        lines.append(line)
+    return '\n'.join(lines), regressions
+
+
+def main(args):
+    """
+    Main method.
+
+        :return: exit code (1 if there are regressions, 2 if there is no baseline).
+    """
+    results = run_benchmarks(args)
+
+    if args.command == 'run':
+        table, _ = format_results(results)
+        print(table)
+
+        if args.save is not None:
+            baseline = {
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'processor': platform.processor(),
+                'vehicles': args.vehicles,
+                'lidar_frames': args.lidar_frames,
+                'results': results,
+            }
+            with open(args.save, 'w', encoding='utf-8') as f:
+                json.dump(baseline, f, indent=2)
+                f.write('\n')
+            logging.info('Baseline saved in %s', args.save)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logging.error('Baseline %s not found, record one on this machine with: micro.py run --save',
+                      args.baseline)
+        return 2
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('python') != platform.python_version():
+        logging.warning('Baseline recorded with python %s, running python %s',
+                        baseline.get('python'), platform.python_version())
+    if (baseline.get('machine'), baseline.get('processor')) != (platform.machine(),
+                                                                 platform.processor()):
+        logging.warning('Baseline recorded on another machine (%s %s), timings are not comparable',
+                        baseline.get('machine'), baseline.get('processor'))
+
+    table, regressions = format_results(results, baseline['results'], args.threshold)
+    print(table)
+    if regressions:
+        logging.error('%d regression(s) above %.0f%%: %s', len(regressions), 100.0 * args.threshold,
+                      ', '.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    # Options shared by all the commands.
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument('--vehicles',
+                               metavar='N',
+                               default=1000,
+                               type=int,
+                               help='number of vehicles of the per vehicle functions (default: 1000)')
+    common_parser.add_argument('--lidar-points',
+                               metavar='P',
+                               nargs='+',
+                               default=[2800, 28000],
+                               type=int,
+                               help='points per lidar frame (default: 2800 28000, i.e., 56000 and '
+                               '560000 points per second at 20 Hz)')
+    common_parser.add_argument('--lidar-frames',
+                               metavar='N',
+                               default=5,
+                               type=int,
+                               help='number of lidar frames (default: 5)')
+    common_parser.add_argument('--repeat',
+                               '-r',
+                               metavar='N',
+                               default=7,
+                               type=int,
+                               help='number of timed samples, the best one is reported (default: 7)')
+    common_parser.add_argument('--min-time',
+                               metavar='S',
+                               default=0.05,
+                               type=float,
+                               help='minimum duration of a timed sample, in seconds (default: 0.05)')
+    common_parser.add_argument('--filter',
+                               '-k',
+                               metavar='NAME',
+                               nargs='+',
+                               default=None,
+                               help='only run the benchmarks whose name contains any of the given '
+                               'strings')
+    common_parser.add_argument('--seed', default=0, type=int, help='random seed (default: 0)')
+
+    argparser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = argparser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', parents=[common_parser], help='run the benchmarks')
+    run_parser.add_argument('--save',
+                            metavar='FILE',
+                            nargs='?',
+                            const=DEFAULT_BASELINE,
+                            default=None,
+                            help='store the results as baseline (default file: '
+                            'benchmark/micro_baseline.json)')
+    compare_parser = subparsers.add_parser('compare',
+                                           parents=[common_parser],
+                                           help='run the benchmarks and compare them against a '
+                                           'baseline')
+    compare_parser.add_argument('baseline',
+                                nargs='?',
+                                default=DEFAULT_BASELINE,
+                                help='baseline file (default: benchmark/micro_baseline.json)')
+    compare_parser.add_argument('--threshold',
+                                '-t',
+                                metavar='F',
+                                default=0.1,
+                                type=float,
+                                help='relative slowdown reported as regression (default: 0.1)')
+    arguments = argparser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+    sys.exit(main(arguments))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Startup benchmark of the different ways of loading mosaic nets.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import glob
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Makes mosaic_integration available when running this script from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from mosaic_integration.mosaic_net import load_net, read_net, read_net_offset  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def measure(function, *args, repetitions=1):
+    """
+    Runs the given function and returns the mean elapsed time (seconds) and the peak of traced
+    memory (bytes) of its first run.
+    """
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function(*args)
+    elapsed = (time.perf_counter() - start) / repetitions
+
+    return elapsed, peak
+
+
+def main(args):
+    """
+    Main method.
+    """
+    # The first (untimed) run of load_net fills the cache, the timed runs measure cache hits.
+    cache_dir = tempfile.mkdtemp()
+
+    loaders = [('read_net_offset', read_net_offset)]
+    if not args.offset_only:
+        loaders.append(('read_net', read_net))
+        loaders.append(('load_net (cached)', lambda net_file: load_net(net_file, cache_dir=cache_dir)))
+
+    print('{:<20} {:<18} {:>10} {:>12} {:>12}'.format('net', 'loader', 'size (kB)', 'time (ms)',
+                                                      'peak (MB)'))
+    for net_file in sorted(args.net_files):
+        size = os.path.getsize(net_file) / 1024.0
+        for name, loader in loaders:
+            try:
+                elapsed, peak = measure(loader, net_file, repetitions=args.repetitions)
+            except ImportError as error:
+                logging.warning('Skipping %s: %s', name, error)
+                continue
+
+            print('{:<20} {:<18} {:>10.1f} {:>12.3f} {:>12.2f}'.format(
+                os.path.basename(net_file), name, size, 1000.0 * elapsed, peak / 1024.0 / 1024.0))
+
+    shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    basedir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('net_files',
+                           nargs='*',
+                           default=glob.glob(os.path.join(basedir, 'example', 'net', '*.net.xml')),
+                           help='mosaic nets (default: example/net/*.net.xml)')
+    argparser.add_argument('--repetitions',
+                           '-r',
+                           default=5,
+                           type=int,
+                           help='number of timed runs per net and loader (default: 5)')
+    argparser.add_argument('--offset-only',
+                           action='store_true',
+                           help='do not benchmark the full net loading (default: False)')
+    arguments = argparser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+    main(arguments)
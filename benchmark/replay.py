@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Replays a co-simulation session recorded with run_synchronization.py --record into the bridge, as
+fast as possible or at the recorded pace, and reports the bridge throughput and latencies.
+
+    python benchmark/replay.py session.log                      # against a running bridge
+    python benchmark/replay.py session.log --variants sequential= pipelined=--pipelined
+    python benchmark/replay.py session.log --verify --lag 1 --variants pipelined=--pipelined
+
+With --variants, a bridge (against the carla stand-in by default) is started for each variant
+(NAME=ARGS, ARGS being extra arguments of run_synchronization.py) and the results are compared.
+With --verify, the step results (actors and sensor measurements) are checked against the recorded
+ones, --lag steps earlier (the pipelined mode returns the carla results one step later).
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import json
+import logging
+import os
+import shlex
+import sys
+import time
+
+import grpc
+import numpy as np
+
+# Makes the CarlaLink modules available when running this script from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import CarlaLink_pb2  # pylint: disable=wrong-import-position
+import CarlaLink_pb2_grpc  # pylint: disable=wrong-import-position
+
+from mosaic_integration.session_recorder import RECORDED_METHODS, REQUEST, read_session  # pylint: disable=wrong-import-position
+
+from load_generator import BASE_DIR  # pylint: disable=wrong-import-position
+from scaling import Bridge  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- replay ----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def load_session(path):
+    """
+    Returns the recorded requests, grouped by step, and the recorded step results. The requests
+    recorded between a SimulationStep request and its response (issued by the bridge itself, only
+    found in older logs) are skipped, so that they are not sent twice.
+
+        :return: ([[(request record, recorded AddSensor response or None), ...] per step],
+            [StepResult per step])
+    """
+    steps, results = [[]], []
+    in_step = False
+    for record in read_session(path):
+        if record.kind == REQUEST:
+            if in_step and record.method != 'SimulationStep':
+                continue
+            steps[-1].append((record, None))
+            if record.method == 'SimulationStep':
+                steps.append([])
+                in_step = True
+        elif record.method == 'SimulationStep':
+            results.append(record.message)
+            in_step = False
+        elif record.method == 'AddSensor' and steps[-1]:
+            # Needed to map the sensor ids of the following RemoveSensor/SetSensorActive requests.
+            steps[-1][-1] = (steps[-1][-1][0], record.message)
+
+    if not steps[-1]:
+        steps.pop()
+    return steps, results
+
+
+def compare_step_results(recorded, replayed, sensor_ids=None):
+    """
+    Compares two step results.
+
+        :param sensor_ids: replayed sensor id of each recorded one, if they differ.
+        :return: (whether the spawned/destroyed/moved actors and the measurements (sensor, timestamp
+            and number of points) match, maximum position difference of the moved actors and of the
+            sensor points in meters)
+    """
+    sensor_ids = sensor_ids or {}
+
+    def get_ids(requests):
+        return {request.actor_id for request in requests}
+
+    def get_measurements(sensor_data, ids):
+        return sorted((ids.get(data.id, data.id), data.timestamp, len(data.lidar_points))
+                      for data in sensor_data)
+
+    same = (get_ids(recorded.add_actors) == get_ids(replayed.add_actors) and
+            get_ids(recorded.remove_actors) == get_ids(replayed.remove_actors) and
+            get_ids(recorded.move_actors) == get_ids(replayed.move_actors) and
+            get_measurements(recorded.sensor_data, sensor_ids) == get_measurements(
+                replayed.sensor_data, {}))
+
+    moves = {move.actor_id: move for move in recorded.move_actors}
+    error = 0.0
+    for move in replayed.move_actors:
+        other = moves.get(move.actor_id)
+        if other is not None:
+            error = max(error, np.hypot(move.loc_x - other.loc_x, move.loc_y - other.loc_y))
+
+    def get_points(data):
+        return np.array([(point.x, point.y, point.z) for point in data.lidar_points]).reshape(-1, 3)
+
+    measurements = {(sensor_ids.get(data.id, data.id), data.timestamp): data
+                    for data in recorded.sensor_data}
+    for data in replayed.sensor_data:
+        other = measurements.get((data.id, data.timestamp))
+        if other is not None and len(other.lidar_points) == len(data.lidar_points) > 0:
+            points, other_points = get_points(data), get_points(other)
+            error = max(error, np.hypot(*(points - other_points).T).max())
+    return same, error
+
+
+def replay(stub, steps, recorded_results, pace=0.0, verify=False, lag=0):
+    """
+    Feeds the recorded requests into the bridge.
+
+        :param pace: replay speed relative to the recorded one (0, as fast as possible).
+        :param verify: whether the step results are compared with the recorded ones.
+        :param lag: steps the replayed results lag behind the recorded ones (e.g., 1 when a session
+            recorded without --pipelined is replayed into a pipelined bridge).
+        :return: json serializable report.
+    """
+    methods = {method: getattr(stub, method) for method in RECORDED_METHODS}
+    sensor_ids = {}  # {recorded sensor id: replayed sensor id}
+
+    step_latencies, simulation_step_latencies = [], []
+    bytes_sent = bytes_received = 0
+    mismatches, max_error = 0, 0.0
+
+    first_timestamp = steps[0][0][0].timestamp if steps and steps[0] else 0.0
+    start = time.perf_counter()
+    for index, records in enumerate(steps):
+        step_start = time.perf_counter()
+        for record, recorded_response in records:
+            if pace > 0:
+                # Absolute deadlines, so that the replay does not drift.
+                remaining = start + (record.timestamp - first_timestamp) / pace - time.perf_counter()
+                if remaining > 0:
+                    time.sleep(remaining)
+                    step_start = time.perf_counter()
+
+            request = record.message
+            if record.method in ('RemoveSensor', 'SetSensorActive') and request.id in sensor_ids:
+                request = CarlaLink_pb2.Sensor(id=sensor_ids[request.id],
+                                               attributes=request.attributes)
+
+            bytes_sent += request.ByteSize()
+            call_start = time.perf_counter()
+            response = methods[record.method](request)
+            call_end = time.perf_counter()
+            bytes_received += response.ByteSize()
+
+            if recorded_response is not None:
+                sensor_ids[recorded_response.id] = response.id
+
+            if record.method == 'SimulationStep':
+                step_latencies.append(call_end - step_start)
+                simulation_step_latencies.append(call_end - call_start)
+                if verify and 0 <= index - lag < len(recorded_results):
+                    same, error = compare_step_results(recorded_results[index - lag], response,
+                                                       sensor_ids)
+                    mismatches += not same
+                    max_error = max(max_error, error)
+    elapsed = time.perf_counter() - start
+
+    def percentiles(values):
+        if not values:
+            return {}
+        values = 1000.0 * np.asarray(values)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {'p50': p50, 'p95': p95, 'p99': p99, 'max': values.max(), 'mean': values.mean()}
+
+    report = {
+        'steps': len(simulation_step_latencies),
+        'elapsed': elapsed,
+        'steps_per_second': len(simulation_step_latencies) / elapsed if elapsed > 0 else 0.0,
+        'step_latency_ms': percentiles(step_latencies),
+        'simulation_step_latency_ms': percentiles(simulation_step_latencies),
+        'bytes_sent': bytes_sent,
+        'bytes_received': bytes_received,
+    }
+    if verify:
+        report['mismatched_steps'] = mismatches
+        report['max_position_error'] = max_error
+    return report
+
+
+def format_reports(reports, recorded_steps_per_second):
+    """
+    Returns the comparison table of the given reports ({variant: report}).
+    """
+    header = '{:<24} {:>7} {:>9} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'variant', 'steps', 'steps/s', 'step p50', 'step p99', 'sim p50', 'sim p99', 'mismatch')
+    lines = [
+        'recorded pace: {:.1f} steps/s (latencies in ms)'.format(recorded_steps_per_second), header,
+        '-' * len(header)
+    ]
+    for variant, report in reports.items():
+        step, simulation_step = report['step_latency_ms'], report['simulation_step_latency_ms']
+        lines.append('{:<24} {:>7} {:>9.1f} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f} {:>10}'.format(
+            variant or '-', report['steps'], report['steps_per_second'],
+            step.get('p50', 0.0), step.get('p99', 0.0), simulation_step.get('p50', 0.0),
+            simulation_step.get('p99', 0.0), report.get('mismatched_steps', '-')))
+    return '\n'.join(lines)
+
+
+def main(args):
+    """
+    Main method.
+    """
+    steps, recorded_results = load_session(args.session)
+    if not steps:
+        logging.error('No requests in %s', args.session)
+        return
+
+    duration = steps[-1][-1][0].timestamp - steps[0][0][0].timestamp
+    recorded_steps_per_second = len(steps) / duration if duration > 0 else 0.0
+    logging.info('%d steps, %d requests recorded in %.2f s', len(steps),
+                 sum(len(records) for records in steps), duration)
+
+    reports = {}
+    if args.variants is None:
+        channel = grpc.insecure_channel('{}:{}'.format(args.host, args.port),
+                                        options=[('grpc.max_receive_message_length', -1)])
+        grpc.channel_ready_future(channel).result(timeout=args.timeout)
+        reports[''] = replay(CarlaLink_pb2_grpc.CarlaLinkServiceStub(channel), steps,
+                             recorded_results, args.pace, args.verify, args.lag)
+        channel.close()
+    else:
+        for variant in args.variants:
+            name, _, bridge_args = variant.partition('=')
+            logging.info('Replaying %s (bridge arguments: %s)', name, bridge_args or 'none')
+            bridge = Bridge(args.mosaic_cfg_file, shlex.split(bridge_args), not args.no_mock,
+                            args.timeout)
+            try:
+                reports[name] = replay(bridge.stub, steps, recorded_results, args.pace, args.verify,
+                                       args.lag)
+            finally:
+                bridge.close()
+
+    print(format_reports(reports, recorded_steps_per_second))
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argparser.add_argument('session', help='session log (see run_synchronization.py --record)')
+    argparser.add_argument('--pace',
+                           metavar='X',
+                           default=0.0,
+                           type=float,
+                           help='replay speed relative to the recorded one, e.g., 1.0 for the '
+                           'recorded pace (default: 0, as fast as possible)')
+    argparser.add_argument('--verify',
+                           action='store_true',
+                           help='compare the step results with the recorded ones (default: False)')
+    argparser.add_argument('--lag',
+                           metavar='N',
+                           default=0,
+                           type=int,
+                           help='steps the replayed results lag behind the recorded ones, e.g., 1 '
+                           'to verify a pipelined bridge against a sequential session (default: 0)')
+    argparser.add_argument('--host',
+                           metavar='H',
+                           default='127.0.0.1',
+                           help='IP of the bridge grpc server (default: 127.0.0.1)')
+    argparser.add_argument('--port',
+                           metavar='P',
+                           default=50051,
+                           type=int,
+                           help='TCP port of the bridge grpc server (default: 50051)')
+    argparser.add_argument('--variants',
+                           metavar='NAME=ARGS',
+                           nargs='+',
+                           default=None,
+                           help='start a bridge for each of the given variants (name and extra '
+                           'arguments of run_synchronization.py) instead of using a running one')
+    argparser.add_argument('--mosaic-cfg-file',
+                           default=os.path.join(BASE_DIR, 'example', 'Town01.sumocfg'),
+                           help='mosaic configuration file of the started bridges (default: '
+                           'example/Town01.sumocfg)')
+    argparser.add_argument('--no-mock',
+                           action='store_true',
+                           help='run the started bridges against a real carla server (default: '
+                           'False)')
+    argparser.add_argument('--timeout',
+                           metavar='S',
+                           default=60.0,
+                           type=float,
+                           help='seconds to wait for the bridge (default: 60.0)')
+    argparser.add_argument('--output',
+                           '-o',
+                           metavar='FILE',
+                           default=None,
+                           help='write the reports to the given json file')
+    arguments = argparser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+    main(arguments)
@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Scaling benchmark of the co-simulation bridge. For every combination of the swept parameters, it
+starts the bridge (against the carla stand-in by default), drives it with the synthetic mosaic load
+generator and collects the throughput, the latencies and the per phase tick profile of the bridge.
+
+Results are appended to a json lines file (one run per line) and summarized in a table:
+
+    python benchmark/scaling.py --vehicles 10 100 1000 5000 --lidars 0 4 -o scaling.jsonl
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import csv
+import datetime
+import itertools
+import json
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import grpc
+import numpy as np
+
+# Makes the CarlaLink modules available when running this script from any folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import CarlaLink_pb2_grpc  # pylint: disable=wrong-import-position
+
+from mosaic_integration.profiler import TICK_PHASES  # pylint: disable=wrong-import-position
+
+from load_generator import BASE_DIR, LoadGenerator, RouteTrajectoryModel, read_vclasses  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- constants -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+BRIDGE_PORT = 50051
+
+# Swept parameters, in the order of the summary table.
+SWEEP_PARAMETERS = ('vehicles', 'lidars', 'lidar_points_per_second', 'churn', 'sync_vehicle_lights',
+                    'tls_manager')
+
+# ==================================================================================================
+# -- bridge ----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class Bridge(object):
+    """
+    run_synchronization.py running in a child process.
+    """
+    def __init__(self, cfg_file, bridge_args=(), mock=True, timeout=60.0):
+        command = [sys.executable, os.path.join(BASE_DIR, 'run_synchronization.py'), cfg_file]
+        command.extend(bridge_args)
+
+        env = dict(os.environ)
+        if mock:
+            env['CARLA_MOCK'] = '1'
+
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=self.log,
+                                        stderr=subprocess.STDOUT)
+
+        self.channel = grpc.insecure_channel('127.0.0.1:{}'.format(BRIDGE_PORT),
+                                             options=[('grpc.max_receive_message_length', -1)])
+        deadline = time.time() + timeout
+        while True:
+            try:
+                grpc.channel_ready_future(self.channel).result(timeout=1.0)
+                break
+            except grpc.FutureTimeoutError:
+                if self.process.poll() is not None or time.time() > deadline:
+                    self.close()
+                    raise RuntimeError('the bridge did not start:\n' + self.get_log())
+        self.stub = CarlaLink_pb2_grpc.CarlaLinkServiceStub(self.channel)
+
+    def get_log(self):
+        self.log.seek(0)
+        return self.log.read().decode('utf-8', errors='replace')
+
+    def close(self):
+        """
+        Stops the bridge. SIGINT lets it clean up and close the profile trace.
+        """
+        self.channel.close()
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout=30.0)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+
+
+def read_profile(profile_file, ticks):
+    """
+    Returns the mean time (ms) of each tick phase over the given number of measured ticks of a
+    profile trace (the last tick is the clean up step of the load generator).
+    """
+    try:
+        with open(profile_file, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))[-(ticks + 1):-1]
+    except OSError:
+        return {}
+    if not rows:
+        return {}
+
+    return {
+        name: float(np.mean([float(row[name]) for row in rows]))
+        for name in rows[0] if name != 'tick'
+    }
+
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def get_revision():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_configuration(args, config, trajectory_model, vclasses):
+    """
+    Runs the benchmark of one configuration.
+
+        :return: json serializable result.
+    """
+    profile_file = tempfile.NamedTemporaryFile(suffix='.csv', delete=False).name
+    bridge_args = [
+        '--step-length', str(args.step_length), '--tls-manager', config['tls_manager'],
+        '--profile-out', profile_file
+    ]
+    if config['sync_vehicle_lights']:
+        bridge_args.append('--sync-vehicle-lights')
+    bridge = Bridge(args.mosaic_cfg_file, bridge_args + args.bridge_args, not args.no_mock)
+
+    traffic_lights = []
+    if config['tls_manager'] == 'mosaic':
+        traffic_lights = [str(args.traffic_light_first_id + i) for i in range(args.traffic_lights)]
+    lidar_attributes = {
+        'range': str(args.lidar_range),
+        'points_per_second': str(config['lidar_points_per_second']),
+    }
+
+    generator = LoadGenerator(bridge.stub, trajectory_model, config['vehicles'], config['churn'],
+                              args.step_length, args.speed, config['lidars'], lidar_attributes,
+                              traffic_lights, config['sync_vehicle_lights'], args.concurrency,
+                              vclasses, args.seed)
+    try:
+        generator.run(args.warmup)
+        generator.reset_stats()
+
+        # Runs the steps until done or out of time (large fleets may be slow).
+        start = time.perf_counter()
+        while generator.step_count < args.warmup + args.steps:
+            generator.step()
+            if args.time_limit > 0 and time.perf_counter() - start > args.time_limit:
+                break
+        report = generator.report(time.perf_counter() - start)
+    finally:
+        generator.close()
+        bridge.close()
+
+    profile = read_profile(profile_file, report['steps'])
+    os.remove(profile_file)
+
+    return {
+        'config': config,
+        'report': report,
+        'profile_ms': profile,
+    }
+
+
+def get_bottleneck(profile):
+    """
+    Returns the bridge phase taking the most time per tick ('wait' is the load generator).
+    """
+    phases = {name: profile[name] for name in TICK_PHASES if name != 'wait' and name in profile}
+    return max(phases, key=phases.get) if phases else '-'
+
+
+def format_table(results):
+    """
+    Returns the summary table of the given results.
+    """
+    header = ('{:>8} {:>6} {:>8} {:>7} {:>6} {:>7} | {:>8} {:>8} {:>8} {:>9} {:>9} {:>10} '
+              '{:<14}').format('vehicles', 'lidars', 'pts/s', 'churn', 'lights', 'tls', 'steps/s',
+                               'p50 ms', 'p99 ms', 'bridge ms', 'kB/step', 'points', 'bottleneck')
+    lines = [header, '-' * len(header)]
+    for result in results:
+        config, report, profile = result['config'], result['report'], result['profile_ms']
+        latency = report['step_latency_ms']
+        lines.append(('{:>8} {:>6} {:>8} {:>7.1f} {:>6} {:>7} | {:>8.1f} {:>8.2f} {:>8.2f} {:>9.2f} '
+                      '{:>9.1f} {:>10.0f} {:<14}').format(
+                          config['vehicles'], config['lidars'], config['lidar_points_per_second'],
+                          config['churn'], 'on' if config['sync_vehicle_lights'] else 'off',
+                          config['tls_manager'], report['steps_per_second'], latency.get('p50', 0.0),
+                          latency.get('p99', 0.0), profile.get('total', 0.0),
+                          (report['bytes_sent_per_step'] + report['bytes_received_per_step']) /
+                          1024.0, report['sensor_points_per_step'], get_bottleneck(profile)))
+    return '\n'.join(lines)
+
+
+def main(args):
+    """
+    Main method.
+    """
+    rng = random.Random(args.seed)
+    trajectory_model = RouteTrajectoryModel(args.net_file, args.route_file, rng)
+    vclasses = read_vclasses(os.path.join(BASE_DIR, 'data', 'vtypes.json'))
+
+    configs = [
+        dict(zip(SWEEP_PARAMETERS, values))
+        for values in itertools.product(args.vehicles, args.lidars, args.lidar_points_per_second,
+                                        args.churn, [lights == 'on' for lights in args.sync_vehicle_lights],
+                                        args.tls_manager)
+    ]
+
+    metadata = {
+        'revision': get_revision(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'mock': not args.no_mock,
+        'steps': args.steps,
+        'step_length': args.step_length,
+    }
+
+    results = []
+    for i, config in enumerate(configs):
+        logging.info('[%d/%d] %s', i + 1, len(configs), config)
+        try:
+            result = run_configuration(args, config, trajectory_model, vclasses)
+        except (RuntimeError, grpc.RpcError) as error:
+            logging.error('Run failed: %s', error)
+            continue
+
+        result.update(metadata)
+        results.append(result)
+        logging.info('%.1f steps/s, bottleneck: %s', result['report']['steps_per_second'],
+                     get_bottleneck(result['profile_ms']))
+
+        if args.output is not None:
+            with open(args.output, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result) + '\n')
+
+    print(format_table(results))
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argparser.add_argument('--mosaic-cfg-file',
+                           default=os.path.join(BASE_DIR, 'example', 'Town01.sumocfg'),
+                           help='mosaic configuration file of the bridge (default: '
+                           'example/Town01.sumocfg)')
+    argparser.add_argument('--net-file',
+                           default=os.path.join(BASE_DIR, 'example', 'net', 'Town01.net.xml'),
+                           help='net of the routes (default: example/net/Town01.net.xml)')
+    argparser.add_argument('--route-file',
+                           default=os.path.join(BASE_DIR, 'example', 'rou', 'Town01.rou.xml'),
+                           help='mosaic routes (default: example/rou/Town01.rou.xml)')
+    argparser.add_argument('--vehicles',
+                           metavar='N',
+                           nargs='+',
+                           default=[10, 50, 100, 500, 1000, 2000, 5000],
+                           type=int,
+                           help='swept number of mosaic vehicles (default: 10 50 100 500 1000 2000 '
+                           '5000)')
+    argparser.add_argument('--lidars',
+                           metavar='N',
+                           nargs='+',
+                           default=[0],
+                           type=int,
+                           help='swept number of lidars (default: 0)')
+    argparser.add_argument('--lidar-points-per-second',
+                           metavar='P',
+                           nargs='+',
+                           default=[56000],
+                           type=int,
+                           help='swept lidar points per second (default: 56000)')
+    argparser.add_argument('--churn',
+                           metavar='R',
+                           nargs='+',
+                           default=[0.0],
+                           type=float,
+                           help='swept vehicles replaced per second (default: 0)')
+    argparser.add_argument('--sync-vehicle-lights',
+                           nargs='+',
+                           choices=['off', 'on'],
+                           default=['off'],
+                           help='swept vehicle lights synchronization (default: off)')
+    argparser.add_argument('--tls-manager',
+                           nargs='+',
+                           choices=['none', 'mosaic', 'carla'],
+                           default=['none'],
+                           help='swept traffic light manager (default: none)')
+    argparser.add_argument('--traffic-lights',
+                           metavar='N',
+                           default=16,
+                           type=int,
+                           help='number of traffic lights sent by mosaic with --tls-manager mosaic '
+                           '(default: 16, as in the carla stand-in)')
+    argparser.add_argument('--traffic-light-first-id',
+                           metavar='ID',
+                           default=1000,
+                           type=int,
+                           help='landmark id of the first traffic light (default: 1000)')
+    argparser.add_argument('--lidar-range',
+                           metavar='R',
+                           default=50.0,
+                           type=float,
+                           help='lidar range, in meters (default: 50.0)')
+    argparser.add_argument('--speed',
+                           metavar='V',
+                           default=10.0,
+                           type=float,
+                           help='mean vehicle speed, in m/s (default: 10.0)')
+    argparser.add_argument('--step-length',
+                           default=0.05,
+                           type=float,
+                           help='simulated seconds per step (default: 0.05s)')
+    argparser.add_argument('--steps',
+                           metavar='N',
+                           default=100,
+                           type=int,
+                           help='number of measured steps per run (default: 100)')
+    argparser.add_argument('--warmup',
+                           metavar='N',
+                           default=5,
+                           type=int,
+                           help='number of steps before measuring (default: 5)')
+    argparser.add_argument('--time-limit',
+                           metavar='S',
+                           default=120.0,
+                           type=float,
+                           help='stop measuring a run after S seconds (default: 120, 0 for no limit)')
+    argparser.add_argument('--concurrency',
+                           metavar='K',
+                           default=1,
+                           type=int,
+                           help='vehicle and traffic light calls in flight (default: 1, as mosaic)')
+    argparser.add_argument('--no-mock',
+                           action='store_true',
+                           help='run the bridge against a real carla server (default: False)')
+    argparser.add_argument('--bridge-args',
+                           nargs=argparse.REMAINDER,
+                           default=[],
+                           help='extra arguments of run_synchronization.py (must be the last option)')
+    argparser.add_argument('--seed', default=0, type=int, help='random seed (default: 0)')
+    argparser.add_argument('--output',
+                           '-o',
+                           metavar='FILE',
+                           default=None,
+                           help='append the results to the given json lines file')
+    arguments = argparser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+    main(arguments)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a pool of parked carla vehicles to avoid spawning and destroying actors. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import logging
+import random
+
+import carla  # pylint: disable=import-error
+
+from .constants import ACTOR_POOL_LOCATION_Z, INVALID_ACTOR_ID
+
+# ==================================================================================================
+# -- actor pool ------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class CarlaActorPool(object):
+    """
+    CarlaActorPool keeps hidden carla vehicles far below the map. Instead of spawning a new vehicle,
+    a parked one with the same blueprint is teleported to the requested transform. Instead of
+    destroying a vehicle, it is parked again.
+
+    Vehicle colors can not be changed once spawned. Hence, if match_color is set, the pool is keyed
+    by blueprint id and color. Otherwise, only by blueprint id. As the colors requested by mosaic
+    are not known in advance, a pool matching colors is not pre-filled (see fill): it only holds the
+    released vehicles, which are reused by later vehicles of the same blueprint and color.
+
+        :param log_interval: number of ticks between logged statistics (0 to disable them).
+    """
+    def __init__(self, client, world, capacity, match_color=False, log_interval=200):
+        self.client = client
+        self.world = world
+        self.capacity = capacity
+        self.match_color = match_color
+        self.log_interval = log_interval
+
+        self._parked = {}  # {key: [actor_id, ...]}
+        self._parked_ids = set()
+        self._keys = {}  # {actor_id: key} for all the vehicles that can be parked.
+
+        self.hits = 0
+        self.misses = 0
+        self.ticks = 0
+
+    @property
+    def size(self):
+        """
+        Number of parked vehicles.
+        """
+        return len(self._parked_ids)
+
+    @property
+    def parked_actor_ids(self):
+        """
+        Ids of the parked vehicles.
+        """
+        return self._parked_ids
+
+    def _get_key(self, blueprint_id, color):
+        return (blueprint_id, color) if self.match_color else (blueprint_id, None)
+
+    def _get_blueprint_key(self, blueprint):
+        color = None
+        if blueprint.has_attribute('color'):
+            color = blueprint.get_attribute('color').as_str()
+        return self._get_key(blueprint.id, color)
+
+    @staticmethod
+    def _get_parking_transform(actor_id):
+        # Each vehicle has its own parking slot so that parked vehicles never overlap.
+        location = carla.Location(10.0 * (actor_id % 1000), 10.0 * (actor_id // 1000),
+                                  ACTOR_POOL_LOCATION_Z)
+        return carla.Transform(location, carla.Rotation())
+
+    def fill(self, blueprints, size):
+        """
+        Pre-spawns the given number of parked vehicles, chosen round robin from the given blueprints.
+        Nothing is pre-spawned if match_color is set, since vehicles of random colors would hardly
+        ever match the requested ones.
+        """
+        blueprints = list(blueprints)
+        if not blueprints or size <= 0:
+            return
+        if self.match_color:
+            logging.info('Actor pool matching colors, filled with the released vehicles only')
+            return
+
+        batch = []
+        keys = []
+        for i in range(size):
+            blueprint = blueprints[i % len(blueprints)]
+            if blueprint.has_attribute('color'):
+                color = random.choice(blueprint.get_attribute('color').recommended_values)
+                blueprint.set_attribute('color', color)
+            blueprint.set_attribute('role_name', 'mosaic_driver')
+
+            transform = carla.Transform(
+                carla.Location(10.0 * (i % 1000), -10.0 * (1 + i // 1000), ACTOR_POOL_LOCATION_Z),
+                carla.Rotation())
+            batch.append(
+                carla.command.SpawnActor(blueprint, transform).then(
+                    carla.command.SetSimulatePhysics(carla.command.FutureActor, False)))
+            keys.append(self._get_blueprint_key(blueprint))
+
+        for key, response in zip(keys, self.client.apply_batch_sync(batch, False)):
+            if response.error:
+                logging.error('Spawn pooled carla actor failed. %s', response.error)
+                continue
+            self._keys[response.actor_id] = key
+            self._parked.setdefault(key, []).append(response.actor_id)
+            self._parked_ids.add(response.actor_id)
+
+        logging.info('Actor pool filled with %d vehicles', self.size)
+
+    def register(self, actor_id, blueprint):
+        """
+        Registers a vehicle spawned outside the pool so that it can be parked when released.
+        """
+        self._keys[actor_id] = self._get_blueprint_key(blueprint)
+
+    def acquire(self, blueprint, transform):
+        """
+        Returns a parked vehicle matching the given blueprint, teleported to the given transform.
+
+            :return: actor id if there is a matching parked vehicle. Otherwise, INVALID_ACTOR_ID.
+        """
+        actor_ids = self._parked.get(self._get_blueprint_key(blueprint))
+        while actor_ids:
+            actor_id = actor_ids.pop()
+            self._parked_ids.discard(actor_id)
+
+            actor = self.world.get_actor(actor_id)
+            if actor is not None:
+                actor.set_transform(transform)
+                self.hits += 1
+                return actor.id
+
+        self.misses += 1
+        return INVALID_ACTOR_ID
+
+    def release(self, actor_id):
+        """
+        Parks the given vehicle.
+
+            :return: True if the vehicle has been parked. False if it does not belong to the pool or
+                the pool is full, in which case the vehicle has to be destroyed.
+        """
+        if actor_id not in self._keys or self.size >= self.capacity:
+            self._keys.pop(actor_id, None)
+            return False
+
+        actor = self.world.get_actor(actor_id)
+        if actor is None:
+            self._keys.pop(actor_id)
+            return False
+
+        actor.set_transform(self._get_parking_transform(actor_id))
+        actor.set_light_state(carla.VehicleLightState.NONE)
+        self._parked.setdefault(self._keys[actor_id], []).append(actor_id)
+        self._parked_ids.add(actor_id)
+        return True
+
+    def end_tick(self):
+        """
+        Ends a tick, logging the statistics of the pool if needed.
+        """
+        self.ticks += 1
+        if self.log_interval > 0 and self.ticks % self.log_interval == 0:
+            logging.info('%s', self)
+
+    def destroy(self):
+        """
+        Destroys all the parked vehicles.
+        """
+        batch = [carla.command.DestroyActor(actor_id) for actor_id in self.parked_actor_ids]
+        self.client.apply_batch_sync(batch, False)
+
+        self._parked.clear()
+        self._parked_ids.clear()
+        self._keys.clear()
+
+    def __str__(self):
+        return 'actor pool: {} hits, {} misses, {} parked vehicles (capacity {})'.format(
+            self.hits, self.misses, self.size, self.capacity)
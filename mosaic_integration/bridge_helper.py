@@ -11,15 +11,173 @@
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
+import functools
 import json
 import logging
 import math
+import operator
 import random
 
+import numpy as np
+
 import carla  # pylint: disable=import-error
 
 from .mosaic_simulation import MosaicSignalState, MosaicVehSignal
 
+# ==================================================================================================
+# -- vehicle lights lookup tables ------------------------------------------------------------------
+# ==================================================================================================
+
+
+def _compute_carla_lights_state(current_carla_lights, mosaic_lights):
+    """
+    Returns carla vehicle light state based on mosaic signals (reference implementation used to
+    build the lookup tables).
+    """
+    current_lights = current_carla_lights
+
+    # Blinker right / emergency.
+    if (any([
+            bool(mosaic_lights & MosaicVehSignal.BLINKER_RIGHT),
+            bool(mosaic_lights & MosaicVehSignal.BLINKER_EMERGENCY)
+    ]) != bool(current_lights & carla.VehicleLightState.RightBlinker)):
+        current_lights ^= carla.VehicleLightState.RightBlinker
+
+    # Blinker left / emergency.
+    if (any([
+            bool(mosaic_lights & MosaicVehSignal.BLINKER_LEFT),
+            bool(mosaic_lights & MosaicVehSignal.BLINKER_EMERGENCY)
+    ]) != bool(current_lights & carla.VehicleLightState.LeftBlinker)):
+        current_lights ^= carla.VehicleLightState.LeftBlinker
+
+    # Brake.
+    if (bool(mosaic_lights & MosaicVehSignal.BRAKELIGHT) !=
+            bool(current_lights & carla.VehicleLightState.Brake)):
+        current_lights ^= carla.VehicleLightState.Brake
+
+    # Front (low beam).
+    if (bool(mosaic_lights & MosaicVehSignal.FRONTLIGHT) !=
+            bool(current_lights & carla.VehicleLightState.LowBeam)):
+        current_lights ^= carla.VehicleLightState.LowBeam
+
+    # Fog.
+    if (bool(mosaic_lights & MosaicVehSignal.FOGLIGHT) !=
+            bool(current_lights & carla.VehicleLightState.Fog)):
+        current_lights ^= carla.VehicleLightState.Fog
+
+    # High beam.
+    if (bool(mosaic_lights & MosaicVehSignal.HIGHBEAM) !=
+            bool(current_lights & carla.VehicleLightState.HighBeam)):
+        current_lights ^= carla.VehicleLightState.HighBeam
+
+    # Backdrive (reverse).
+    if (bool(mosaic_lights & MosaicVehSignal.BACKDRIVE) !=
+            bool(current_lights & carla.VehicleLightState.Reverse)):
+        current_lights ^= carla.VehicleLightState.Reverse
+
+    # Door open left/right.
+    if (any([
+            bool(mosaic_lights & MosaicVehSignal.DOOR_OPEN_LEFT),
+            bool(mosaic_lights & MosaicVehSignal.DOOR_OPEN_RIGHT)
+    ]) != bool(current_lights & carla.VehicleLightState.Position)):
+        current_lights ^= carla.VehicleLightState.Position
+
+    return current_lights
+
+
+def _compute_mosaic_lights_state(current_mosaic_lights, carla_lights):
+    """
+    Returns mosaic signals based on carla vehicle light state (reference implementation used to
+    build the lookup tables).
+    """
+    current_lights = current_mosaic_lights
+
+    # Blinker right.
+    if (bool(carla_lights & carla.VehicleLightState.RightBlinker) !=
+            bool(current_lights & MosaicVehSignal.BLINKER_RIGHT)):
+        current_lights ^= MosaicVehSignal.BLINKER_RIGHT
+
+    # Blinker left.
+    if (bool(carla_lights & carla.VehicleLightState.LeftBlinker) !=
+            bool(current_lights & MosaicVehSignal.BLINKER_LEFT)):
+        current_lights ^= MosaicVehSignal.BLINKER_LEFT
+
+    # Emergency.
+    if (all([
+            bool(carla_lights & carla.VehicleLightState.RightBlinker),
+            bool(carla_lights & carla.VehicleLightState.LeftBlinker)
+    ]) != (current_lights & MosaicVehSignal.BLINKER_EMERGENCY)):
+        current_lights ^= MosaicVehSignal.BLINKER_EMERGENCY
+
+    # Break.
+    if (bool(carla_lights & carla.VehicleLightState.Brake) !=
+            bool(current_lights & MosaicVehSignal.BRAKELIGHT)):
+        current_lights ^= MosaicVehSignal.BRAKELIGHT
+
+    # Front (low beam)
+    if (bool(carla_lights & carla.VehicleLightState.LowBeam) !=
+            bool(current_lights & MosaicVehSignal.FRONTLIGHT)):
+        current_lights ^= MosaicVehSignal.FRONTLIGHT
+
+    # Fog light.
+    if (bool(carla_lights & carla.VehicleLightState.Fog) !=
+            bool(current_lights & MosaicVehSignal.FOGLIGHT)):
+        current_lights ^= MosaicVehSignal.FOGLIGHT
+
+    # High beam ligth.
+    if (bool(carla_lights & carla.VehicleLightState.HighBeam) !=
+            bool(current_lights & MosaicVehSignal.HIGHBEAM)):
+        current_lights ^= MosaicVehSignal.HIGHBEAM
+
+    # Backdrive (reverse)
+    if (bool(carla_lights & carla.VehicleLightState.Reverse) !=
+            bool(current_lights & MosaicVehSignal.BACKDRIVE)):
+        current_lights ^= MosaicVehSignal.BACKDRIVE
+
+    return current_lights
+
+
+def _get_bits(flags):
+    """
+    Returns the number of bits needed to index all the given flags.
+    """
+    return max(int(flag) for flag in flags).bit_length()
+
+
+# Mosaic signals that affect the carla light state. The carla lights not managed by mosaic are kept.
+_MOSAIC_INPUT_BITS = _get_bits([
+    MosaicVehSignal.BLINKER_RIGHT, MosaicVehSignal.BLINKER_LEFT, MosaicVehSignal.BLINKER_EMERGENCY,
+    MosaicVehSignal.BRAKELIGHT, MosaicVehSignal.FRONTLIGHT, MosaicVehSignal.FOGLIGHT,
+    MosaicVehSignal.HIGHBEAM, MosaicVehSignal.BACKDRIVE, MosaicVehSignal.DOOR_OPEN_LEFT,
+    MosaicVehSignal.DOOR_OPEN_RIGHT
+])
+_MOSAIC_INPUT_MASK = (1 << _MOSAIC_INPUT_BITS) - 1
+
+# {mosaic signals: carla managed lights}
+_CARLA_LIGHTS_TABLE = tuple(
+    int(_compute_carla_lights_state(0, mosaic_lights))
+    for mosaic_lights in range(1 << _MOSAIC_INPUT_BITS))
+_CARLA_MANAGED_LIGHTS = functools.reduce(operator.or_, _CARLA_LIGHTS_TABLE, 0)
+
+# Carla lights that affect the mosaic signals. The mosaic emergency signal also depends on its current
+# value, so it is appended to the index as an extra bit.
+_CARLA_INPUT_BITS = _get_bits([
+    carla.VehicleLightState.RightBlinker, carla.VehicleLightState.LeftBlinker,
+    carla.VehicleLightState.Brake, carla.VehicleLightState.LowBeam, carla.VehicleLightState.Fog,
+    carla.VehicleLightState.HighBeam, carla.VehicleLightState.Reverse
+])
+_CARLA_INPUT_MASK = (1 << _CARLA_INPUT_BITS) - 1
+
+# {(current emergency signal, carla lights): mosaic managed signals}
+_MOSAIC_SIGNALS_TABLE = tuple(
+    int(_compute_mosaic_lights_state(emergency, carla_lights))
+    for emergency in (0, MosaicVehSignal.BLINKER_EMERGENCY)
+    for carla_lights in range(1 << _CARLA_INPUT_BITS))
+_MOSAIC_MANAGED_SIGNALS = functools.reduce(operator.or_, _MOSAIC_SIGNALS_TABLE, 0)
+
+_CARLA_LIGHTS_ARRAY = np.array(_CARLA_LIGHTS_TABLE, dtype=np.int64)
+_MOSAIC_SIGNALS_ARRAY = np.array(_MOSAIC_SIGNALS_TABLE, dtype=np.int64)
+
 # ==================================================================================================
 # -- Bridge helper (MOSAIC <=> CARLA) ----------------------------------------------------------------
 # ==================================================================================================
@@ -36,6 +194,43 @@ class BridgeHelper(object):
     with open('data/vtypes.json') as f:
         _VTYPES = json.load(f)['carla_blueprints']
 
+    # Blueprint indexes built once in set_blueprint_library.
+    _blueprints = {}  # {blueprint_id: blueprint}
+    _vclass_blueprints = {}  # {vclass: [blueprint, ...]}
+    _recommended_colors = {}  # {blueprint_id: [color, ...]} (None if no color attribute)
+    _recommended_driver_ids = {}  # {blueprint_id: [driver_id, ...]} (None if no driver_id attribute)
+
+    @staticmethod
+    def set_blueprint_library(blueprint_library):
+        """
+        Sets the carla blueprint library and builds the indexes used at spawn time.
+        """
+        BridgeHelper.blueprint_library = blueprint_library
+
+        BridgeHelper._blueprints = {}
+        BridgeHelper._vclass_blueprints = {}
+        BridgeHelper._recommended_colors = {}
+        BridgeHelper._recommended_driver_ids = {}
+
+        for blueprint in blueprint_library:
+            BridgeHelper._blueprints[blueprint.id] = blueprint
+
+            if blueprint.id in BridgeHelper._VTYPES:
+                vclass = BridgeHelper._VTYPES[blueprint.id]['vClass']
+                BridgeHelper._vclass_blueprints.setdefault(vclass, []).append(blueprint)
+
+            if blueprint.has_attribute('color'):
+                BridgeHelper._recommended_colors[blueprint.id] = list(
+                    blueprint.get_attribute('color').recommended_values)
+            else:
+                BridgeHelper._recommended_colors[blueprint.id] = None
+
+            if blueprint.has_attribute('driver_id'):
+                BridgeHelper._recommended_driver_ids[blueprint.id] = list(
+                    blueprint.get_attribute('driver_id').recommended_values)
+            else:
+                BridgeHelper._recommended_driver_ids[blueprint.id] = None
+
     @staticmethod
     def get_vehicle_class(carla_actor):
         if carla_actor.type_id in BridgeHelper._VTYPES:
@@ -98,6 +293,36 @@ class BridgeHelper(object):
 
         return out_transform
 
+    @staticmethod
+    def interpolate_transform(from_transform, to_transform, alpha):
+        """
+        Returns the linear interpolation between two carla transforms (alpha in [0, 1]). Angles are
+        interpolated along the shortest arc.
+        """
+        def lerp(a, b):
+            return a + (b - a) * alpha
+
+        def lerp_angle(a, b):
+            return a + ((b - a + 180.0) % 360.0 - 180.0) * alpha
+
+        from_location, to_location = from_transform.location, to_transform.location
+        from_rotation, to_rotation = from_transform.rotation, to_transform.rotation
+        return carla.Transform(
+            carla.Location(lerp(from_location.x, to_location.x), lerp(from_location.y, to_location.y),
+                           lerp(from_location.z, to_location.z)),
+            carla.Rotation(lerp_angle(from_rotation.pitch, to_rotation.pitch),
+                           lerp_angle(from_rotation.yaw, to_rotation.yaw),
+                           lerp_angle(from_rotation.roll, to_rotation.roll)))
+
+    @staticmethod
+    def get_mosaic_location(in_carla_location):
+        """
+        Returns the mosaic (x, y) position of the given carla location, without any bounding box
+        correction (e.g., sensor or area positions).
+        """
+        offset = BridgeHelper.offset
+        return (in_carla_location.x + offset[0], offset[1] - in_carla_location.y)
+
     @staticmethod
     def _get_recommended_carla_blueprint(mosaic_actor):
         """
@@ -105,12 +330,7 @@ class BridgeHelper(object):
         """
         vclass = mosaic_actor.vclass.value
 
-        blueprints = []
-        for blueprint in BridgeHelper.blueprint_library:
-            if blueprint.id in BridgeHelper._VTYPES and \
-               BridgeHelper._VTYPES[blueprint.id]['vClass'] == vclass:
-                blueprints.append(blueprint)
-
+        blueprints = BridgeHelper._vclass_blueprints.get(vclass)
         if not blueprints:
             return None
 
@@ -121,13 +341,10 @@ class BridgeHelper(object):
         """
         Returns an appropriate blueprint based on the received mosaic actor.
         """
-        blueprint_library = BridgeHelper.blueprint_library
         type_id = mosaic_actor.type_id
 
-        if type_id in [bp.id for bp in blueprint_library]:
-            blueprint = blueprint_library.filter(type_id)[0]
-            # logging.debug('[BridgeHelper] mosaic vtype %s found in carla blueprints', type_id)
-        else:
+        blueprint = BridgeHelper._blueprints.get(type_id)
+        if blueprint is None:
             blueprint = BridgeHelper._get_recommended_carla_blueprint(mosaic_actor)
             if blueprint is not None:
                 logging.warning(
@@ -138,16 +355,18 @@ class BridgeHelper(object):
                               type_id)
                 return None
 
-        if blueprint.has_attribute('color'):
+        recommended_colors = BridgeHelper._recommended_colors.get(blueprint.id)
+        if recommended_colors is not None:
             if sync_color:
                 color = "{},{},{}".format(mosaic_actor.color[0], mosaic_actor.color[1],
                                           mosaic_actor.color[2])
             else:
-                color = random.choice(blueprint.get_attribute('color').recommended_values)
+                color = random.choice(recommended_colors)
             blueprint.set_attribute('color', color)
 
-        if blueprint.has_attribute('driver_id'):
-            driver_id = random.choice(blueprint.get_attribute('driver_id').recommended_values)
+        recommended_driver_ids = BridgeHelper._recommended_driver_ids.get(blueprint.id)
+        if recommended_driver_ids is not None:
+            driver_id = random.choice(recommended_driver_ids)
             blueprint.set_attribute('driver_id', driver_id)
 
         blueprint.set_attribute('role_name', 'mosaic_driver')
@@ -234,106 +453,49 @@ class BridgeHelper(object):
         """
         Returns carla vehicle light state based on mosaic signals.
         """
-        current_lights = current_carla_lights
-
-        # Blinker right / emergency.
-        if (any([
-                bool(mosaic_lights & MosaicVehSignal.BLINKER_RIGHT),
-                bool(mosaic_lights & MosaicVehSignal.BLINKER_EMERGENCY)
-        ]) != bool(current_lights & carla.VehicleLightState.RightBlinker)):
-            current_lights ^= carla.VehicleLightState.RightBlinker
-
-        # Blinker left / emergency.
-        if (any([
-                bool(mosaic_lights & MosaicVehSignal.BLINKER_LEFT),
-                bool(mosaic_lights & MosaicVehSignal.BLINKER_EMERGENCY)
-        ]) != bool(current_lights & carla.VehicleLightState.LeftBlinker)):
-            current_lights ^= carla.VehicleLightState.LeftBlinker
-
-        # Brake.
-        if (bool(mosaic_lights & MosaicVehSignal.BRAKELIGHT) !=
-                bool(current_lights & carla.VehicleLightState.Brake)):
-            current_lights ^= carla.VehicleLightState.Brake
-
-        # Front (low beam).
-        if (bool(mosaic_lights & MosaicVehSignal.FRONTLIGHT) !=
-                bool(current_lights & carla.VehicleLightState.LowBeam)):
-            current_lights ^= carla.VehicleLightState.LowBeam
-
-        # Fog.
-        if (bool(mosaic_lights & MosaicVehSignal.FOGLIGHT) !=
-                bool(current_lights & carla.VehicleLightState.Fog)):
-            current_lights ^= carla.VehicleLightState.Fog
-
-        # High beam.
-        if (bool(mosaic_lights & MosaicVehSignal.HIGHBEAM) !=
-                bool(current_lights & carla.VehicleLightState.HighBeam)):
-            current_lights ^= carla.VehicleLightState.HighBeam
-
-        # Backdrive (reverse).
-        if (bool(mosaic_lights & MosaicVehSignal.BACKDRIVE) !=
-                bool(current_lights & carla.VehicleLightState.Reverse)):
-            current_lights ^= carla.VehicleLightState.Reverse
-
-        # Door open left/right.
-        if (any([
-                bool(mosaic_lights & MosaicVehSignal.DOOR_OPEN_LEFT),
-                bool(mosaic_lights & MosaicVehSignal.DOOR_OPEN_RIGHT)
-        ]) != bool(current_lights & carla.VehicleLightState.Position)):
-            current_lights ^= carla.VehicleLightState.Position
-
-        return current_lights
+        return (int(current_carla_lights) & ~_CARLA_MANAGED_LIGHTS) | \
+            _CARLA_LIGHTS_TABLE[mosaic_lights & _MOSAIC_INPUT_MASK]
+
+    @staticmethod
+    def get_carla_lights_states(current_carla_lights, mosaic_lights):
+        """
+        Returns carla vehicle light states based on mosaic signals for a whole array of vehicles.
+
+            :param current_carla_lights: current carla light states (array-like of ints).
+            :param mosaic_lights: mosaic signals (array-like of ints).
+            :return: numpy array with the new carla light states.
+        """
+        current_carla_lights = np.asarray(current_carla_lights, dtype=np.int64)
+        mosaic_lights = np.asarray(mosaic_lights, dtype=np.int64)
+        return (current_carla_lights & ~_CARLA_MANAGED_LIGHTS) | \
+            _CARLA_LIGHTS_ARRAY[mosaic_lights & _MOSAIC_INPUT_MASK]
 
     @staticmethod
     def get_mosaic_lights_state(current_mosaic_lights, carla_lights):
         """
         Returns mosaic signals based on carla vehicle light state.
         """
-        current_lights = current_mosaic_lights
-
-        # Blinker right.
-        if (bool(carla_lights & carla.VehicleLightState.RightBlinker) !=
-                bool(current_lights & MosaicVehSignal.BLINKER_RIGHT)):
-            current_lights ^= MosaicVehSignal.BLINKER_RIGHT
-
-        # Blinker left.
-        if (bool(carla_lights & carla.VehicleLightState.LeftBlinker) !=
-                bool(current_lights & MosaicVehSignal.BLINKER_LEFT)):
-            current_lights ^= MosaicVehSignal.BLINKER_LEFT
-
-        # Emergency.
-        if (all([
-                bool(carla_lights & carla.VehicleLightState.RightBlinker),
-                bool(carla_lights & carla.VehicleLightState.LeftBlinker)
-        ]) != (current_lights & MosaicVehSignal.BLINKER_EMERGENCY)):
-            current_lights ^= MosaicVehSignal.BLINKER_EMERGENCY
-
-        # Break.
-        if (bool(carla_lights & carla.VehicleLightState.Brake) !=
-                bool(current_lights & MosaicVehSignal.BRAKELIGHT)):
-            current_lights ^= MosaicVehSignal.BRAKELIGHT
-
-        # Front (low beam)
-        if (bool(carla_lights & carla.VehicleLightState.LowBeam) !=
-                bool(current_lights & MosaicVehSignal.FRONTLIGHT)):
-            current_lights ^= MosaicVehSignal.FRONTLIGHT
-
-        # Fog light.
-        if (bool(carla_lights & carla.VehicleLightState.Fog) !=
-                bool(current_lights & MosaicVehSignal.FOGLIGHT)):
-            current_lights ^= MosaicVehSignal.FOGLIGHT
-
-        # High beam ligth.
-        if (bool(carla_lights & carla.VehicleLightState.HighBeam) !=
-                bool(current_lights & MosaicVehSignal.HIGHBEAM)):
-            current_lights ^= MosaicVehSignal.HIGHBEAM
-
-        # Backdrive (reverse)
-        if (bool(carla_lights & carla.VehicleLightState.Reverse) !=
-                bool(current_lights & MosaicVehSignal.BACKDRIVE)):
-            current_lights ^= MosaicVehSignal.BACKDRIVE
-
-        return current_lights
+        index = int(carla_lights) & _CARLA_INPUT_MASK
+        if current_mosaic_lights & MosaicVehSignal.BLINKER_EMERGENCY:
+            index |= 1 << _CARLA_INPUT_BITS
+        return (current_mosaic_lights & ~_MOSAIC_MANAGED_SIGNALS) | _MOSAIC_SIGNALS_TABLE[index]
+
+    @staticmethod
+    def get_mosaic_lights_states(current_mosaic_lights, carla_lights):
+        """
+        Returns mosaic signals based on carla vehicle light states for a whole array of vehicles.
+
+            :param current_mosaic_lights: current mosaic signals (array-like of ints).
+            :param carla_lights: carla light states (array-like of ints).
+            :return: numpy array with the new mosaic signals.
+        """
+        current_mosaic_lights = np.asarray(current_mosaic_lights, dtype=np.int64)
+        carla_lights = np.asarray(carla_lights, dtype=np.int64)
+
+        index = carla_lights & _CARLA_INPUT_MASK
+        emergency = (current_mosaic_lights & MosaicVehSignal.BLINKER_EMERGENCY) != 0
+        index |= emergency.astype(np.int64) << _CARLA_INPUT_BITS
+        return (current_mosaic_lights & ~_MOSAIC_MANAGED_SIGNALS) | _MOSAIC_SIGNALS_ARRAY[index]
 
     @staticmethod
     def get_carla_traffic_light_state(mosaic_tl_state):
@@ -13,8 +13,11 @@
 
 import logging
 
+from concurrent import futures
+
 import carla  # pylint: disable=import-error
 
+from .actor_pool import CarlaActorPool
 from .constants import INVALID_ACTOR_ID, SPAWN_OFFSET_Z
 
 # ==================================================================================================
@@ -26,7 +29,7 @@ class CarlaSimulation(object):
     """
     CarlaSimulation is responsible for the management of the carla simulation.
     """
-    def __init__(self, host, port, step_length):
+    def __init__(self, host, port, step_length, substeps=1):
         self.client = carla.Client(host, port)
         self.client.set_timeout(2.0)
 
@@ -34,6 +37,16 @@ class CarlaSimulation(object):
         self.blueprint_library = self.world.get_blueprint_library()
         self.step_length = step_length
 
+        # Number of carla ticks per co-simulation step (see substep).
+        self.substeps = max(int(substeps), 1)
+
+        # Background tick (see tick_async).
+        self._executor = None
+        self._pending_tick = None
+
+        # Optional pool of parked vehicles (see enable_actor_pool).
+        self.actor_pool = None
+
         # The following sets contain updated information for the current frame.
         self._active_actors = set()
         self.spawned_actors = set()
@@ -42,8 +55,8 @@ class CarlaSimulation(object):
         # Set traffic lights.
         self._tls = {}  # {landmark_id: traffic_ligth_actor}
 
-        tmp_map = self.world.get_map()
-        for landmark in tmp_map.get_all_landmarks_of_type('1000001'):
+        self.map = self.world.get_map()
+        for landmark in self.map.get_all_landmarks_of_type('1000001'):
             if landmark.id != '':
                 traffic_ligth = self.world.get_traffic_light(landmark)
                 if traffic_ligth is not None:
@@ -51,6 +64,19 @@ class CarlaSimulation(object):
                 else:
                     logging.warning('Landmark %s is not linked to any traffic light', landmark.id)
 
+    def enable_actor_pool(self, size, blueprints, match_color=False):
+        """
+        Enables the actor pool. Spawned vehicles are taken from the pool and destroyed vehicles are
+        returned to it.
+
+            :param size: number of pre-spawned vehicles (also the maximum number of parked vehicles).
+            :param blueprints: blueprints of the pre-spawned vehicles.
+            :param match_color: whether the color of pooled vehicles has to match the requested one
+                (in which case, the pool is not pre-filled, see CarlaActorPool).
+        """
+        self.actor_pool = CarlaActorPool(self.client, self.world, size, match_color)
+        self.actor_pool.fill(blueprints, size)
+
     def get_actor(self, actor_id):
         """
         Accessor for carla actor.
@@ -110,6 +136,11 @@ class CarlaSimulation(object):
             :param transform: transform where the actor will be spawned.
             :return: actor id if the actor is successfully spawned. Otherwise, INVALID_ACTOR_ID.
         """
+        if self.actor_pool is not None:
+            actor_id = self.actor_pool.acquire(blueprint, transform)
+            if actor_id != INVALID_ACTOR_ID:
+                return actor_id
+
         transform = carla.Transform(transform.location + carla.Location(0, 0, SPAWN_OFFSET_Z),
                                     transform.rotation)
 
@@ -122,12 +153,17 @@ class CarlaSimulation(object):
             logging.error('Spawn carla actor failed. %s', response.error)
             return INVALID_ACTOR_ID
 
+        if self.actor_pool is not None:
+            self.actor_pool.register(response.actor_id, blueprint)
         return response.actor_id
 
     def destroy_actor(self, actor_id):
         """
-        Destroys the given actor.
+        Destroys the given actor. If the actor pool is enabled, the actor is parked instead.
         """
+        if self.actor_pool is not None and self.actor_pool.release(actor_id):
+            return True
+
         actor = self.world.get_actor(actor_id)
         if actor is not None:
             return actor.destroy()
@@ -151,6 +187,19 @@ class CarlaSimulation(object):
             vehicle.set_light_state(carla.VehicleLightState(lights))
         return True
 
+    def synchronize_vehicle_transforms(self, vehicle_ids, transforms):
+        """
+        Updates the transform of several vehicles at once (single command batch).
+
+            :param vehicle_ids: ids of the actors to be updated.
+            :param transforms: new vehicle transforms.
+        """
+        batch = [
+            carla.command.ApplyTransform(vehicle_id, transform)
+            for vehicle_id, transform in zip(vehicle_ids, transforms)
+        ]
+        self.client.apply_batch(batch)
+
     def synchronize_traffic_light(self, landmark_id, state):
         """
         Updates traffic light state.
@@ -167,22 +216,74 @@ class CarlaSimulation(object):
         traffic_light.set_state(state)
         return True
 
+    @property
+    def substep_length(self):
+        """
+        Fixed delta seconds of carla.
+        """
+        return self.step_length / self.substeps
+
+    def substep(self):
+        """
+        Intermediate tick to carla simulation. Unlike tick, the actor bookkeeping is not updated.
+        """
+        self.world.tick()
+
     def tick(self):
         """
         Tick to carla simulation.
         """
         self.world.tick()
-        # Update data structures for the current frame.
+        self._update_frame()
+
+    def tick_async(self):
+        """
+        Starts a tick to carla simulation in the background. The world must not be used until
+        wait_tick returns.
+        """
+        if self._executor is None:
+            self._executor = futures.ThreadPoolExecutor(max_workers=1)
+        self.wait_tick()
+        self._pending_tick = self._executor.submit(self.world.tick)
+
+    def wait_tick(self):
+        """
+        Waits for the background tick, if any, and updates the data structures for the new frame.
+        """
+        if self._pending_tick is None:
+            return
+
+        pending_tick, self._pending_tick = self._pending_tick, None
+        pending_tick.result()
+        self._update_frame()
+
+    def _update_frame(self):
+        """
+        Updates the data structures for the current frame.
+        """
         current_actors = set(
             [vehicle.id for vehicle in self.world.get_actors().filter('vehicle.*')])
+        if self.actor_pool is not None:
+            current_actors -= self.actor_pool.parked_actor_ids
         self.spawned_actors = current_actors.difference(self._active_actors)
         self.destroyed_actors = self._active_actors.difference(current_actors)
         self._active_actors = current_actors
 
+        if self.actor_pool is not None:
+            self.actor_pool.end_tick()
+
     def close(self):
         """
         Closes carla client.
         """
+        self.wait_tick()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+        if self.actor_pool is not None:
+            logging.info('%s', self.actor_pool)
+            self.actor_pool.destroy()
+
         for actor in self.world.get_actors():
             if actor.type_id == 'traffic.traffic_light':
                 actor.freeze(False)
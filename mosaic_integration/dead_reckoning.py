@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides dead reckoning of mosaic actors without fresh updates. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+
+import carla  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- dead reckoning --------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Last fresh pose of an actor, its velocity and yaw rate estimates and the current correction (offset
+# of the displayed pose) used to converge smoothly after a prediction error.
+_ActorState = collections.namedtuple('_ActorState',
+                                     'time x y z pitch yaw vx vy vz yaw_rate correction')
+
+
+def _wrap_angle(angle):
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+class DeadReckoning(object):
+    """
+    DeadReckoning estimates the velocity and yaw rate of each actor from its last two fresh poses
+    and extrapolates its pose when there is no fresh update. When a fresh update arrives, the
+    prediction error is not applied at once but it decays geometrically.
+
+        :param horizon: maximum extrapolation time (seconds). Afterwards, the actor is held.
+        :param convergence: fraction of the prediction error kept at each step, in [0, 1). 0 snaps
+            back immediately.
+    """
+    def __init__(self, horizon=0.5, convergence=0.5):
+        self.horizon = horizon
+        self.convergence = min(max(convergence, 0.0), 0.99)
+
+        self._states = {}  # {actor_id: _ActorState}
+
+    def _extrapolate(self, state, time):
+        dt = min(max(time - state.time, 0.0), self.horizon)
+        return (state.x + state.vx * dt, state.y + state.vy * dt, state.z + state.vz * dt,
+                state.yaw + state.yaw_rate * dt)
+
+    @staticmethod
+    def _get_transform(pose, pitch, correction):
+        x, y, z, yaw = (value + delta for value, delta in zip(pose, correction))
+        return carla.Transform(carla.Location(x, y, z), carla.Rotation(pitch, yaw, 0.0))
+
+    def update(self, actor_id, transform, time):
+        """
+        Registers a fresh transform of the given actor.
+
+            :return: transform to be applied (the fresh one plus the decaying correction).
+        """
+        location, rotation = transform.location, transform.rotation
+        pose = (location.x, location.y, location.z, rotation.yaw)
+
+        previous = self._states.get(actor_id)
+        if previous is not None and time > previous.time:
+            dt = time - previous.time
+            velocity = ((pose[0] - previous.x) / dt, (pose[1] - previous.y) / dt,
+                        (pose[2] - previous.z) / dt)
+            yaw_rate = _wrap_angle(pose[3] - previous.yaw) / dt
+
+            # Error between the pose that would have been displayed and the fresh one.
+            displayed = [
+                value + delta
+                for value, delta in zip(self._extrapolate(previous, time), previous.correction)
+            ]
+            errors = [displayed[i] - pose[i] for i in range(3)]
+            errors.append(_wrap_angle(displayed[3] - pose[3]))
+            correction = tuple(error * self.convergence for error in errors)
+        else:
+            velocity, yaw_rate = (0.0, 0.0, 0.0), 0.0
+            correction = (0.0, 0.0, 0.0, 0.0)
+
+        self._states[actor_id] = _ActorState(time, pose[0], pose[1], pose[2], rotation.pitch, pose[3],
+                                             velocity[0], velocity[1], velocity[2], yaw_rate,
+                                             correction)
+        return self._get_transform(pose, rotation.pitch, correction)
+
+    def predict(self, actor_id, time):
+        """
+        Returns the extrapolated transform of the given actor at the given time. If the actor has
+        never been updated, returns None.
+        """
+        state = self._states.get(actor_id)
+        if state is None:
+            return None
+
+        # The correction keeps decaying while extrapolating.
+        correction = tuple(delta * self.convergence for delta in state.correction)
+        self._states[actor_id] = state._replace(correction=correction)
+        return self._get_transform(self._extrapolate(state, time), state.pitch, correction)
+
+    def retain(self, actor_ids):
+        """
+        Forgets all the actors but the given ones.
+        """
+        self._states = {i: s for i, s in self._states.items() if i in actor_ids}
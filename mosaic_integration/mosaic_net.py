@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides helpers to read mosaic (sumo) nets. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import sys
+
+import lxml.etree as ET  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- constants -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+NET_CACHE_DIR = os.path.join('data', 'cache')
+NET_CACHE_VERSION = 1
+
+# Maximum number of compiled nets kept in the cache. The least recently used ones are removed.
+NET_CACHE_SIZE = 8
+
+# Leading xml declaration and comments of a net, not hashed (see _get_net_hash).
+_NET_HEADER = re.compile(br'\A\s*(?:<\?xml[^>]*\?>\s*)?(?:<!--.*?-->\s*)*', re.DOTALL)
+
+# ==================================================================================================
+# -- mosaic net ------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def get_net_file(cfg_file):
+    """
+    Returns the mosaic net filename referenced by the given mosaic configuration file. If the
+    configuration does not contain any net, returns None.
+    """
+    cfg_file = os.path.join(os.getcwd(), cfg_file)
+
+    tree = ET.parse(cfg_file)
+    tag = tree.find('.//net-file')
+    if tag is None:
+        return None
+
+    return os.path.join(os.path.dirname(cfg_file), tag.get('value'))
+
+
+def read_net_offset(net_file):
+    """
+    Returns the location offset of the given mosaic net.
+
+    Only the net header is parsed: the parser stops at the <location> element, which comes before
+    any edge or junction of the net.
+    """
+    for _, element in ET.iterparse(net_file, events=('start',), tag='location'):
+        net_offset = element.get('netOffset')
+        if net_offset is None:
+            break
+
+        x, y = net_offset.split(',')
+        return (float(x), float(y))
+
+    logging.warning('Net file %s does not define any location offset', net_file)
+    return (0, 0)
+
+
+def read_net(net_file):
+    """
+    Returns the full mosaic net (sumolib.net.Net).
+    """
+    if 'SUMO_HOME' in os.environ:
+        tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+        if tools not in sys.path:
+            sys.path.append(tools)
+
+    import sumolib  # pylint: disable=import-error, import-outside-toplevel
+
+    logging.debug('Reading net file: %s', net_file)
+    return sumolib.net.readNet(net_file)
+
+
+# ==================================================================================================
+# -- compiled net ----------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class CompiledConnection(object):
+    """
+    Compiled counterpart of sumolib.net.connection.Connection.
+    """
+    def __init__(self, from_lane, to_lane, allowed, params):
+        self._from_lane = from_lane
+        self._to_lane = to_lane
+        self._allowed = allowed
+        self._params = params
+
+    def getFromLane(self):
+        return self._from_lane
+
+    def getToLane(self):
+        return self._to_lane
+
+    def getFrom(self):
+        return self._from_lane.getEdge()
+
+    def getTo(self):
+        return self._to_lane.getEdge()
+
+    def allows(self, vclass):
+        if vclass is None or vclass == 'ignoring' or self._allowed is None:
+            return True
+        return vclass in self._allowed
+
+    def getParam(self, key, default=None):
+        return self._params.get(key, default)
+
+
+class CompiledLane(object):
+    """
+    Compiled counterpart of sumolib.net.lane.Lane.
+    """
+    def __init__(self, edge, lane_id, index, allowed, params):
+        self._edge = edge
+        self._id = lane_id
+        self._index = index
+        self._allowed = allowed
+        self._params = params
+
+    def getID(self):
+        return self._id
+
+    def getIndex(self):
+        return self._index
+
+    def getEdge(self):
+        return self._edge
+
+    def getPermissions(self):
+        return self._allowed
+
+    def allows(self, vclass):
+        if vclass is None or vclass == 'ignoring':
+            return True
+        return vclass in self._allowed
+
+    def getParam(self, key, default=None):
+        return self._params.get(key, default)
+
+
+class CompiledEdge(object):
+    """
+    Compiled counterpart of sumolib.net.edge.Edge.
+    """
+    def __init__(self, edge_id, function):
+        self._id = edge_id
+        self._function = function
+        self._lanes = []
+        self._outgoing = {}  # {to_edge: [connection, ...]}
+
+    def getID(self):
+        return self._id
+
+    def getFunction(self):
+        return self._function
+
+    def getLanes(self):
+        return self._lanes
+
+    def getOutgoing(self):
+        return self._outgoing
+
+    def getConnections(self, to_edge):
+        return self._outgoing.get(to_edge, [])
+
+    def getAllowedOutgoing(self, vclass):
+        if vclass is None or vclass == 'ignoring':
+            return self._outgoing
+
+        result = {}
+        for edge, connections in self._outgoing.items():
+            allowed = [
+                c for c in connections
+                if c.getFromLane().allows(vclass) and c.getToLane().allows(vclass) and c.allows(vclass)
+            ]
+            if allowed:
+                result[edge] = allowed
+        return result
+
+    def allows(self, vclass):
+        return any(lane.allows(vclass) for lane in self._lanes)
+
+
+class CompiledNet(object):
+    """
+    CompiledNet is a lightweight, quickly loadable mosaic net. It only contains the parts of a
+    sumolib net used by the co-simulation tools (edges, lanes, vehicle class permissions, outgoing
+    connections, 'origId' parameters and location offset) and it implements the same accessors.
+    """
+    def __init__(self, data):
+        self._location_offset = tuple(data['offset'])
+        self._edges = []
+        self._id_to_edge = {}
+
+        permissions = [frozenset(allowed) for allowed in data['permissions']]
+
+        lanes = {}
+        for edge_id, function, edge_lanes in data['edges']:
+            edge = CompiledEdge(edge_id, function)
+            for lane_id, index, permission, params in edge_lanes:
+                lane = CompiledLane(edge, lane_id, index, permissions[permission], params)
+                edge.getLanes().append(lane)
+                lanes[lane_id] = lane
+
+            self._edges.append(edge)
+            self._id_to_edge[edge_id] = edge
+
+        for from_lane_id, to_lane_id, permission, params in data['connections']:
+            from_lane, to_lane = lanes[from_lane_id], lanes[to_lane_id]
+            allowed = permissions[permission] if permission is not None else None
+
+            connection = CompiledConnection(from_lane, to_lane, allowed, params)
+            from_lane.getEdge().getOutgoing().setdefault(to_lane.getEdge(), []).append(connection)
+
+    def getLocationOffset(self):
+        return self._location_offset
+
+    def getEdges(self):
+        return self._edges
+
+    def hasEdge(self, edge_id):
+        return edge_id in self._id_to_edge
+
+    def getEdge(self, edge_id):
+        return self._id_to_edge[edge_id]
+
+
+def compile_net(net):
+    """
+    Returns the compact (picklable) representation of the given sumolib net used by CompiledNet.
+    """
+    permissions = []  # Distinct vehicle class permissions, shared by lanes and connections.
+    permission_index = {}
+
+    def get_permission(allowed):
+        allowed = frozenset(allowed)
+        if allowed not in permission_index:
+            permission_index[allowed] = len(permissions)
+            permissions.append(sorted(allowed))
+        return permission_index[allowed]
+
+    edges = []
+    connections = []
+    for edge in net.getEdges():
+        lanes = []
+        for lane in edge.getLanes():
+            params = {}
+            if lane.getParam('origId') is not None:
+                params['origId'] = lane.getParam('origId')
+            lanes.append((lane.getID(), lane.getIndex(), get_permission(lane.getPermissions()), params))
+        edges.append((edge.getID(), edge.getFunction(), lanes))
+
+        for to_edge_connections in edge.getOutgoing().values():
+            for connection in to_edge_connections:
+                from_lane, to_lane = connection.getFromLane(), connection.getToLane()
+
+                # Connections only restrict vehicle classes in a few cases. Otherwise, there is no
+                # need to store them.
+                permission = None
+                if hasattr(connection, 'allows'):
+                    allowed = frozenset(vclass for vclass in from_lane.getPermissions()
+                                        if connection.allows(vclass))
+                    if allowed != frozenset(from_lane.getPermissions()):
+                        permission = get_permission(allowed)
+
+                params = {}
+                if connection.getParam('origId') is not None:
+                    params['origId'] = connection.getParam('origId')
+                connections.append((from_lane.getID(), to_lane.getID(), permission, params))
+
+    return {
+        'version': NET_CACHE_VERSION,
+        'offset': tuple(net.getLocationOffset()),
+        'permissions': permissions,
+        'edges': edges,
+        'connections': connections
+    }
+
+
+def _get_net_hash(net_file, cache_dir):
+    """
+    Returns the content hash of the given net, without its leading xml declaration and comments:
+    netconvert writes there the generation date and the output file, which change at every
+    generation of the same net.
+
+    The hashes are remembered in the cache index together with the size and modification time of
+    the net, so that an unchanged net is not read again. The index only saves the hashing: the
+    cache itself is keyed by content, which also holds for nets regenerated at every launch (e.g.,
+    in a temporary folder by spawn_npc_mosaic.py).
+    """
+    index_file = os.path.join(cache_dir, 'net_index.json')
+    try:
+        with open(index_file, encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    net_file = os.path.realpath(net_file)
+    stat = os.stat(net_file)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+
+    entry = index.get(net_file)
+    if entry is not None and entry[:2] == stamp:
+        return entry[2]
+
+    sha = hashlib.sha1()
+    with open(net_file, 'rb') as f:
+        chunk = f.read(1 << 20)
+        sha.update(chunk[_NET_HEADER.match(chunk).end():])
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    net_hash = sha.hexdigest()
+
+    # Nets that no longer exist are forgotten.
+    index = {path: entry for path, entry in index.items() if os.path.exists(path)}
+    index[net_file] = stamp + [net_hash]
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = index_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_file, index_file)
+    except OSError as error:
+        logging.warning('Net cache index could not be stored in %s: %s', cache_dir, error)
+
+    return net_hash
+
+
+def _get_net_cache_file(net_file, cache_dir):
+    """
+    Returns the cache file of the given net, keyed by the content hash of the net.
+    """
+    basename = os.path.basename(net_file)
+    return os.path.join(cache_dir, '{}-{}.pickle'.format(basename,
+                                                         _get_net_hash(net_file, cache_dir)))
+
+
+def _prune_net_cache(cache_dir, size=NET_CACHE_SIZE):
+    """
+    Removes the least recently used compiled nets beyond the given cache size.
+    """
+    cache_files = sorted(glob.glob(os.path.join(cache_dir, '*.pickle')),
+                         key=os.path.getmtime,
+                         reverse=True)
+    for cache_file in cache_files[size:]:
+        try:
+            os.remove(cache_file)
+            logging.debug('Removed compiled net: %s', cache_file)
+        except OSError:
+            pass
+
+
+def load_net(net_file, reader=read_net, cache_dir=NET_CACHE_DIR):
+    """
+    Returns the mosaic net using the compiled net cache.
+
+    On a cache hit, a CompiledNet is returned. Otherwise, the net is read with the given reader (e.g.,
+    sumolib.net.readNet), compiled and stored in the cache for the next launches.
+
+        :param net_file: mosaic net file (*.net.xml)
+        :param reader: function used to read the full net on a cache miss.
+        :param cache_dir: cache directory.
+        :return: CompiledNet on a cache hit. Otherwise, the net returned by the reader.
+    """
+    cache_file = _get_net_cache_file(net_file, cache_dir)
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('version') == NET_CACHE_VERSION:
+                logging.debug('Reading compiled net: %s', cache_file)
+                net = CompiledNet(data)
+                try:
+                    os.utime(cache_file)  # Recently used (see _prune_net_cache).
+                except OSError:
+                    pass
+                return net
+        except (pickle.UnpicklingError, EOFError, AttributeError, KeyError, ValueError) as error:
+            logging.warning('Ignoring invalid compiled net %s: %s', cache_file, error)
+
+    net = reader(net_file)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(compile_net(net), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+        _prune_net_cache(cache_dir)
+    except OSError as error:
+        logging.warning('Compiled net could not be stored in %s: %s', cache_dir, error)
+
+    return net
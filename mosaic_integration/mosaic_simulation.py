@@ -14,29 +14,19 @@
 import collections
 import enum
 import logging
-import os
+import threading
 import numpy as np
 
 import carla  # pylint: disable=import-error
 
-import os, sys
-if 'SUMO_HOME' in os.environ:
-    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
-    sys.path.append(tools)
-else:   
-    sys.exit("please declare environment variable 'SUMO_HOME'")
-
-import sumolib  # pylint: disable=import-error
-import traci  # pylint: disable=import-error
-
 import grpc
 
 import CarlaLink_pb2
 import CarlaLink_pb2_grpc
 
 from .constants import INVALID_ACTOR_ID
-
-import lxml.etree as ET  # pylint: disable=import-error
+from .mosaic_net import get_net_file, load_net, read_net_offset
+from .sensor_registry import process_lidar
 
 # ==================================================================================================
 # -- mosaic definitions ------------------------------------------------------------------------------
@@ -119,26 +109,6 @@ MosaicActor = collections.namedtuple('MosaicActor', 'type_id vclass transform si
 # -- mosaic simulation -------------------------------------------------------------------------------
 # ==================================================================================================
 
-def _get_mosaic_net(cfg_file):
-    """
-    Returns mosaic net.
-
-    This method reads the mosaic configuration file and retrieve the mosaic net filename to create the
-    net.
-    """
-    cfg_file = os.path.join(os.getcwd(), cfg_file)
-
-    tree = ET.parse(cfg_file)
-    tag = tree.find('//net-file')
-    if tag is None:
-        return None
-
-    net_file = os.path.join(os.path.dirname(cfg_file), tag.get('value'))
-    logging.debug('Reading net file: %s', net_file)
-
-    mosaic_net = traci.sumolib.net.readNet(net_file)
-    return mosaic_net
-
 class MosaicSimulation(object):
     """
     MosaicSimulation is responsible for the management of the mosaic simulation.
@@ -161,8 +131,14 @@ class MosaicSimulation(object):
             logging.info('Connection to grpc server. Host: %s Port: %s', host, port)
             stub = CarlaLink_pb2_grpc.CarlaLinkServiceStub(host + ":" + port)
 
-        # Retrieving net from configuration file.
-        self.net = _get_mosaic_net(cfg_file)
+        # Retrieving net from configuration file. Only the net offset is read at startup, the full
+        # net is loaded on demand (see net property).
+        self.net_file = get_net_file(cfg_file)
+        if self.net_file is not None:
+            self._net_offset = read_net_offset(self.net_file)
+        else:
+            self._net_offset = (0, 0)
+        self._net = None
 
         # Variable to assign an id to new added actors.
         self._sequential_id = 0
@@ -173,6 +149,21 @@ class MosaicSimulation(object):
         self.traffic_light_ids = set()
         self.step_result = CarlaLink_pb2.StepResult()
 
+        # Sensor data produced since the last step. Sensor callbacks may run on other threads (e.g.,
+        # during a background carla tick), so it is only accessed under the lock and taken as a whole
+        # by the step (see take_sensor_data). It is kept in a step result, which the step then
+        # completes, as adding a message to another one copies it.
+        self._sensor_data = CarlaLink_pb2.StepResult()
+        self._sensor_data_lock = threading.Lock()
+
+        # Vehicle table of the grpc server ({actor_id: CarlaLink_pb2.Vehicle}), only available when
+        # the server runs in the same process (see CarlaLinkServiceServicer). It allows reading the
+        # positions of all the vehicles without a request per vehicle.
+        self.vehicles = None
+        # Ids of the vehicles updated by mosaic since the last step, only available under the same
+        # conditions. If not available, all the vehicles are considered updated.
+        self.updated_actors = None
+
     @staticmethod
     def subscribe(actor_id):
         """
@@ -197,13 +188,20 @@ class MosaicSimulation(object):
         [Is kept to make future implementations and updates easier, but can be removed]
         """
 
+    @property
+    def net(self):
+        """
+        Mosaic net. It is loaded the first time it is accessed (see mosaic_net.load_net).
+        """
+        if self._net is None and self.net_file is not None:
+            self._net = load_net(self.net_file)
+        return self._net
+
     def get_net_offset(self):
         """
         Accessor for mosaic net offset.
         """
-        if self.net is None:
-            return (0, 0)
-        return self.net.getLocationOffset()
+        return self._net_offset
 
     @staticmethod
     def get_actor(actor_id):
@@ -249,6 +247,41 @@ class MosaicSimulation(object):
 
         return MosaicActor(type_id, vclass, transform, signals, extent, color)
 
+    def is_updated(self, actor_id):
+        """
+        Whether mosaic sent a fresh update of the given actor for the current step.
+        """
+        return self.updated_actors is None or actor_id in self.updated_actors
+
+    def get_actor_locations(self, actor_ids):
+        """
+        Returns the (x, y) mosaic positions of the given actors as a (N, 2) array.
+        """
+        locations = np.empty((len(actor_ids), 2))
+        for i, actor_id in enumerate(actor_ids):
+            if self.vehicles is not None:
+                vehicle = self.vehicles[actor_id]
+            else:
+                vehicle = stub.GetActor(CarlaLink_pb2.ActorRequest(actor_id=actor_id))
+            locations[i] = (vehicle.location.x, vehicle.location.y)
+        return locations
+
+    def get_actor_poses(self, actor_ids):
+        """
+        Returns the mosaic poses of the given actors as a (N, 6) array: x, y, z (front bumper),
+        heading (degrees, clockwise from the north), length and width.
+        """
+        poses = np.empty((len(actor_ids), 6))
+        for i, actor_id in enumerate(actor_ids):
+            if self.vehicles is not None:
+                vehicle = self.vehicles[actor_id]
+            else:
+                vehicle = stub.GetActor(CarlaLink_pb2.ActorRequest(actor_id=actor_id))
+            poses[i] = (vehicle.location.x, vehicle.location.y, vehicle.location.z,
+                        vehicle.rotation.angle, float(vehicle.length or 3.97),
+                        float(vehicle.width or 1.86))
+        return poses
+
     def spawn_actor(self, type_id, class_id, color=None):
         """
         Spawns a new actor.
@@ -325,55 +358,38 @@ class MosaicSimulation(object):
         # logging.debug("Mosaic sync TL: %s with state: %s", landmark_id, state)
         self.step_result.traffic_light_updates.append(CarlaLink_pb2.TrafficLight(landmark_id = landmark_id, state = state))
 
-    def process_lidar(self, data, sensor_id):
+    def process_lidar(self, data, sensor_id, point_stride=1):
         """
         Transfer of LIDAR sensor data to the stepResult that get transferred to Mosaic
         :param data: LIDAR data
         :param sensor_id: ID of the vehicle the sensor is attached to
+        :param point_stride: only one point out of point_stride is transferred
         :return:
         """
-        timestamp = str(data.timestamp)
-        logging.debug("Create sensor data for sensor:", sensor_id, "at", timestamp)
-
-        # code taken from lidar_to_camera.py example by Carla
-        # Get the lidar data and convert it to a numpy array.
-        p_cloud_size = len(data)
-        p_cloud = np.copy(np.frombuffer(data.raw_data, dtype=np.dtype('f4')))
-        p_cloud = np.reshape(p_cloud, (p_cloud_size, 4))
-
-        # Lidar intensity array of shape (p_cloud_size,) but, for now, let's
-        # focus on the 3D points.
-        intensity = np.array(p_cloud[:, 3])
-
-        # Point cloud in lidar sensor space array of shape (3, p_cloud_size).
-        local_lidar_points = np.array(p_cloud[:, :3]).T
-
-        # Add an extra 1.0 at the end of each 3d point so it becomes of
-        # shape (4, p_cloud_size) and it can be multiplied by a (4, 4) matrix.
-        local_lidar_points = np.r_[local_lidar_points, [np.ones(local_lidar_points.shape[1])]]
+        self.process_sensor_data(data, sensor_id, process_lidar, point_stride=point_stride)
 
-        # This (4, 4) matrix transforms the points from lidar space to world space.
-        lidar_2_world = data.transform.get_matrix()
-        # Transform the points from lidar space to world space.
-        world_points = np.dot(lidar_2_world, local_lidar_points)
-
-        # apply offset to Mosaic
-        offset = [[self.get_net_offset()[0]], [-self.get_net_offset()[1]], [0], [0]]
-        world_points_with_offset = world_points + offset
-        # mirror y axis
-        world_points_with_offset *= [[1], [-1], [1], [1]]
-        # lose unnecessary 4th row
-        world_points_with_offset = world_points_with_offset[:3, :]
-
-        sensor_location = CarlaLink_pb2.Location(x = float(data.transform.location.x), y = float(data.transform.location.y), z = float(data.transform.location.z))
-        sensor_data = CarlaLink_pb2.SensorData(id = sensor_id, timestamp = timestamp, minRange = 0, maxRange = 300, location = sensor_location)
-
-        for i, intensity_value in enumerate(intensity):
-            if intensity_value > 0:
-                lidar_point = CarlaLink_pb2.Location(x = float(world_points_with_offset[0][i]), y = float(world_points_with_offset[1][i]), z = float(world_points_with_offset[2][i]))
-                sensor_data.lidar_points.append(lidar_point)
+    def process_sensor_data(self, data, sensor_id, processor, options=None, point_stride=1):
+        """
+        Transfer of sensor data to the stepResult that get transferred to Mosaic
+        :param data: sensor measurement
+        :param sensor_id: ID of the sensor
+        :param processor: conversion of the measurement to SensorData (see SENSOR_TYPES)
+        :param options: bridge options of the sensor
+        :param point_stride: only one point out of point_stride is transferred
+        :return:
+        """
+        logging.debug('Create sensor data for sensor: %s at %s', sensor_id, data.timestamp)
+        sensor_data = processor(data, sensor_id, self.get_net_offset(), options, point_stride)
+        with self._sensor_data_lock:
+            self._sensor_data.sensor_data.append(sensor_data)
 
-        self.step_result.sensor_data.append(sensor_data)
+    def take_sensor_data(self):
+        """
+        Returns a new step result holding the sensor data produced since the last call.
+        """
+        with self._sensor_data_lock:
+            step_result, self._sensor_data = self._sensor_data, CarlaLink_pb2.StepResult()
+        return step_result
 
     def tick(self):
         """
@@ -387,6 +403,7 @@ class MosaicSimulation(object):
         del self.step_result.remove_actors[:]
         del self.step_result.add_actors[:]
         del self.step_result.traffic_light_updates[:]
+        del self.step_result.sensor_data[:]
         
         departed_actors = stub.GetDepartedIDList(CarlaLink_pb2.Empty())
         arrived_actors = stub.GetArrivedIDList(CarlaLink_pb2.Empty())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the adaptive quality degradation of the co-simulation under overload. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+import logging
+import time
+
+# ==================================================================================================
+# -- quality levels --------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Quality of the co-simulation at each overload level:
+#   lidar_interval: only the sensor measurements of one carla frame out of lidar_interval are sent.
+#   point_stride: only one point (or radar detection) out of point_stride is sent.
+#   far_interval: vehicles beyond the mid range of the sensors (see update tiers) are only updated in
+#       carla every far_interval ticks.
+#   max_spawns: maximum number of spawns per tick (0 for no limit), the rest are deferred.
+QualityLevel = collections.namedtuple('QualityLevel',
+                                      'lidar_interval point_stride far_interval max_spawns')
+
+QUALITY_LEVELS = (
+    QualityLevel(lidar_interval=1, point_stride=1, far_interval=1, max_spawns=0),
+    QualityLevel(lidar_interval=1, point_stride=2, far_interval=1, max_spawns=4),
+    QualityLevel(lidar_interval=2, point_stride=2, far_interval=5, max_spawns=2),
+    QualityLevel(lidar_interval=2, point_stride=4, far_interval=10, max_spawns=1),
+    QualityLevel(lidar_interval=4, point_stride=4, far_interval=20, max_spawns=1),
+)
+
+
+def describe_quality(quality):
+    """
+    Returns a short human readable description of the given quality level.
+    """
+    return 'lidar every {} frames, 1/{} points, far vehicles every {} ticks, {} spawns per tick'.format(
+        quality.lidar_interval, quality.point_stride, quality.far_interval,
+        quality.max_spawns if quality.max_spawns > 0 else 'unlimited')
+
+
+# ==================================================================================================
+# -- overload controller ---------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class OverloadController(object):
+    """
+    OverloadController measures the time of each tick and moves between the quality levels to keep
+    the moving average tick time within the budget. The level is raised (lower quality) when the
+    average exceeds the budget and lowered back once it is under low_watermark * budget. The
+    average is computed over the ticks run at the current level only, so that every change is
+    judged on a full window.
+
+        :param budget: tick time budget, in seconds (e.g., step length / real-time factor).
+        :param window: number of ticks of the moving average.
+        :param low_watermark: fraction of the budget under which the quality is restored.
+        :param levels: quality levels, from the full quality to the most degraded one.
+    """
+    def __init__(self, budget, window=20, low_watermark=0.7, levels=QUALITY_LEVELS):
+        self.budget = budget
+        self.window = max(window, 1)
+        self.low_watermark = low_watermark
+        self.levels = levels
+
+        self.level = 0
+        self.changes = 0
+        self._start = None
+        self._elapsed = collections.deque(maxlen=self.window)
+        self._ticks = [0] * len(levels)  # Ticks run at each level.
+
+    @property
+    def quality(self):
+        """
+        Quality of the current level (QualityLevel).
+        """
+        return self.levels[self.level]
+
+    @property
+    def average(self):
+        """
+        Moving average of the tick time at the current level, in seconds.
+        """
+        if not self._elapsed:
+            return 0.0
+        return sum(self._elapsed) / len(self._elapsed)
+
+    def start_tick(self):
+        """
+        Starts timing a tick.
+        """
+        self._start = time.perf_counter()
+
+    def end_tick(self):
+        """
+        Ends timing a tick and updates the level.
+
+            :return: True if the level changed. Otherwise, False.
+        """
+        if self._start is None:
+            return False
+
+        self._elapsed.append(time.perf_counter() - self._start)
+        self._start = None
+        self._ticks[self.level] += 1
+
+        if len(self._elapsed) < self.window:
+            return False
+
+        average = self.average
+        if average > self.budget and self.level < len(self.levels) - 1:
+            self._set_level(self.level + 1, average)
+            return True
+        if average < self.low_watermark * self.budget and self.level > 0:
+            self._set_level(self.level - 1, average)
+            return True
+        return False
+
+    def _set_level(self, level, average):
+        log = logging.warning if level > self.level else logging.info
+        log('overload: average tick %.1f ms (budget %.1f ms), quality level %d -> %d (%s)',
+            1000.0 * average, 1000.0 * self.budget, self.level, level,
+            describe_quality(self.levels[level]))
+
+        self.level = level
+        self.changes += 1
+        self._elapsed.clear()
+
+    def __str__(self):
+        total = sum(self._ticks)
+        shares = ', '.join('{}: {:.1f}%'.format(level, 100.0 * ticks / total)
+                           for level, ticks in enumerate(self._ticks) if ticks > 0)
+        return 'overload: {} level changes, ticks per quality level ({})'.format(
+            self.changes, shares)
+
+    def close(self):
+        """
+        Logs the time spent at each level.
+        """
+        if sum(self._ticks) > 0:
+            logging.info('%s', self)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the real-time pacing of the co-simulation steps. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+import logging
+import time
+
+import numpy as np
+
+# ==================================================================================================
+# -- pacer -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class Pacer(object):
+    """
+    Pacer runs a step loop at a target real-time factor. Steps are scheduled against absolute
+    deadlines (start + n * period), so that the error of each sleep does not accumulate: a step that
+    ends late shortens the wait of the following ones until the loop is back on schedule.
+
+    A step that ends after its deadline is a missed deadline and its lateness is recorded. If the
+    lateness exceeds max_lag, the schedule is restarted from that step instead of running the
+    following steps back to back to catch up.
+
+        :param step_length: simulated seconds per step.
+        :param real_time_factor: simulated seconds per wall clock second (e.g., 2.0 runs twice as fast
+            as real time). 0 runs as fast as possible (no waits, only statistics).
+        :param max_lag: maximum lateness (seconds) recovered by catching up.
+        :param window: number of steps used for the rolling percentiles.
+        :param log_interval: number of steps between logged summaries (0 to disable them).
+    """
+    def __init__(self, step_length, real_time_factor=1.0, max_lag=1.0, window=1000, log_interval=0):
+        self.step_length = step_length
+        self.real_time_factor = real_time_factor
+        self.max_lag = max_lag
+        self.log_interval = log_interval
+
+        self.steps = 0
+        self.missed = 0
+        self.resyncs = 0
+        self._first = None  # Start of the first step (achieved real-time factor).
+        self._start = None  # Start of the current schedule.
+        self._scheduled = 0  # Steps since the start of the current schedule.
+        self._lateness = collections.deque(maxlen=window)
+
+    @property
+    def period(self):
+        """
+        Wall clock seconds per step (0 if not paced).
+        """
+        if self.real_time_factor <= 0:
+            return 0.0
+        return self.step_length / self.real_time_factor
+
+    def start(self):
+        """
+        Starts the schedule: the first step ends one period from now.
+        """
+        self._start = time.perf_counter()
+        if self._first is None:
+            self._first = self._start
+        self._scheduled = 0
+
+    def wait(self):
+        """
+        Ends the current step, waiting until its deadline. The schedule is started by the first call
+        if start was not called.
+        """
+        if self._start is None:
+            self.start()
+            return
+
+        now = time.perf_counter()
+        self.steps += 1
+        self._scheduled += 1
+
+        period = self.period
+        if period > 0:
+            lateness = now - (self._start + self._scheduled * period)
+            self._lateness.append(max(lateness, 0.0))
+            if lateness > 0:
+                self.missed += 1
+                if lateness > self.max_lag:
+                    self.resyncs += 1
+                    self._start, self._scheduled = now, 0
+            else:
+                time.sleep(-lateness)
+
+        if self.log_interval > 0 and self.steps % self.log_interval == 0:
+            logging.info('%s', self)
+
+    @property
+    def achieved_real_time_factor(self):
+        """
+        Simulated seconds per wall clock second since the first step.
+        """
+        if self._first is None or self.steps == 0:
+            return 0.0
+        return self.steps * self.step_length / (time.perf_counter() - self._first)
+
+    def summary(self):
+        """
+        Returns the deadline statistics: steps, missed deadlines, schedule restarts, achieved
+        real-time factor and rolling lateness percentiles (p50, p95, p99, max in milliseconds).
+        """
+        result = collections.OrderedDict(steps=self.steps,
+                                         missed=self.missed,
+                                         resyncs=self.resyncs,
+                                         real_time_factor=self.achieved_real_time_factor)
+        if self._lateness:
+            values = 1000.0 * np.array(self._lateness)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result['lateness_ms'] = (p50, p95, p99, values.max())
+        return result
+
+    def __str__(self):
+        summary = self.summary()
+        text = 'pacing: {} steps, {} missed deadlines ({:.1f}%), {} restarts, {:.2f}x real time'.format(
+            summary['steps'], summary['missed'],
+            100.0 * summary['missed'] / summary['steps'] if summary['steps'] else 0.0,
+            summary['resyncs'], summary['real_time_factor'])
+        if 'lateness_ms' in summary:
+            text += ', lateness (ms: p50 / p95 / p99 / max): {:.3f} / {:.3f} / {:.3f} / {:.3f}'.format(
+                *summary['lateness_ms'])
+        return text
+
+    def close(self):
+        """
+        Logs the last summary.
+        """
+        if self.steps > 0:
+            logging.info('%s', self)
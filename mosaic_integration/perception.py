@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides an object level perception sensor computed from the actor poses. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import numpy as np
+
+import CarlaLink_pb2
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Columns of the pose arrays (see MosaicSimulation.get_actor_poses). Positions are the mosaic ones
+# (front bumper) and headings are in degrees, clockwise from the north.
+X, Y, Z, HEADING, LENGTH, WIDTH = range(6)
+
+# Corners of a box, in units of its half length and half width (forward, right).
+_CORNERS = np.array([[1.0, 1.0], [1.0, -1.0], [-1.0, 1.0], [-1.0, -1.0]])
+
+
+def _get_axes(headings):
+    """
+    Returns the forward and right unit vectors (mosaic coordinates) of the given headings.
+    """
+    radians = np.radians(headings)
+    forward = np.stack([np.sin(radians), np.cos(radians)], axis=-1)
+    right = np.stack([np.cos(radians), -np.sin(radians)], axis=-1)
+    return forward, right
+
+
+def get_box_centers(poses):
+    """
+    Returns the (x, y) centers of the bounding boxes of the given poses.
+    """
+    forward, _ = _get_axes(poses[:, HEADING])
+    return poses[:, [X, Y]] - forward * (poses[:, [LENGTH]] / 2.0)
+
+
+def _get_occluded(origin, targets, centers, poses, exclude):
+    """
+    Returns, for each target point, whether the segment from origin crosses any of the given boxes.
+
+        :param origin: (x, y) origin of the rays.
+        :param targets: (M, 2) end points of the rays.
+        :param centers: (K, 2) centers of the boxes.
+        :param poses: (K, 6) poses of the boxes.
+        :param exclude: (M, K) boxes not tested against each ray (e.g., the box of the target).
+    """
+    forward, right = _get_axes(poses[:, HEADING])
+    half_length = poses[:, LENGTH] / 2.0
+    half_width = poses[:, WIDTH] / 2.0
+
+    # Ray ends in the frame of each box (M, K).
+    start = origin - centers
+    end = targets[:, np.newaxis, :] - centers[np.newaxis, :, :]
+    start_u, start_v = np.sum(start * forward, axis=-1), np.sum(start * right, axis=-1)
+    end_u, end_v = np.sum(end * forward, axis=-1), np.sum(end * right, axis=-1)
+
+    # Slab test of the segment start + t * (end - start), t in [0, 1].
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_min = np.zeros(end_u.shape)
+        t_max = np.ones(end_u.shape)
+        for s, e, half in ((start_u, end_u, half_length), (start_v, end_v, half_width)):
+            direction = e - s
+            t0 = (-half - s) / direction
+            t1 = (half - s) / direction
+            parallel = direction == 0
+            inside = np.abs(s) <= half
+            t_near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t0, t1))
+            t_far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t0, t1))
+            t_min = np.maximum(t_min, t_near)
+            t_max = np.minimum(t_max, t_far)
+
+    hits = (t_min <= t_max) & ~exclude
+    return hits.any(axis=1)
+
+
+# ==================================================================================================
+# -- perception sensor -----------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class PerceptionSensor(object):
+    """
+    PerceptionSensor detects the actors within range and horizontal field of view of its host,
+    vectorized over all the actors. With occlusion, an actor is only detected if the ray to its
+    center or to one of its corners does not cross the bounding box of another actor in range.
+
+        :param sensor_id: id of the sensor.
+        :param attached: mosaic id of the host actor.
+        :param location: (forward, right) mounting position, in meters, relative to the center of
+            the host (carla sensor convention).
+        :param yaw: mounting yaw, in degrees, clockwise.
+        :param max_range: detection range, in meters.
+        :param horizontal_fov: horizontal field of view, in degrees.
+        :param occlusion: whether occluded actors are discarded.
+        :param sensor_tick: minimum simulated seconds between two measurements (0 for every tick).
+    """
+    def __init__(self, sensor_id, attached, location=(0.0, 0.0), yaw=0.0, max_range=100.0,
+                 horizontal_fov=360.0, occlusion=False, sensor_tick=0.0):
+        self.id = sensor_id
+        self.attached = attached
+        self.location = location
+        self.yaw = yaw
+        self.max_range = max_range
+        self.horizontal_fov = horizontal_fov
+        self.occlusion = occlusion
+        self.sensor_tick = sensor_tick
+        self.active = True
+        self._last_measure = None  # Timestamp of the last measurement.
+
+    def is_due(self, timestamp):
+        """
+        Whether the sensor is active and takes a measurement at the given timestamp (seconds),
+        honoring sensor_tick. Only the measurements actually taken (see measure) count.
+        """
+        if not self.active:
+            return False
+        return (self.sensor_tick <= 0 or self._last_measure is None or
+                timestamp - self._last_measure >= self.sensor_tick - 1e-9)
+
+    def get_pose(self, host_pose):
+        """
+        Returns the (x, y) position and heading of the sensor for the given pose of its host.
+        """
+        center = get_box_centers(host_pose[np.newaxis, :])[0]
+        forward, right = _get_axes(host_pose[HEADING])
+        position = center + self.location[0] * forward + self.location[1] * right
+        return position, (host_pose[HEADING] + self.yaw) % 360.0
+
+    def detect(self, actor_ids, poses, centers=None):
+        """
+        Returns the actors detected by the sensor.
+
+            :param actor_ids: ids of all the actors, including the host.
+            :param poses: (N, 6) poses of the actors (see MosaicSimulation.get_actor_poses).
+            :param centers: (optional) (N, 2) box centers of the actors (see get_box_centers).
+            :return: (indices of the detected actors, (M, 4) relative poses: forward and left
+                offsets from the sensor to the box center in meters, relative heading in degrees and
+                distance) or None if the host is unknown.
+        """
+        host = actor_ids.index(self.attached) if self.attached in actor_ids else None
+        if host is None:
+            return None
+        if centers is None:
+            centers = get_box_centers(poses)
+
+        position, heading = self.get_pose(poses[host])
+        offsets = centers - position
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+
+        in_range = distances <= self.max_range
+        in_range[host] = False
+        candidates = np.flatnonzero(in_range)
+
+        # Bearing of each candidate relative to the heading of the sensor, in [-180, 180).
+        bearings = np.degrees(np.arctan2(offsets[candidates, 0], offsets[candidates, 1]))
+        relative_bearings = (bearings - heading + 180.0) % 360.0 - 180.0
+        visible = candidates[np.abs(relative_bearings) <= self.horizontal_fov / 2.0]
+
+        if self.occlusion and len(visible) > 0:
+            visible = self._discard_occluded(position, visible, candidates, centers, poses)
+
+        forward, right = _get_axes(heading)
+        relative = np.empty((len(visible), 4))
+        relative[:, 0] = np.dot(offsets[visible], forward)
+        relative[:, 1] = -np.dot(offsets[visible], right)
+        relative[:, 2] = (poses[visible, HEADING] - heading + 180.0) % 360.0 - 180.0
+        relative[:, 3] = distances[visible]
+        return visible, relative
+
+    @staticmethod
+    def _discard_occluded(position, visible, occluders, centers, poses):
+        """
+        Returns the visible actors with at least one ray (center or corner) not crossing the boxes of
+        the occluders.
+        """
+        forward, right = _get_axes(poses[visible, HEADING])
+        half_extents = np.stack([poses[visible, LENGTH], poses[visible, WIDTH]], axis=1) / 2.0
+
+        # Ray targets: center and corners (slightly shrunk, so that rays to the corners do not graze
+        # the box of the target itself) of each visible actor, (5 * M, 2).
+        scale = 0.95 * _CORNERS[np.newaxis, :, :] * half_extents[:, np.newaxis, :]
+        corners = (centers[visible, np.newaxis, :] + scale[:, :, :1] * forward[:, np.newaxis, :] +
+                   scale[:, :, 1:] * right[:, np.newaxis, :])
+        targets = np.concatenate([centers[visible, np.newaxis, :], corners], axis=1).reshape(-1, 2)
+
+        owners = np.repeat(visible, 1 + len(_CORNERS))
+        exclude = owners[:, np.newaxis] == occluders[np.newaxis, :]
+        occluded = _get_occluded(position, targets, centers[occluders], poses[occluders], exclude)
+        return visible[~occluded.reshape(len(visible), -1).all(axis=1)]
+
+    def measure(self, actor_ids, poses, centers, timestamp, offset):
+        """
+        Returns the SensorData of the current detections, or None if the host is unknown. The
+        detected actors are sent as lidar_points (their mosaic positions, which identify them on the
+        mosaic side) and their relative poses (see detect) as rotation_matrix, four values per
+        actor.
+
+            :param timestamp: simulation time, in seconds.
+            :param offset: mosaic net offset.
+        """
+        detection = self.detect(actor_ids, poses, centers)
+        if detection is None:
+            return None
+        indices, relative = detection
+        self._last_measure = timestamp
+
+        host_pose = poses[actor_ids.index(self.attached)]
+        position, _ = self.get_pose(host_pose)
+        sensor_data = CarlaLink_pb2.SensorData(id=self.id,
+                                               timestamp=str(timestamp),
+                                               minRange=0,
+                                               maxRange=self.max_range,
+                                               location=CarlaLink_pb2.Location(
+                                                   x=float(position[0] - offset[0]),
+                                                   y=float(offset[1] - position[1]),
+                                                   z=float(host_pose[Z])))
+
+        add_point = sensor_data.lidar_points.add
+        for x, y, z in poses[indices, X:Z + 1].tolist():
+            add_point(x=x, y=y, z=z)
+        sensor_data.rotation_matrix.extend(relative.ravel().tolist())
+        return sensor_data
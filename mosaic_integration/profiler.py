@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a low overhead per phase profiler of the co-simulation tick. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+import csv
+import json
+import logging
+import time
+
+import numpy as np
+
+# ==================================================================================================
+# -- constants -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Phases of a co-simulation step, in execution order (sequential mode).
+TICK_PHASES = ('wait', 'mosaic_read', 'spawn', 'vehicle_sync', 'traffic_lights', 'substeps',
+               'carla_tick', 'carla_sync', 'step_copy')
+
+TICK_COUNTERS = ('spawned', 'moved', 'destroyed', 'sensor_points', 'message_bytes')
+
+# ==================================================================================================
+# -- profiler --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class TickProfiler(object):
+    """
+    TickProfiler measures the time spent in each phase of a tick as laps of a monotonic clock: each
+    call to lap charges the time elapsed since the previous lap (or the start of the tick) to the
+    given phase. The time between the end of a tick and the start of the next one is charged to the
+    'wait' phase (i.e., time spent by mosaic).
+
+    Rolling percentiles are logged every log_interval ticks and, if an output file is given, every
+    tick is written to a trace (*.csv or *.jsonl). A disabled profiler does nothing.
+
+        :param output: (optional) trace file. The format is chosen by extension (.csv or .jsonl).
+        :param window: number of ticks used for the rolling percentiles.
+        :param log_interval: number of ticks between logged summaries (0 to disable them).
+        :param enabled: whether the profiler records anything.
+    """
+    def __init__(self, output=None, window=200, log_interval=200, enabled=True):
+        self.enabled = enabled
+        self.log_interval = log_interval
+
+        self.tick = 0
+        self._start = None
+        self._last = None
+        self._end = None
+        self._phases = collections.OrderedDict((phase, 0.0) for phase in TICK_PHASES)
+        self._counters = collections.OrderedDict((counter, 0) for counter in TICK_COUNTERS)
+        self._history = collections.deque(maxlen=window)
+
+        self._file = None
+        self._writer = None
+        if enabled and output is not None:
+            self._file = open(output, 'w', newline='', encoding='utf-8')
+            if output.endswith('.csv'):
+                fieldnames = ['tick', 'total'] + list(TICK_PHASES) + list(TICK_COUNTERS)
+                self._writer = csv.DictWriter(self._file, fieldnames, restval=0,
+                                              extrasaction='ignore')
+                self._writer.writeheader()
+
+    def start_tick(self):
+        """
+        Starts a new tick.
+        """
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        for phase in self._phases:
+            self._phases[phase] = 0.0
+        for counter in self._counters:
+            self._counters[counter] = 0
+
+        if self._end is not None:
+            self._phases['wait'] = now - self._end
+        self._start = self._last = now
+
+    def lap(self, phase):
+        """
+        Charges the time elapsed since the previous lap to the given phase.
+        """
+        if not self.enabled or self._last is None:
+            return
+
+        now = time.perf_counter()
+        self._phases[phase] = self._phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, counter, value=1):
+        """
+        Increments the given counter of the current tick.
+        """
+        if self.enabled:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def end_tick(self):
+        """
+        Ends the current tick, writes it to the trace and logs the summary if needed.
+        """
+        if not self.enabled or self._start is None:
+            return
+
+        self._end = time.perf_counter()
+        self.tick += 1
+
+        # Times in milliseconds.
+        row = collections.OrderedDict(tick=self.tick, total=1000.0 * (self._end - self._start))
+        for phase, elapsed in self._phases.items():
+            row[phase] = 1000.0 * elapsed
+        row.update(self._counters)
+        self._history.append(row)
+        self._start = self._last = None
+
+        if self._writer is not None:
+            self._writer.writerow(row)
+        elif self._file is not None:
+            self._file.write(json.dumps(row) + '\n')
+
+        if self.log_interval > 0 and self.tick % self.log_interval == 0:
+            logging.info('%s', self)
+
+    def summary(self):
+        """
+        Returns the rolling percentiles (p50, p95, p99, max) of the total tick time and of each phase
+        (milliseconds), and the rolling mean of each counter.
+        """
+        if not self._history:
+            return {}
+
+        result = collections.OrderedDict()
+        for name in ['total'] + list(self._phases):
+            values = np.array([row.get(name, 0.0) for row in self._history])
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = (p50, p95, p99, values.max())
+        for name in self._counters:
+            result[name] = np.mean([row.get(name, 0) for row in self._history])
+        return result
+
+    def __str__(self):
+        lines = ['tick profile (last {} ticks, ms: p50 / p95 / p99 / max):'.format(
+            len(self._history))]
+        for name, value in self.summary().items():
+            if isinstance(value, tuple):
+                lines.append('  {:<16} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}'.format(name, *value))
+            else:
+                lines.append('  {:<16} {:>9.1f} (mean per tick)'.format(name, value))
+        return '\n'.join(lines)
+
+    def close(self):
+        """
+        Closes the trace file, logging the last summary.
+        """
+        if self.enabled and self._history:
+            logging.info('%s', self)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
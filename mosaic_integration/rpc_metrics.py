@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides per method metrics of the grpc server (counts, latencies and sizes). """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import bisect
+import logging
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import grpc
+
+# ==================================================================================================
+# -- constants -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Upper bounds of the histogram buckets (the last bucket, +Inf, is implicit).
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5)  # seconds
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)  # bytes
+
+# ==================================================================================================
+# -- metrics ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class _Histogram(object):
+    """
+    Cumulative histogram with fixed buckets, as in the prometheus exposition format.
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket containing the given quantile.
+        """
+        rank = q * self.count
+        accumulated = 0
+        for bound, count in zip(self.buckets, self.counts):
+            accumulated += count
+            if accumulated >= rank:
+                return bound
+        return float('inf')
+
+
+class _MethodMetrics(object):
+    def __init__(self):
+        self.errors = 0
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.request_size = _Histogram(SIZE_BUCKETS)
+        self.response_size = _Histogram(SIZE_BUCKETS)
+
+
+class RpcMetrics(object):
+    """
+    RpcMetrics keeps, for each grpc method, the number of calls and errors and the histograms of
+    latencies and serialized request/response sizes. It is thread-safe.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}  # {method: _MethodMetrics}
+
+    def record(self, method, latency, request_size, response_size, error=False):
+        """
+        Records a call to the given method.
+        """
+        with self._lock:
+            metrics = self._methods.get(method)
+            if metrics is None:
+                metrics = self._methods[method] = _MethodMetrics()
+
+            metrics.latency.observe(latency)
+            metrics.request_size.observe(request_size)
+            if error:
+                metrics.errors += 1
+            else:
+                metrics.response_size.observe(response_size)
+
+    def to_prometheus(self):
+        """
+        Returns the metrics in the prometheus text exposition format.
+        """
+        histograms = (('carlalink_rpc_latency_seconds', 'latency', 'RPC latency.'),
+                      ('carlalink_rpc_request_bytes', 'request_size', 'Serialized request size.'),
+                      ('carlalink_rpc_response_bytes', 'response_size', 'Serialized response size.'))
+
+        with self._lock:
+            lines = ['# HELP carlalink_rpc_errors_total Failed RPCs.',
+                     '# TYPE carlalink_rpc_errors_total counter']
+            for method, metrics in sorted(self._methods.items()):
+                lines.append('carlalink_rpc_errors_total{{method="{}"}} {}'.format(method,
+                                                                                    metrics.errors))
+
+            for name, attribute, description in histograms:
+                lines.append('# HELP {} {}'.format(name, description))
+                lines.append('# TYPE {} histogram'.format(name))
+                for method, metrics in sorted(self._methods.items()):
+                    histogram = getattr(metrics, attribute)
+                    accumulated = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        accumulated += count
+                        lines.append('{}_bucket{{method="{}",le="{}"}} {}'.format(
+                            name, method, bound, accumulated))
+                    lines.append('{}_bucket{{method="{}",le="+Inf"}} {}'.format(
+                        name, method, histogram.count))
+                    lines.append('{}_sum{{method="{}"}} {}'.format(name, method, histogram.sum))
+                    lines.append('{}_count{{method="{}"}} {}'.format(name, method, histogram.count))
+
+        return '\n'.join(lines) + '\n'
+
+    def __str__(self):
+        lines = ['grpc metrics (latency quantiles are bucket upper bounds):']
+        lines.append('  {:<24} {:>9} {:>7} {:>10} {:>10} {:>12} {:>12}'.format(
+            'method', 'calls', 'errors', 'p50 (ms)', 'p99 (ms)', 'req (kB)', 'resp (kB)'))
+        with self._lock:
+            for method, metrics in sorted(self._methods.items()):
+                lines.append('  {:<24} {:>9} {:>7} {:>10.2f} {:>10.2f} {:>12.1f} {:>12.1f}'.format(
+                    method, metrics.latency.count, metrics.errors,
+                    1000.0 * metrics.latency.quantile(0.5), 1000.0 * metrics.latency.quantile(0.99),
+                    metrics.request_size.sum / 1024.0, metrics.response_size.sum / 1024.0))
+        return '\n'.join(lines)
+
+
+# ==================================================================================================
+# -- interceptor -----------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class RpcMetricsInterceptor(grpc.ServerInterceptor):
+    """
+    Server interceptor recording the metrics of every unary-unary call in the given RpcMetrics.
+    """
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None:
+            return handler
+
+        method = handler_call_details.method.rsplit('/', 1)[-1]
+        behavior = handler.unary_unary
+        metrics = self.metrics
+
+        def unary_unary(request, context):
+            start = time.perf_counter()
+            try:
+                response = behavior(request, context)
+            except Exception:
+                metrics.record(method, time.perf_counter() - start, request.ByteSize(), 0, error=True)
+                raise
+
+            latency = time.perf_counter() - start
+            response_size = response.ByteSize() if response is not None else 0
+            metrics.record(method, latency, request.ByteSize(), response_size)
+            return response
+
+        return grpc.unary_unary_rpc_method_handler(
+            unary_unary,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer)
+
+
+# ==================================================================================================
+# -- exporters -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def start_metrics_server(metrics, port, host='127.0.0.1'):
+    """
+    Serves the given metrics, in the prometheus text format, at http://host:port/metrics from a
+    daemon thread.
+
+        :return: http server (call shutdown to stop it).
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+
+            body = metrics.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            logging.debug('metrics server: ' + format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info('Serving grpc metrics on http://%s:%d/metrics', host, port)
+    return server
+
+
+def start_metrics_logger(metrics, interval):
+    """
+    Logs a summary of the given metrics every interval seconds from a daemon thread.
+
+        :return: event to be set to stop the logger.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            logging.info('%s', metrics)
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the registry of the sensor types that mosaic can add through AddSensor. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+
+import numpy as np
+
+import CarlaLink_pb2
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Range reported in the sensor data of all the sensors.
+SENSOR_DATA_MAX_RANGE = 300
+
+# Semantic lidar detection layout (see carla.SemanticLidarDetection).
+SEMANTIC_LIDAR_DTYPE = np.dtype([('x', 'f4'), ('y', 'f4'), ('z', 'f4'), ('cos_inc_angle', 'f4'),
+                                 ('object_idx', 'u4'), ('object_tag', 'u4')])
+
+
+def to_mosaic_points(transform, points, offset):
+    """
+    Transforms the given points from sensor space to mosaic coordinates (net offset applied and y
+    axis mirrored).
+
+        :param transform: carla transform of the sensor.
+        :param points: N x 3 array of points in sensor space.
+        :param offset: mosaic net offset.
+        :return: N x 3 array of points in mosaic coordinates.
+    """
+    matrix = np.array(transform.get_matrix())
+    world_points = np.dot(points, matrix[:3, :3].T) + matrix[:3, 3]
+    world_points[:, 0] += offset[0]
+    world_points[:, 1] = offset[1] - world_points[:, 1]
+    return world_points
+
+
+def create_sensor_data(data, sensor_id, points, values=None):
+    """
+    Returns the SensorData of the given measurement.
+
+        :param data: carla measurement (its timestamp and sensor transform are used).
+        :param points: N x 3 array of points in mosaic coordinates, sent as lidar_points.
+        :param values: (optional) values of the points (one or more per point, in the order of the
+            points), sent as rotation_matrix.
+    """
+    location = data.transform.location
+    sensor_data = CarlaLink_pb2.SensorData(id=sensor_id,
+                                           timestamp=str(data.timestamp),
+                                           minRange=0,
+                                           maxRange=SENSOR_DATA_MAX_RANGE,
+                                           location=CarlaLink_pb2.Location(x=float(location.x),
+                                                                           y=float(location.y),
+                                                                           z=float(location.z)))
+
+    # Converting all the points at once through tolist is much faster than indexing the array, and
+    # add avoids the copy of each point made by append or extend.
+    add_point = sensor_data.lidar_points.add
+    for x, y, z in points.tolist():
+        add_point(x=x, y=y, z=z)
+    if values is not None:
+        sensor_data.rotation_matrix.extend(values.tolist())
+    return sensor_data
+
+
+# ==================================================================================================
+# -- processors ------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def process_lidar(data, sensor_id, offset, options=None, point_stride=1):
+    """
+    Lidar: the points with a positive intensity, in mosaic coordinates.
+    """
+    p_cloud = np.frombuffer(data.raw_data, dtype=np.dtype('f4')).reshape((-1, 4))[::point_stride]
+    points = p_cloud[p_cloud[:, 3] > 0, :3]
+    return create_sensor_data(data, sensor_id, to_mosaic_points(data.transform, points, offset))
+
+
+def process_semantic_lidar(data, sensor_id, offset, options=None, point_stride=1):
+    """
+    Semantic lidar: the points of the selected semantic tags (option semantic_tags: comma separated
+    tags, '*' for all the points or empty for the points that hit an actor), in mosaic coordinates.
+    The carla id of the actor hit by each point (0 for none) is sent in rotation_matrix, followed by
+    its semantic tag with the option send_tags (i.e., two values per point).
+    """
+    options = options or {}
+    p_cloud = np.frombuffer(data.raw_data, dtype=SEMANTIC_LIDAR_DTYPE)[::point_stride]
+
+    tags = options.get('semantic_tags', '')
+    if not tags:
+        p_cloud = p_cloud[p_cloud['object_idx'] != 0]
+    elif tags != '*':
+        p_cloud = p_cloud[np.isin(p_cloud['object_tag'], [int(tag) for tag in tags.split(',')])]
+
+    values = p_cloud['object_idx']
+    if options.get('send_tags', 'false').lower() == 'true':
+        values = np.stack([p_cloud['object_idx'], p_cloud['object_tag']], axis=1).ravel()
+
+    points = np.stack([p_cloud['x'], p_cloud['y'], p_cloud['z']], axis=1)
+    return create_sensor_data(data, sensor_id, to_mosaic_points(data.transform, points, offset),
+                              values)
+
+
+def process_radar(data, sensor_id, offset, options=None, point_stride=1):
+    """
+    Radar: the detections, in mosaic coordinates. The velocity of each detection (m/s, towards the
+    sensor if negative) is sent in rotation_matrix.
+    """
+    detections = np.frombuffer(data.raw_data, dtype=np.dtype('f4')).reshape((-1, 4))[::point_stride]
+    velocity, azimuth, altitude, depth = detections.T
+
+    points = np.stack([
+        depth * np.cos(altitude) * np.cos(azimuth),
+        depth * np.cos(altitude) * np.sin(azimuth),
+        depth * np.sin(altitude)
+    ], axis=1)
+    return create_sensor_data(data, sensor_id, to_mosaic_points(data.transform, points, offset),
+                              velocity)
+
+
+# ==================================================================================================
+# -- registry --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Sensor type of AddSensor requests:
+#   blueprint: carla blueprint id, None for the virtual sensors computed by the bridge (see
+#       PerceptionSensor).
+#   defaults: blueprint attributes set when not given by mosaic (None for the recommended value).
+#   options: attributes handled by the bridge (not set in the blueprint) and their defaults. The
+#       carla sensors take output_tick, the minimum simulated seconds between two measurements sent
+#       to mosaic (bridge side decimation, while sensor_tick sets the rate of the carla sensor).
+#   processor: function converting a measurement to SensorData (see process_lidar).
+SensorType = collections.namedtuple('SensorType', 'blueprint defaults options processor')
+
+SENSOR_TYPES = {
+    'LiDAR':
+        SensorType(blueprint='sensor.lidar.ray_cast',
+                   defaults=collections.OrderedDict([('range', '100'),
+                                                     ('dropoff_general_rate', None),
+                                                     ('dropoff_intensity_limit', None),
+                                                     ('dropoff_zero_intensity', None)]),
+                   options={'output_tick': '0'},
+                   processor=process_lidar),
+    'SemanticLiDAR':
+        SensorType(blueprint='sensor.lidar.ray_cast_semantic',
+                   defaults={'range': '100'},
+                   options={'output_tick': '0', 'semantic_tags': '', 'send_tags': 'false'},
+                   processor=process_semantic_lidar),
+    'Radar':
+        SensorType(blueprint='sensor.other.radar',
+                   defaults={'range': '100'},
+                   options={'output_tick': '0'},
+                   processor=process_radar),
+    'Perception':
+        SensorType(blueprint=None,
+                   defaults={},
+                   options=collections.OrderedDict([('range', '100'), ('horizontal_fov', '360'),
+                                                    ('occlusion', 'false'), ('sensor_tick', '0')]),
+                   processor=None),
+}
+
+
+def get_sensor_type(type_id):
+    """
+    Returns the sensor type (SensorType) of the given AddSensor type id, or None if not supported.
+    """
+    return SENSOR_TYPES.get(type_id)
+
+
+def get_sensor_options(sensor_type, attributes):
+    """
+    Returns the bridge options of a sensor: the given attributes, falling back to the defaults of
+    its type.
+    """
+    return {name: attributes.get(name, default) for name, default in sensor_type.options.items()}
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the recording of co-simulation sessions (mosaic requests and step results). """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+import struct
+import threading
+import time
+
+import grpc
+
+import CarlaLink_pb2
+
+# ==================================================================================================
+# -- constants -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+SESSION_MAGIC = b'CARLALINK-SESSION-1\n'
+
+# Calls issued by mosaic, in the order of their method index in the log. The queries the bridge
+# issues on its own server (GetActor, GetTrafficLight and GetTrafficLightIDList, see
+# MosaicSimulation) are not recorded. Neither are the calls it issues while serving SimulationStep
+# (e.g., GetDepartedIDList, GetArrivedIDList and the AddVehicle of carla controlled vehicles): mosaic
+# waits for the step result, so any call received in the meantime comes from the bridge itself.
+RECORDED_METHODS = ('GetDepartedIDList', 'GetArrivedIDList', 'AddVehicle', 'RemoveVehicle',
+                    'UpdateVehicle', 'SimulationStep', 'UpdateTrafficLight', 'AddSensor',
+                    'RemoveSensor', 'SetSensorActive')
+
+# Calls whose responses are recorded too (step results, and sensor ids needed to replay
+# RemoveSensor and SetSensorActive).
+RECORDED_RESPONSES = ('SimulationStep', 'AddSensor')
+
+REQUEST = 0
+RESPONSE = 1
+
+# Record header: timestamp (seconds since the start of the recording), method index, kind (request
+# or response) and payload length.
+_HEADER = struct.Struct('<dBBI')
+
+_SERVICE = CarlaLink_pb2.DESCRIPTOR.services_by_name['CarlaLinkService']
+
+# Methods not described in CarlaLink_pb2 (only added to CarlaLink_pb2_grpc): {method: (request
+# message, response message)}.
+_EXTRA_METHODS = {'SetSensorActive': ('Sensor', 'Empty')}
+
+
+def _get_message_class(method, kind):
+    if method in _EXTRA_METHODS:
+        return getattr(CarlaLink_pb2, _EXTRA_METHODS[method][kind])
+
+    descriptor = _SERVICE.methods_by_name[method]
+    message = descriptor.input_type if kind == REQUEST else descriptor.output_type
+    return getattr(CarlaLink_pb2, message.name)
+
+
+SessionRecord = collections.namedtuple('SessionRecord', 'timestamp method kind message')
+
+# ==================================================================================================
+# -- recorder --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class SessionRecorder(object):
+    """
+    SessionRecorder writes the calls of a co-simulation session to a binary log: a magic line
+    followed by length-delimited records (header and serialized protobuf message). It is
+    thread-safe.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._file = open(path, 'wb')
+        self._file.write(SESSION_MAGIC)
+
+    def record(self, method, kind, message, timestamp=None):
+        """
+        Appends a request or response of the given method to the log.
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        payload = message.SerializeToString()
+        header = _HEADER.pack(timestamp - self._start, RECORDED_METHODS.index(method), kind,
+                              len(payload))
+
+        with self._lock:
+            if self._file is not None:
+                self._file.write(header)
+                self._file.write(payload)
+                self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_session(path):
+    """
+    Yields the records (SessionRecord) of the given session log.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(SESSION_MAGIC)) != SESSION_MAGIC:
+            raise ValueError('{} is not a session log'.format(path))
+
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return  # End of file (or truncated last record).
+
+            timestamp, method_index, kind, length = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+
+            method = RECORDED_METHODS[method_index]
+            message = _get_message_class(method, kind).FromString(payload)
+            yield SessionRecord(timestamp, method, kind, message)
+
+
+# ==================================================================================================
+# -- interceptor -----------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class SessionRecorderInterceptor(grpc.ServerInterceptor):
+    """
+    Server interceptor recording the mosaic calls of the CarlaLinkService in the given
+    SessionRecorder. The calls received while a SimulationStep is served are not recorded (see
+    RECORDED_METHODS).
+    """
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self._lock = threading.Lock()
+        self._steps = 0  # SimulationStep calls being served.
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        method = handler_call_details.method.rsplit('/', 1)[-1]
+        if handler is None or handler.unary_unary is None or method not in RECORDED_METHODS:
+            return handler
+
+        behavior = handler.unary_unary
+        recorder = self.recorder
+        record_response = method in RECORDED_RESPONSES
+        is_step = method == 'SimulationStep'
+
+        def unary_unary(request, context):
+            with self._lock:
+                nested = not is_step and self._steps > 0
+                if is_step:
+                    self._steps += 1
+            if nested:
+                return behavior(request, context)
+
+            try:
+                recorder.record(method, REQUEST, request)
+                response = behavior(request, context)
+                if record_response and response is not None:
+                    recorder.record(method, RESPONSE, response)
+                return response
+            finally:
+                if is_step:
+                    with self._lock:
+                        self._steps -= 1
+
+        return grpc.unary_unary_rpc_method_handler(
+            unary_unary,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a uniform grid spatial index over 2D positions. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import math
+
+import numpy as np
+
+# ==================================================================================================
+# -- spatial index ---------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class SpatialIndex(object):
+    """
+    SpatialIndex buckets 2D positions in a uniform grid of square cells. It is rebuilt from scratch
+    (vectorized) every time the positions change, which is cheaper than updating it incrementally
+    when most of the positions change at every step.
+
+        :param cell_size: size of the grid cells (meters). Ideally, close to the query radii.
+    """
+    def __init__(self, cell_size=50.0):
+        self.cell_size = float(cell_size)
+
+        self.ids = []
+        self.positions = np.empty((0, 2))
+        self._indices = {}  # {id: index}
+        self._cells = {}  # {(cell_x, cell_y): indices}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id_):
+        return id_ in self._indices
+
+    def build(self, ids, positions):
+        """
+        Rebuilds the index.
+
+            :param ids: list of ids.
+            :param positions: (N, 2) array-like with the position of each id.
+        """
+        self.ids = list(ids)
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self._indices = {id_: i for i, id_ in enumerate(self.ids)}
+        self._cells = {}
+
+        if not self.ids:
+            return
+
+        cells = np.floor(self.positions / self.cell_size).astype(np.int64)
+
+        # Sorting by cell so that each cell is a contiguous run of indices.
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        sorted_cells = cells[order]
+        boundaries = np.flatnonzero(np.any(np.diff(sorted_cells, axis=0) != 0, axis=1)) + 1
+        for run in np.split(np.arange(len(order)), boundaries):
+            cell_x, cell_y = sorted_cells[run[0]]
+            self._cells[(int(cell_x), int(cell_y))] = order[run]
+
+    def query_indices(self, center, radius):
+        """
+        Returns the indices (into ids and positions) of the entries within radius of center.
+        """
+        if not self._cells:
+            return np.empty(0, dtype=np.int64)
+
+        x, y = center
+        min_x = int(math.floor((x - radius) / self.cell_size))
+        max_x = int(math.floor((x + radius) / self.cell_size))
+        min_y = int(math.floor((y - radius) / self.cell_size))
+        max_y = int(math.floor((y + radius) / self.cell_size))
+
+        candidates = []
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self._cells):
+            candidates = list(self._cells.values())
+        else:
+            for cell_x in range(min_x, max_x + 1):
+                for cell_y in range(min_y, max_y + 1):
+                    indices = self._cells.get((cell_x, cell_y))
+                    if indices is not None:
+                        candidates.append(indices)
+
+        if not candidates:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.concatenate(candidates)
+        deltas = self.positions[candidates] - (x, y)
+        inside = np.einsum('ij,ij->i', deltas, deltas) <= radius * radius
+        return candidates[inside]
+
+    def query(self, center, radius):
+        """
+        Returns the set of ids within radius of center.
+        """
+        return {self.ids[i] for i in self.query_indices(center, radius)}
+
+    def query_many(self, centers, radius):
+        """
+        Returns the set of ids within radius of any of the given centers.
+        """
+        result = set()
+        for center in centers:
+            result.update(self.query(center, radius))
+        return result
+
+    def distances(self, centers, ids=None):
+        """
+        Returns the distance from each indexed position (or only from the given ids) to the closest
+        of the given centers (inf if there are no centers), as a (N,) array.
+        """
+        if ids is None:
+            positions = self.positions
+        else:
+            positions = self.positions[[self._indices[id_] for id_ in ids]].reshape(-1, 2)
+
+        result = np.full(len(positions), np.inf)
+        for center in np.asarray(centers, dtype=np.float64).reshape(-1, 2):
+            deltas = positions - center
+            np.minimum(result, np.einsum('ij,ij->i', deltas, deltas), out=result)
+        return np.sqrt(result)
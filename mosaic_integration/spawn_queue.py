@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides a deferred spawn queue to bound the time spent spawning per tick. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import heapq
+import itertools
+import time
+
+# ==================================================================================================
+# -- spawn queue -----------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class SpawnQueue(object):
+    """
+    SpawnQueue keeps the actors waiting to be spawned, ordered by priority (lower values first) and,
+    for the same priority, by arrival order. At each tick only a limited number of actors (or a
+    limited amount of time) is spent spawning them.
+
+        :param max_spawns: maximum number of spawns per tick (0 for no limit).
+        :param max_spawn_time: maximum time per tick spent spawning, in seconds (0 for no limit).
+    """
+    def __init__(self, max_spawns=0, max_spawn_time=0.0):
+        self.max_spawns = max_spawns
+        self.max_spawn_time = max_spawn_time
+
+        self._heap = []  # [(priority, sequence, actor_id), ...]
+        self._pending = {}  # {actor_id: sequence}
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, actor_id):
+        return actor_id in self._pending
+
+    def __iter__(self):
+        return iter(list(self._pending))
+
+    def push(self, actor_id, priority=0.0):
+        """
+        Adds (or re-prioritizes) an actor waiting to be spawned.
+        """
+        sequence = next(self._sequence)
+        self._pending[actor_id] = sequence
+        heapq.heappush(self._heap, (priority, sequence, actor_id))
+        self._compact()
+
+    def discard(self, actor_id):
+        """
+        Removes the given actor from the queue (e.g., it arrived before being spawned).
+
+            :return: True if the actor was waiting to be spawned. Otherwise, False.
+        """
+        if self._pending.pop(actor_id, None) is None:
+            return False
+        self._compact()
+        return True
+
+    def _compact(self):
+        # Entries of discarded or re-prioritized actors are only skipped when popped (see _pop).
+        # They are dropped once they are the majority of the heap, so that it stays bounded.
+        if not self._pending:
+            self._heap = []
+        elif len(self._heap) > 2 * len(self._pending):
+            self._heap = [entry for entry in self._heap if self._pending.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def _pop(self):
+        while self._heap:
+            _, sequence, actor_id = heapq.heappop(self._heap)
+            # Entries of discarded or re-prioritized actors are skipped.
+            if self._pending.get(actor_id) == sequence:
+                del self._pending[actor_id]
+                if not self._pending:
+                    self._heap = []
+                return actor_id
+        return None
+
+    def drain(self, spawn):
+        """
+        Spawns queued actors, in priority order, until the per tick budget is exhausted. At least
+        one actor is spawned per call, so that the queue always makes progress.
+
+            :param spawn: function called with the id of each actor to be spawned.
+            :return: number of spawned actors.
+        """
+        start = time.perf_counter()
+
+        count = 0
+        while self._pending:
+            if count > 0:
+                if self.max_spawns > 0 and count >= self.max_spawns:
+                    break
+                if self.max_spawn_time > 0 and time.perf_counter() - start >= self.max_spawn_time:
+                    break
+
+            actor_id = self._pop()
+            if actor_id is None:
+                break
+
+            spawn(actor_id)
+            count += 1
+
+        return count
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides the (cached) traffic light group mapping used by mosaic. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import hashlib
+import json
+import logging
+import os
+
+# ==================================================================================================
+# -- constants -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+TRAFFIC_LIGHT_MAPPING_FILE = os.path.join('data', 'traffic_light_mapping.json')
+TRAFFIC_LIGHT_MAPPING_CACHE_DIR = os.path.join('data', 'cache')
+
+# ==================================================================================================
+# -- traffic light mapping -------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def _normalize_opendrive(opendrive):
+    """
+    Returns the given opendrive content without byte order mark, with unix line endings and without
+    trailing whitespace, so that the map read from its .xodr file and the one returned by carla
+    (Map.to_opendrive) give the same key.
+    """
+    lines = opendrive.lstrip('\ufeff').replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def get_mapping_key(opendrive, offset):
+    """
+    Returns the cache key of a traffic light mapping.
+
+    The mapping only depends on the opendrive content of the carla map (normalized, see
+    _normalize_opendrive) and on the mosaic net offset.
+    """
+    sha = hashlib.sha1()
+    sha.update(_normalize_opendrive(opendrive).encode('utf-8'))
+    sha.update('{:.6f},{:.6f}'.format(float(offset[0]), float(offset[1])).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def _get_cache_file(key, cache_dir=TRAFFIC_LIGHT_MAPPING_CACHE_DIR, offline=False):
+    name = 'traffic_light_mapping-offline-{}.json' if offline else 'traffic_light_mapping-{}.json'
+    return os.path.join(cache_dir, name.format(key))
+
+
+def load_cached_groups(key, cache_dir=TRAFFIC_LIGHT_MAPPING_CACHE_DIR, offline=False):
+    """
+    Returns the cached traffic light groups for the given key. If there is no (valid) cache entry,
+    returns None.
+
+        :param offline: whether to read the offline entry (see save_cached_groups) instead of the one
+            computed by the bridge.
+    """
+    cache_file = _get_cache_file(key, cache_dir, offline)
+    if not os.path.exists(cache_file):
+        return None
+
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)['groups']
+    except (ValueError, KeyError) as error:
+        logging.warning('Ignoring invalid traffic light mapping cache %s: %s', cache_file, error)
+        return None
+
+
+def save_cached_groups(key, groups, cache_dir=TRAFFIC_LIGHT_MAPPING_CACHE_DIR, offline=False):
+    """
+    Stores the given traffic light groups in the cache.
+
+    Offline groups (i.e., built without a carla server, see util/netconvert_carla.py) are
+    approximations and are stored apart from the ones computed by the bridge from the carla traffic
+    lights: the bridge only uses them once checked against the carla traffic lights.
+
+        :param key: cache key (see get_mapping_key).
+        :param groups: [[{'landmark_id', 'pole_index', 'pos_x', 'pos_y'}, ...], ...]
+        :param cache_dir: cache directory.
+        :param offline: whether the groups were built offline.
+        :return: path to the cache file.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    cache_file = _get_cache_file(key, cache_dir, offline)
+    content = {'key': key, 'offline': offline, 'groups': groups}
+
+    # Writes to a temporal file first so that concurrent bridges never read a partial file.
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(content, f, indent=4)
+    os.replace(tmp_file, cache_file)
+
+    return cache_file
+
+
+def write_traffic_light_mapping(groups, tl_ids, output=TRAFFIC_LIGHT_MAPPING_FILE):
+    """
+    Writes the traffic light mapping read by mosaic.
+
+        :param groups: traffic light groups (see save_cached_groups).
+        :param tl_ids: {landmark_id: carla traffic light actor id}
+        :param output: output file (*.json)
+    """
+    mapping = {}
+    for i, group in enumerate(groups):
+        mapping['traffic-light-group-{}'.format(i)] = [{
+            str(group_tl['pole_index']): [
+                {'landmark_id': str(group_tl['landmark_id'])},
+                {'tl_id': str(tl_ids.get(group_tl['landmark_id']))},
+                {'pos_x': str(group_tl['pos_x'])},
+                {'pos_y': str(group_tl['pos_y'])},
+            ]
+        } for group_tl in group]
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(mapping, f, indent=4)
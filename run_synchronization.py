@@ -15,10 +15,11 @@ Script to integrate CARLA and Eclipse-MOSAIC simulations
 
 import argparse
 import logging
-import copy
+import math
 
 from concurrent import futures
 import grpc
+import numpy as np
 import CarlaLink_pb2
 import CarlaLink_pb2_grpc
 
@@ -38,6 +39,11 @@ try:
 except IndexError:
     pass
 
+# Runs against the pure python stand-in of carla (no carla server needed, e.g. for benchmarks).
+if os.environ.get('CARLA_MOCK', '0') != '0':
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), 'util',
+                                    'carla_mock'))
+
 import carla  # pylint: disable=import-error
 
 # ==================================================================================================
@@ -56,7 +62,18 @@ import carla  # pylint: disable=import-error
 from mosaic_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
 from mosaic_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
 from mosaic_integration.constants import INVALID_ACTOR_ID  # pylint: disable=wrong-import-position
+from mosaic_integration.dead_reckoning import DeadReckoning  # pylint: disable=wrong-import-position
 from mosaic_integration.mosaic_simulation import MosaicSimulation  # pylint: disable=wrong-import-position
+from mosaic_integration.overload import QUALITY_LEVELS, OverloadController  # pylint: disable=wrong-import-position
+from mosaic_integration.pacing import Pacer  # pylint: disable=wrong-import-position
+from mosaic_integration.perception import PerceptionSensor, get_box_centers  # pylint: disable=wrong-import-position
+from mosaic_integration.profiler import TickProfiler  # pylint: disable=wrong-import-position
+from mosaic_integration.rpc_metrics import RpcMetrics, RpcMetricsInterceptor, start_metrics_logger, start_metrics_server  # pylint: disable=wrong-import-position
+from mosaic_integration.sensor_registry import SENSOR_TYPES, get_sensor_options, get_sensor_type  # pylint: disable=wrong-import-position
+from mosaic_integration.session_recorder import SessionRecorder, SessionRecorderInterceptor  # pylint: disable=wrong-import-position
+from mosaic_integration.spatial_index import SpatialIndex  # pylint: disable=wrong-import-position
+from mosaic_integration.spawn_queue import SpawnQueue  # pylint: disable=wrong-import-position
+from mosaic_integration.traffic_light_mapping import get_mapping_key, load_cached_groups, save_cached_groups, write_traffic_light_mapping  # pylint: disable=wrong-import-position
 
 
 # ==================================================================================================
@@ -67,7 +84,7 @@ from mosaic_integration.mosaic_simulation import MosaicSimulation  # pylint: dis
 class SimulationSynchronization(object):
     """
     SimulationSynchronization class is responsible for the synchronization of mosaic and carla
-    simulations.
+    simulations. The options following sync_vehicle_lights are keyword only.
     """
 
     def __init__(self,
@@ -75,7 +92,22 @@ class SimulationSynchronization(object):
                  carla_simulation,
                  tls_manager='none',
                  sync_vehicle_color=False,
-                 sync_vehicle_lights=False):
+                 sync_vehicle_lights=False,
+                 *,
+                 actor_pool_size=0,
+                 max_spawns_per_tick=0,
+                 spawn_budget=0.0,
+                 interest_radius=0.0,
+                 interest_hysteresis=20.0,
+                 lod_near_radius=0.0,
+                 lod_mid_radius=150.0,
+                 lod_mid_interval=5,
+                 lod_far_distance=2.0,
+                 sensor_aggregation='all',
+                 dead_reckoning=None,
+                 pipelined=False,
+                 profiler=None,
+                 overload=None):
 
         self.mosaic = mosaic_simulation
         self.carla = carla_simulation
@@ -92,71 +124,210 @@ class SimulationSynchronization(object):
         # Mapped actor ids.
         self.mosaic2carla_ids = {}  # Contains only actors controlled by mosaic.
         self.carla2mosaic_ids = {}  # Contains only actors controlled by carla.
-
-        BridgeHelper.blueprint_library = self.carla.world.get_blueprint_library()
+        # Mosaic poses of the carla controlled actors in the last carla frame (see
+        # MosaicSimulation.get_actor_poses).
+        self._carla_actor_poses = {}  # {mosaic_actor_id: (x, y, z, heading, length, width)}
+
+        # Mosaic actors waiting to be spawned in carla.
+        self.spawn_queue = SpawnQueue(max_spawns_per_tick, spawn_budget)
+        self.max_spawns_per_tick = max_spawns_per_tick
+
+        # Interest management. If enabled (i.e., interest_radius > 0), only the mosaic actors within
+        # interest_radius of a sensor or a carla controlled actor are spawned in carla. They are
+        # destroyed once they are farther than interest_radius + interest_hysteresis.
+        self.interest_radius = interest_radius
+        self.interest_hysteresis = interest_hysteresis
+        self.mosaic_actor_ids = set()  # All the alive mosaic actors (not controlled by carla).
+        self.sensor_carrier_ids = set()  # Mosaic actors with sensors, always spawned in carla.
+        self.spatial_index = SpatialIndex(cell_size=max(interest_radius, 1.0))
+
+        # Update tiers (level of detail). If enabled (i.e., lod_near_radius > 0), mosaic actors
+        # within lod_near_radius of a sensor or a carla controlled actor are updated in carla every
+        # tick, the ones within lod_mid_radius every lod_mid_interval ticks and the rest only once
+        # they moved more than lod_far_distance since their last update.
+        self.lod_near_radius = lod_near_radius
+        self.lod_mid_radius = max(lod_mid_radius, lod_near_radius)
+        self.lod_mid_interval = max(lod_mid_interval, 1)
+        self.lod_far_distance = lod_far_distance
+        self.lod_index = SpatialIndex(
+            cell_size=lod_near_radius if lod_near_radius > 0 else max(lod_mid_radius, 1.0))
+        self._lod_updates = {}  # {mosaic_actor_id: (tick, x, y)} of the last update in carla.
+        self._tick_count = 0
+
+        # Substeps. Each co-simulation step runs carla.substeps carla ticks. Mosaic actors are
+        # interpolated between steps and the sensor data of all the substeps is either aggregated or
+        # decimated (only the last data of each sensor) into the step result.
+        self.sensor_aggregation = sensor_aggregation
+        self._carla_transforms = {}  # {carla_actor_id: transform} sent at the previous step.
+
+        # Optional dead reckoning (see DeadReckoning) of mosaic actors without fresh updates.
+        self.dead_reckoning = dead_reckoning
+
+        # Pipelined mode. The carla tick of step N runs in the background while mosaic computes its
+        # next step. The carla world is owned by the background tick until the next call to tick
+        # (or spawn_sensor), which returns the carla results of step N-1 (i.e., one step latency).
+        self.pipelined = pipelined
+        self._pending_frame = False  # Whether the carla results of a tick are still to be sent.
+
+        # Per phase profiler of the tick (see TickProfiler). Disabled by default.
+        self.profiler = profiler if profiler is not None else TickProfiler(enabled=False)
+
+        # Optional adaptive quality (see OverloadController). When the ticks exceed their time
+        # budget, lidar data is decimated, far vehicles are updated less often and spawns deferred.
+        self.overload = overload
+        self.quality = QUALITY_LEVELS[0] if overload is None else overload.quality
+
+        BridgeHelper.set_blueprint_library(self.carla.blueprint_library)
         BridgeHelper.offset = self.mosaic.get_net_offset()
 
+        if actor_pool_size > 0:
+            self.carla.enable_actor_pool(actor_pool_size,
+                                         self.carla.blueprint_library.filter('vehicle.*'),
+                                         match_color=sync_vehicle_color)
+
         # Configuring carla simulation in sync mode.
         settings = self.carla.world.get_settings()
         settings.synchronous_mode = True
-        settings.fixed_delta_seconds = self.carla.step_length
+        settings.fixed_delta_seconds = self.carla.substep_length
         self.carla.world.apply_settings(settings)
         self.calculate_traffic_light_mapping()
 
         self.sensors = dict()
+        self._sensor_hosts = {}  # {carla sensor id: mosaic actor carrying it}
+        # Virtual perception sensors ({sensor_id: PerceptionSensor}), computed at every tick from
+        # the mosaic actor poses.
+        self.perception_sensors = dict()
+        self._perception_count = 0
+        # Listeners of the carla sensors ({carla_sensor_id: callback}), to resume paused sensors, and
+        # timestamp of the last data sent to mosaic by each sensor (see output_tick).
+        self._sensor_callbacks = dict()
+        self._last_outputs = dict()
 
     def calculate_traffic_light_mapping(self):
         """
         Saves the carla traffic light data inside a usable file format (.json)
+
+        The traffic light groups only depend on the carla map and the mosaic net offset. Hence, they
+        are computed once and cached on disk (see traffic_light_mapping module).
         """
-        landmark_ids = self.carla.traffic_light_ids
-        sorted_ids = sorted(landmark_ids, key=lambda x: self.carla.get_traffic_light(x).get_pole_index())
-        tl_id_to_landmark_is_map = dict((self.carla.get_traffic_light(landmark_id).id, landmark_id) for landmark_id in sorted_ids)
-
-        with open("data/traffic_light_mapping.json", "w", encoding='utf-8') as f:
-            print("{", file=f)
-            i = 0
-            for landmark_id in sorted_ids:
-                tl = self.carla.get_traffic_light(landmark_id)
-                # break when pole_index bigger than 0 since all following traffic lights should already be calculated
-                if tl.get_pole_index() != 0:
-                    break
-
-                print(f'"traffic-light-group-{i}": [', file=f)
-                for group_tl in tl.get_group_traffic_lights():
-                    print(f'    {{ "{group_tl.get_pole_index()}": [', file=f)
-                    print(f'        {{ "landmark_id": "{tl_id_to_landmark_is_map.get(group_tl.id)}" }},', file=f)
-                    print(f'        {{ "tl_id": "{group_tl.id}" }},', file=f)
-                    print(f'        {{ "pos_x": "{group_tl.get_location().x + BridgeHelper.offset[0]}" }},', file=f)
-                    print(f'        {{ "pos_y": "{group_tl.get_location().y - BridgeHelper.offset[1]}" }}', file=f)
-                    print(f'    ]}},', file=f)
-                print(f'],', file=f)
-                i += 1
-            print("}", file=f)
+        key = get_mapping_key(self.carla.map.to_opendrive(), BridgeHelper.offset)
+
+        groups = load_cached_groups(key)
+        if groups is None or any(group_tl['landmark_id'] is not None and
+                                 group_tl['landmark_id'] not in self.carla.traffic_light_ids
+                                 for group in groups for group_tl in group):
+            # Offline mappings (see util/netconvert_carla.py) are only used once checked.
+            groups = load_cached_groups(key, offline=True)
+            if groups is not None:
+                groups = self._check_traffic_light_groups(groups)
+                if groups is None:
+                    logging.warning('Offline traffic light mapping (%s) does not match the carla '
+                                    'traffic lights', key)
+            if groups is None:
+                groups = self._compute_traffic_light_groups()
+            cache_file = save_cached_groups(key, groups)
+            logging.info('Traffic light mapping cached in %s', cache_file)
+        else:
+            logging.info('Using cached traffic light mapping (%s)', key)
 
-    def spawn_sensor(self, sensor):
-        if sensor.type_id == 'LiDAR':
-            lidar_bp = self.carla.world.get_blueprint_library().find('sensor.lidar.ray_cast')
+        tl_ids = {}
+        for landmark_id in self.carla.traffic_light_ids:
+            tl_ids[landmark_id] = self.carla.get_traffic_light(landmark_id).id
 
-            for sensor_attribute in sensor.attributes:
-                lidar_bp.set_attribute(sensor_attribute, sensor.attributes[sensor_attribute])
-                
-            # set standard values if not set by user
-            if 'range' not in sensor.attributes:
-                lidar_bp.set_attribute('range', '100')
-                sensor.attributes['range'] = '100'
+        write_traffic_light_mapping(groups, tl_ids)
+
+    def _check_traffic_light_groups(self, groups):
+        """
+        Checks the given (offline) traffic light groups against the carla traffic lights: same
+        traffic lights, groups and pole indices. The positions, approximated offline, are replaced
+        by the ones of the traffic light actors.
+
+            :return: the checked groups, or None if they do not match.
+        """
+        landmark_ids = [group_tl['landmark_id'] for group in groups for group_tl in group]
+        if sorted(landmark_ids) != sorted(self.carla.traffic_light_ids):
+            return None
+
+        checked_groups = []
+        for group in groups:
+            tls = [self.carla.get_traffic_light(group_tl['landmark_id']) for group_tl in group]
+            group_tl_ids = {group_tl.id for group_tl in tls[0].get_group_traffic_lights()}
+            if group_tl_ids != {tl.id for tl in tls}:
+                return None
+
+            checked_group = []
+            for group_tl, tl in zip(group, tls):
+                if tl.get_pole_index() != group_tl['pole_index']:
+                    return None
+
+                location = tl.get_location()
+                checked_group.append(dict(group_tl,
+                                          pos_x=location.x + BridgeHelper.offset[0],
+                                          pos_y=location.y - BridgeHelper.offset[1]))
+            checked_groups.append(checked_group)
+        return checked_groups
+
+    def _compute_traffic_light_groups(self):
+        """
+        Computes the carla traffic light groups. Each group starts with the traffic light with pole
+        index 0 and contains all the traffic lights of the same controller.
+        """
+        # Retrieving the pole index only once per traffic light, as each call reaches the server.
+        pole_indices = {}  # {landmark_id: pole_index}
+        tl_id_to_landmark_id = {}  # {tl_id: landmark_id}
+        for landmark_id in sorted(self.carla.traffic_light_ids):
+            tl = self.carla.get_traffic_light(landmark_id)
+            pole_indices[landmark_id] = tl.get_pole_index()
+            tl_id_to_landmark_id[tl.id] = landmark_id
+
+        groups = []
+        for landmark_id in sorted(pole_indices, key=lambda x: (pole_indices[x], x)):
+            # break when pole_index bigger than 0 since all following traffic lights should already be calculated
+            if pole_indices[landmark_id] != 0:
+                break
+
+            group = []
+            for group_tl in self.carla.get_traffic_light(landmark_id).get_group_traffic_lights():
+                group_landmark_id = tl_id_to_landmark_id.get(group_tl.id)
+                if group_landmark_id in pole_indices:
+                    pole_index = pole_indices[group_landmark_id]
+                else:
+                    pole_index = group_tl.get_pole_index()
+
+                location = group_tl.get_location()
+                group.append({
+                    'landmark_id': group_landmark_id,
+                    'pole_index': pole_index,
+                    'pos_x': location.x + BridgeHelper.offset[0],
+                    'pos_y': location.y - BridgeHelper.offset[1]
+                })
+            groups.append(group)
+
+        return groups
+
+    def spawn_sensor(self, sensor):
+        # The carla world can not be modified during a background tick (see pipelined mode).
+        self.carla.wait_tick()
 
-            if 'dropoff_general_rate' not in sensor.attributes:
-                lidar_bp.set_attribute('dropoff_general_rate', lidar_bp.get_attribute('dropoff_general_rate').recommended_values[0])
-                sensor.attributes['dropoff_general_rate'] = str(lidar_bp.get_attribute('dropoff_general_rate').recommended_values[0])
+        sensor_type = get_sensor_type(sensor.type_id)
+        if sensor_type is not None and sensor_type.blueprint is None:
+            return self._spawn_perception_sensor(sensor, sensor_type)
+        elif sensor_type is not None:
+            sensor_bp = self.carla.world.get_blueprint_library().find(sensor_type.blueprint)
 
-            if 'dropoff_intensity_limit' not in sensor.attributes:
-                lidar_bp.set_attribute('dropoff_intensity_limit', lidar_bp.get_attribute('dropoff_intensity_limit').recommended_values[0])
-                sensor.attributes['dropoff_intensity_limit'] = str(lidar_bp.get_attribute('dropoff_intensity_limit').recommended_values[0])
+            # Bridge options (e.g., semantic_tags) are not blueprint attributes.
+            for sensor_attribute in sensor.attributes:
+                if sensor_attribute not in sensor_type.options:
+                    sensor_bp.set_attribute(sensor_attribute, sensor.attributes[sensor_attribute])
 
-            if 'dropoff_zero_intensity' not in sensor.attributes:
-                lidar_bp.set_attribute('dropoff_zero_intensity', lidar_bp.get_attribute('dropoff_zero_intensity').recommended_values[0])
-                sensor.attributes['dropoff_zero_intensity'] = str(lidar_bp.get_attribute('dropoff_zero_intensity').recommended_values[0])
+            # set standard values if not set by user
+            for name, value in sensor_type.defaults.items():
+                if name not in sensor.attributes:
+                    if value is None:
+                        value = sensor_bp.get_attribute(name).recommended_values[0]
+                    sensor_bp.set_attribute(name, str(value))
+                    sensor.attributes[name] = str(value)
+            options = get_sensor_options(sensor_type, sensor.attributes)
 
             if sensor.HasField("location"):
                 location = carla.Location(float(sensor.location.x), float(sensor.location.y), float(sensor.location.z))
@@ -175,72 +346,483 @@ class SimulationSynchronization(object):
 
             transform = carla.Transform(location, rotation)
 
+            # The mosaic actor carrying the sensor may not be spawned in carla yet (see interest
+            # management). It is spawned right away and kept while the sensor exists.
+            if sensor.attached in self.mosaic_actor_ids:
+                self.sensor_carrier_ids.add(sensor.attached)
+                if sensor.attached not in self.mosaic2carla_ids:
+                    self.spawn_queue.discard(sensor.attached)
+                    self._spawn_mosaic_actor(sensor.attached)
+
             # check if id exists inside mosaic2carla_ids. If not try with direct carla_id to support carla sensor spawn
             if sensor.attached in self.mosaic2carla_ids:
                 to_attach = self.carla.get_actor(self.mosaic2carla_ids[sensor.attached])
             else:
                 to_attach = self.carla.get_actor(int(sensor.attached))
 
-            lidar = self.carla.world.spawn_actor(lidar_bp, transform, attach_to=to_attach)
+            carla_sensor = self.carla.world.spawn_actor(sensor_bp, transform, attach_to=to_attach)
+
+            sensor_id = str(carla_sensor.id)
+            def callback(event):
+                self._process_sensor_data(event, sensor_id, sensor_type.processor, options)
 
-            lidar.listen(lambda event: self.mosaic.process_lidar(event, str(lidar.id)))
+            carla_sensor.listen(callback)
 
-            self.sensors.update({lidar.id: lidar})
+            self.sensors.update({carla_sensor.id: carla_sensor})
+            self._sensor_callbacks[carla_sensor.id] = callback
+            if sensor.attached in self.sensor_carrier_ids:
+                self._sensor_hosts[carla_sensor.id] = sensor.attached
 
-            sensor.id = str(lidar.id)
+            sensor.id = sensor_id
 
             logging.debug(sensor)
             return sensor
         else:
+            logging.warning('Sensor type %s not supported (supported types: %s)', sensor.type_id,
+                            ', '.join(sorted(SENSOR_TYPES)))
             return None
 
+    def _spawn_perception_sensor(self, sensor, sensor_type):
+        """
+        Adds a virtual perception sensor (see PerceptionSensor) to the given mosaic actor. Its range,
+        horizontal_fov and occlusion are taken from the sensor attributes.
+        """
+        attached = sensor.attached
+        if attached not in self.mosaic_actor_ids and attached not in self.carla2mosaic_ids.values():
+            # Carla controlled actors may be given by their carla id.
+            attached = self.carla2mosaic_ids.get(int(attached)) if attached.isdigit() else None
+            if attached is None:
+                logging.warning('Perception sensor attached to unknown actor %s', sensor.attached)
+                return None
+
+        options = get_sensor_options(sensor_type, sensor.attributes)
+        sensor.attributes.update(options)
+
+        sensor_id = 'perception_{}'.format(self._perception_count)
+        self._perception_count += 1
+        self.perception_sensors[sensor_id] = PerceptionSensor(
+            sensor_id, attached, (sensor.location.x, sensor.location.y), sensor.rotation.angle,
+            float(options['range']), float(options['horizontal_fov']),
+            options['occlusion'].lower() in ('true', '1'), float(options['sensor_tick']))
+
+        sensor.id = sensor_id
+        logging.debug(sensor)
+        return sensor
+
+    def _update_perception(self):
+        """
+        Adds the detections of the perception sensors to the step result.
+        """
+        # Carla controlled actors are placed at their pose in the last carla frame, as the vehicle
+        # table of the server does not track them.
+        mosaic_actor_ids = list(self.mosaic_actor_ids)
+        carla_actor_ids = [actor_id for actor_id in self.carla2mosaic_ids.values()
+                           if actor_id in self._carla_actor_poses]
+        actor_ids = mosaic_actor_ids + carla_actor_ids
+        poses = self.mosaic.get_actor_poses(mosaic_actor_ids)
+        if carla_actor_ids:
+            poses = np.concatenate([poses, [self._carla_actor_poses[actor_id]
+                                            for actor_id in carla_actor_ids]])
+        centers = get_box_centers(poses)
+
+        now = self._tick_count * self.carla.step_length
+        for perception_sensor in self.perception_sensors.values():
+            if not perception_sensor.is_due(now):
+                continue
+            sensor_data = perception_sensor.measure(actor_ids, poses, centers, now,
+                                                    self.mosaic.get_net_offset())
+            if sensor_data is not None:
+                self.mosaic.step_result.sensor_data.append(sensor_data)
+
+    def destroy_sensor(self, sensor_id):
+        """
+        Destroys the given sensor (carla or virtual one).
+
+            :return: True if the sensor existed. Otherwise, False.
+        """
+        if self.perception_sensors.pop(sensor_id, None) is not None:
+            return True
+
+        # Carla sensors are kept by their (integer) carla id.
+        carla_sensor = self.sensors.pop(int(sensor_id), None) if sensor_id.isdigit() else None
+        if carla_sensor is None:
+            return False
+
+        # The carla world can not be modified during a background tick (see pipelined mode).
+        self.carla.wait_tick()
+        carla_sensor.destroy()
+        self._sensor_callbacks.pop(carla_sensor.id, None)
+        self._last_outputs.pop(sensor_id, None)
+
+        # The host is no longer kept in carla once its last sensor is removed.
+        host = self._sensor_hosts.pop(carla_sensor.id, None)
+        if host is not None and host not in self._sensor_hosts.values():
+            self.sensor_carrier_ids.discard(host)
+        return True
+
+    def set_sensor_active(self, sensor_id, active):
+        """
+        Pauses or resumes the given sensor. Paused carla sensors stop listening, so that carla does
+        not produce nor send their data, without the cost of destroying and spawning them again.
+
+            :return: True if the sensor exists. Otherwise, False.
+        """
+        perception_sensor = self.perception_sensors.get(sensor_id)
+        if perception_sensor is not None:
+            perception_sensor.active = active
+            return True
+
+        carla_sensor = self.sensors.get(int(sensor_id)) if sensor_id.isdigit() else None
+        if carla_sensor is None:
+            return False
+
+        self.carla.wait_tick()
+        if not active and carla_sensor.is_listening:
+            carla_sensor.stop()
+        elif active and not carla_sensor.is_listening:
+            carla_sensor.listen(self._sensor_callbacks[carla_sensor.id])
+        logging.debug('Sensor %s %s', sensor_id, 'resumed' if active else 'paused')
+        return True
+
+    def _process_sensor_data(self, data, sensor_id, processor, options):
+        """
+        Sends the given sensor measurement to mosaic, decimated according to the current quality.
+        """
+        quality = self.quality
+        if quality.lidar_interval > 1 and data.frame % quality.lidar_interval != 0:
+            return
+
+        # Bridge side decimation (see output_tick).
+        output_tick = float(options.get('output_tick', 0))
+        if output_tick > 0:
+            last_output = self._last_outputs.get(sensor_id)
+            if last_output is not None and data.timestamp - last_output < output_tick - 1e-9:
+                return
+            self._last_outputs[sensor_id] = data.timestamp
+
+        self.mosaic.process_sensor_data(data, sensor_id, processor, options, quality.point_stride)
+
+    def _apply_quality(self):
+        """
+        Applies the quality of the current overload level.
+        """
+        self.quality = self.overload.quality
+
+        # The configured spawn limit, if any, still applies.
+        max_spawns = self.quality.max_spawns
+        if self.max_spawns_per_tick > 0 and not 0 < max_spawns < self.max_spawns_per_tick:
+            max_spawns = self.max_spawns_per_tick
+        self.spawn_queue.max_spawns = max_spawns
+
+    def _get_interest_locations(self):
+        """
+        Returns the carla locations of the sensors and the carla controlled actors.
+        """
+        locations = []
+        for sensor in self.sensors.values():
+            if sensor is not None and sensor.is_alive:
+                locations.append(sensor.get_location())
+
+        for carla_actor_id in self.carla2mosaic_ids:
+            carla_actor = self.carla.get_actor(carla_actor_id)
+            if carla_actor is not None:
+                locations.append(carla_actor.get_location())
+
+        return locations
+
+    def _get_spawn_priorities(self, mosaic_actor_ids):
+        """
+        Returns the spawn priority of each of the given mosaic actors (i.e., the distance to the
+        closest interest location, in the mosaic plane). Without interest locations, all the actors
+        have the same priority.
+        """
+        centers = [BridgeHelper.get_mosaic_location(location)
+                   for location in self._get_interest_locations()]
+        if not centers:
+            return [0.0] * len(mosaic_actor_ids)
+
+        # Positions read from the vehicle table, without a request per actor.
+        positions = self.mosaic.get_actor_locations(mosaic_actor_ids)
+        deltas = positions[:, np.newaxis, :] - np.asarray(centers)[np.newaxis, :, :]
+        return np.hypot(deltas[:, :, 0], deltas[:, :, 1]).min(axis=1).tolist()
+
+    def _update_interest(self):
+        """
+        Spawns in carla the mosaic actors entering the interest area and destroys the ones leaving
+        it (with hysteresis), based on a spatial index over the current mosaic positions.
+        """
+        mosaic_actor_ids = list(self.mosaic_actor_ids)
+        self.spatial_index.build(mosaic_actor_ids, self.mosaic.get_actor_locations(mosaic_actor_ids))
+
+        centers = [BridgeHelper.get_mosaic_location(location)
+                   for location in self._get_interest_locations()]
+        inside = self.spatial_index.query_many(centers, self.interest_radius)
+        keep = self.spatial_index.query_many(centers,
+                                             self.interest_radius + self.interest_hysteresis)
+        keep |= self.sensor_carrier_ids
+
+        # Leaving actors.
+        for mosaic_actor_id in [i for i in self.mosaic2carla_ids if i not in keep]:
+            self.carla.destroy_actor(self.mosaic2carla_ids.pop(mosaic_actor_id))
+            self.profiler.count('destroyed')
+            self.mosaic.unsubscribe(mosaic_actor_id)
+        for mosaic_actor_id in self.spawn_queue:
+            if mosaic_actor_id not in keep and self.spawn_queue.discard(mosaic_actor_id):
+                self.mosaic.unsubscribe(mosaic_actor_id)
+
+        # Entering actors, closest first.
+        entering = [
+            i for i in inside if i not in self.mosaic2carla_ids and i not in self.spawn_queue
+        ]
+        for mosaic_actor_id, distance in zip(entering,
+                                             self.spatial_index.distances(centers, entering)):
+            self.mosaic.subscribe(mosaic_actor_id)
+            self.spawn_queue.push(mosaic_actor_id, float(distance))
+
+    def _run_substeps(self, carla_actor_ids, carla_transforms):
+        """
+        Runs the intermediate carla ticks of a co-simulation step. Mosaic actors are linearly
+        interpolated between the transform sent at the previous step and the new one.
+        """
+        previous = self._carla_transforms
+        updates = [(carla_actor_id, previous[carla_actor_id], carla_transform)
+                   for carla_actor_id, carla_transform in zip(carla_actor_ids, carla_transforms)
+                   if carla_actor_id in previous]
+
+        for substep in range(1, self.carla.substeps):
+            alpha = substep / self.carla.substeps
+            self.carla.synchronize_vehicle_transforms(
+                [carla_actor_id for carla_actor_id, _, _ in updates],
+                [BridgeHelper.interpolate_transform(from_transform, to_transform, alpha)
+                 for _, from_transform, to_transform in updates])
+            self.carla.substep()
+
+        spawned_actor_ids = set(self.mosaic2carla_ids.values())
+        self._carla_transforms = {
+            carla_actor_id: transform
+            for carla_actor_id, transform in previous.items() if carla_actor_id in spawned_actor_ids
+        }
+        self._carla_transforms.update(zip(carla_actor_ids, carla_transforms))
+
+    @staticmethod
+    def _decimate_sensor_data(sensor_data):
+        """
+        Only keeps the last sensor data of each sensor in the given sensor data.
+        """
+        last = {}  # {sensor_id: index}
+        for i, data in enumerate(sensor_data):
+            last[data.id] = i
+
+        for i in reversed(range(len(sensor_data))):
+            if last[sensor_data[i].id] != i:
+                del sensor_data[i]
+
+    def _get_lod_updates(self, mosaic_actor_ids, far_interval=1):
+        """
+        Returns the mosaic actors, from the given ones, to be updated in carla at this tick according
+        to their update tier. Far actors are updated at most every far_interval ticks. Without update
+        tiers (i.e., under overload only), the actors within lod_mid_radius are updated every tick.
+        """
+        positions = self.mosaic.get_actor_locations(mosaic_actor_ids)
+        self.lod_index.build(mosaic_actor_ids, positions)
+
+        centers = [BridgeHelper.get_mosaic_location(location)
+                   for location in self._get_interest_locations()]
+        if self.lod_near_radius > 0:
+            near = self.lod_index.query_many(centers, self.lod_near_radius)
+            mid = self.lod_index.query_many(centers, self.lod_mid_radius)
+        else:
+            near = mid = self.lod_index.query_many(centers, self.lod_mid_radius)
+
+        updates = []
+        last_updates = {}
+        for mosaic_actor_id, (x, y) in zip(mosaic_actor_ids, positions):
+            last_update = self._lod_updates.get(mosaic_actor_id)
+
+            if (last_update is None or mosaic_actor_id in near or
+                    mosaic_actor_id in self.sensor_carrier_ids):
+                update = True
+            elif mosaic_actor_id in mid:
+                update = self._tick_count - last_update[0] >= self.lod_mid_interval
+            else:
+                update = self._tick_count - last_update[0] >= far_interval
+                if self.lod_near_radius > 0:
+                    update = update and math.hypot(x - last_update[1],
+                                                   y - last_update[2]) >= self.lod_far_distance
+
+            if update:
+                updates.append(mosaic_actor_id)
+                last_update = (self._tick_count, x, y)
+            last_updates[mosaic_actor_id] = last_update
+
+        # Only keeps the currently spawned actors.
+        self._lod_updates = last_updates
+        return updates
+
+    def _spawn_mosaic_actor(self, mosaic_actor_id):
+        """
+        Spawns the given mosaic actor in carla, at its current position.
+        """
+        mosaic_actor = self.mosaic.get_actor(mosaic_actor_id)
+
+        carla_blueprint = BridgeHelper.get_carla_blueprint(mosaic_actor, self.sync_vehicle_color)
+        if carla_blueprint is not None:
+            carla_transform = BridgeHelper.get_carla_transform(mosaic_actor.transform,
+                                                               mosaic_actor.extent)
+
+            carla_actor_id = self.carla.spawn_actor(carla_blueprint, carla_transform)
+            if carla_actor_id != INVALID_ACTOR_ID:
+                self.mosaic2carla_ids[mosaic_actor_id] = carla_actor_id
+                self.profiler.count('spawned')
+                # New (or pooled) actors are not interpolated until their next step.
+                self._carla_transforms.pop(carla_actor_id, None)
+        else:
+            self.mosaic.unsubscribe(mosaic_actor_id)
+
     def tick(self):
         """
         Tick to simulation synchronization
+
+            :return: step result of the tick (a new message, owned by the caller).
         """
-        # -----------------
-        # mosaic-->carla sync
-        # -----------------
+        if self.overload is not None:
+            self.overload.start_tick()
+
         self.mosaic.tick()
+        self.profiler.lap('mosaic_read')
+
+        # Sensor data is collected as soon as the carla frame is complete (i.e., after wait_tick in
+        # pipelined mode) and before the next background tick starts, so that the measurements of a
+        # frame are neither lost between steps nor mixed with the ones of the frame being computed.
+        if self.pipelined:
+            if self._pending_frame:
+                self.carla.wait_tick()
+                self.profiler.lap('carla_tick')
+                self._synchronize_carla()
+                self.profiler.lap('carla_sync')
+            step_result = self._take_sensor_data()
+            self._synchronize_mosaic()
+            self.carla.tick_async()
+            self._pending_frame = True
+            self.profiler.lap('carla_tick')
+        else:
+            self._synchronize_mosaic()
+            self.carla.tick()
+            self.profiler.lap('carla_tick')
+            self._synchronize_carla()
+            self.profiler.lap('carla_sync')
+            step_result = self._take_sensor_data()
 
-        # Spawning new mosaic actors in carla (i.e, not controlled by carla).
-        mosaic_spawned_actors = self.mosaic.spawned_actors - set(self.carla2mosaic_ids.values())
-        for mosaic_actor_id in mosaic_spawned_actors:
-            self.mosaic.subscribe(mosaic_actor_id)
-            mosaic_actor = self.mosaic.get_actor(mosaic_actor_id)
+        if any(perception_sensor.active for perception_sensor in self.perception_sensors.values()):
+            self._update_perception()
+            self.profiler.lap('carla_sync')
+        step_result.MergeFrom(self.mosaic.step_result)
 
-            carla_blueprint = BridgeHelper.get_carla_blueprint(mosaic_actor, self.sync_vehicle_color)
-            if carla_blueprint is not None:
-                carla_transform = BridgeHelper.get_carla_transform(mosaic_actor.transform,
-                                                                   mosaic_actor.extent)
+        if len(self.sensors) > 0 and len(step_result.sensor_data) == 0:
+            logging.debug('returning step result with empty sensor data')
 
-                carla_actor_id = self.carla.spawn_actor(carla_blueprint, carla_transform)
-                if carla_actor_id != INVALID_ACTOR_ID:
-                    self.mosaic2carla_ids[mosaic_actor_id] = carla_actor_id
-            else:
-                self.mosaic.unsubscribe(mosaic_actor_id)
+        if self.overload is not None and self.overload.end_tick():
+            self._apply_quality()
+
+        return step_result
+
+    def _take_sensor_data(self):
+        """
+        Returns a new step result holding the sensor data of the last complete carla frame, keeping
+        only the last measurement of each sensor with the 'last' aggregation of substeps.
+        """
+        step_result = self.mosaic.take_sensor_data()
+        if self.carla.substeps > 1 and self.sensor_aggregation == 'last':
+            self._decimate_sensor_data(step_result.sensor_data)
+            self.profiler.lap('carla_sync')
+        return step_result
 
-        # Destroying mosaic arrived actors in carla.
+    def _synchronize_mosaic(self):
+        """
+        Synchronizes the current mosaic step in carla (mosaic-->carla sync). It must not run during
+        a background carla tick.
+        """
+        # Queueing new mosaic actors to be spawned in carla (i.e, not controlled by carla). Actors
+        # close to sensors or carla controlled actors are spawned first. With interest management,
+        # actors are queued once they enter the interest area instead (see _update_interest).
+        mosaic_spawned_actors = self.mosaic.spawned_actors - set(self.carla2mosaic_ids.values())
+        self.mosaic_actor_ids.update(mosaic_spawned_actors)
+        if self.interest_radius <= 0 and mosaic_spawned_actors:
+            mosaic_spawned_actors = list(mosaic_spawned_actors)
+            priorities = self._get_spawn_priorities(mosaic_spawned_actors)
+            for mosaic_actor_id, priority in zip(mosaic_spawned_actors, priorities):
+                self.mosaic.subscribe(mosaic_actor_id)
+                self.spawn_queue.push(mosaic_actor_id, priority)
+
+        # Destroying mosaic arrived actors in carla. Arrived actors still waiting to be spawned are
+        # just dropped from the queue.
         for mosaic_actor_id in self.mosaic.destroyed_actors:
+            self.mosaic_actor_ids.discard(mosaic_actor_id)
+            self.sensor_carrier_ids.discard(mosaic_actor_id)
             if mosaic_actor_id in self.mosaic2carla_ids:
                 self.carla.destroy_actor(self.mosaic2carla_ids.pop(mosaic_actor_id))
+                self.profiler.count('destroyed')
+            elif self.spawn_queue.discard(mosaic_actor_id):
+                self.mosaic.unsubscribe(mosaic_actor_id)
+
+        if self.interest_radius > 0:
+            self._update_interest()
+
+        # Spawning queued mosaic actors in carla, within the per tick spawn budget.
+        self.spawn_queue.drain(self._spawn_mosaic_actor)
+        if self.spawn_queue:
+            logging.debug('%d mosaic actors waiting to be spawned in carla', len(self.spawn_queue))
+        self.profiler.lap('spawn')
 
         # Updating mosaic actors in carla.
-        for mosaic_actor_id in self.mosaic2carla_ids:
+        self._tick_count += 1
+        far_interval = self.quality.far_interval
+        if self.lod_near_radius > 0 or far_interval > 1:
+            mosaic_actor_ids = self._get_lod_updates(list(self.mosaic2carla_ids), far_interval)
+        else:
+            mosaic_actor_ids = self.mosaic2carla_ids
+            self._lod_updates = {}
+
+        now = self._tick_count * self.carla.step_length
+        if self.dead_reckoning is not None:
+            self.dead_reckoning.retain(self.mosaic2carla_ids)
+
+        carla_actor_ids = []
+        carla_transforms = []
+        current_carla_lights = []
+        mosaic_signals = []
+        for mosaic_actor_id in mosaic_actor_ids:
             carla_actor_id = self.mosaic2carla_ids[mosaic_actor_id]
 
             mosaic_actor = self.mosaic.get_actor(mosaic_actor_id)
-            carla_actor = self.carla.get_actor(carla_actor_id)
 
-            carla_transform = BridgeHelper.get_carla_transform(mosaic_actor.transform,
-                                                               mosaic_actor.extent)
+            carla_transform = None
+            if self.dead_reckoning is not None:
+                if self.mosaic.is_updated(mosaic_actor_id):
+                    carla_transform = self.dead_reckoning.update(
+                        mosaic_actor_id,
+                        BridgeHelper.get_carla_transform(mosaic_actor.transform,
+                                                         mosaic_actor.extent), now)
+                else:
+                    carla_transform = self.dead_reckoning.predict(mosaic_actor_id, now)
+
+            if carla_transform is None:
+                carla_transform = BridgeHelper.get_carla_transform(mosaic_actor.transform,
+                                                                   mosaic_actor.extent)
+
+            carla_actor_ids.append(carla_actor_id)
+            carla_transforms.append(carla_transform)
             if self.sync_vehicle_lights:
-                carla_lights = BridgeHelper.get_carla_lights_state(carla_actor.get_light_state(),
-                                                                   mosaic_actor.signals)
-            else:
-                carla_lights = None
+                carla_actor = self.carla.get_actor(carla_actor_id)
+                current_carla_lights.append(int(carla_actor.get_light_state()))
+                mosaic_signals.append(mosaic_actor.signals)
 
-            self.carla.synchronize_vehicle(carla_actor_id, carla_transform, carla_lights)
+        # Vehicle lights are converted at once for all the vehicles.
+        if self.sync_vehicle_lights:
+            carla_lights = BridgeHelper.get_carla_lights_states(current_carla_lights, mosaic_signals)
+        else:
+            carla_lights = [None] * len(carla_actor_ids)
+        self.profiler.lap('vehicle_sync')
 
         # Updates traffic lights in carla based on mosaic information.
         if self.tls_manager == 'mosaic':
@@ -250,12 +832,24 @@ class SimulationSynchronization(object):
                 carla_tl_state = BridgeHelper.get_carla_traffic_light_state(mosaic_tl_state)
 
                 self.carla.synchronize_traffic_light(landmark_id, carla_tl_state)
+        self.profiler.lap('traffic_lights')
 
-        # -----------------
-        # carla-->mosaic sync
-        # -----------------
-        self.carla.tick()
+        # Intermediate carla ticks, if any. The last carla tick is run with the new transforms.
+        if self.carla.substeps > 1:
+            self._run_substeps(carla_actor_ids, carla_transforms)
+            self.profiler.lap('substeps')
 
+        for carla_actor_id, carla_transform, lights in zip(carla_actor_ids, carla_transforms,
+                                                           carla_lights):
+            self.carla.synchronize_vehicle(carla_actor_id, carla_transform,
+                                           int(lights) if lights is not None else None)
+        self.profiler.count('moved', len(carla_actor_ids))
+        self.profiler.lap('vehicle_sync')
+
+    def _synchronize_carla(self):
+        """
+        Synchronizes the current carla frame in mosaic (carla-->mosaic sync).
+        """
         # Spawning new carla actors (not controlled by mosaic)
         carla_spawned_actors = self.carla.spawned_actors - set(self.mosaic2carla_ids.values())
         for carla_actor_id in carla_spawned_actors:
@@ -276,14 +870,19 @@ class SimulationSynchronization(object):
                 self.mosaic.destroy_actor(self.carla2mosaic_ids.pop(carla_actor_id))
 
         # Updating carla actors in mosaic.
+        self._carla_actor_poses.clear()
         for carla_actor_id in self.carla2mosaic_ids:
             mosaic_actor_id = self.carla2mosaic_ids[carla_actor_id]
 
             carla_actor = self.carla.get_actor(carla_actor_id)
             mosaic_actor = self.mosaic.get_actor(mosaic_actor_id)
 
-            mosaic_transform = BridgeHelper.get_mosaic_transform(carla_actor.get_transform(),
-                                                                 carla_actor.bounding_box.extent)
+            extent = carla_actor.bounding_box.extent
+            mosaic_transform = BridgeHelper.get_mosaic_transform(carla_actor.get_transform(), extent)
+            location = mosaic_transform.location
+            self._carla_actor_poses[mosaic_actor_id] = (location.x, location.y, location.z,
+                                                        mosaic_transform.rotation.yaw,
+                                                        2.0 * extent.x, 2.0 * extent.y)
             if self.sync_vehicle_lights:
                 carla_lights = self.carla.get_actor_light_state(carla_actor_id)
                 if carla_lights is not None:
@@ -306,15 +905,12 @@ class SimulationSynchronization(object):
                 # Updates all the mosaic links related to this landmark.
                 self.mosaic.synchronize_traffic_light(landmark_id, mosaic_tl_state)
 
-        if len(self.sensors) > 0 and len(self.mosaic.step_result.sensor_data) == 0:
-            logging.debug('returning self.mosaic.step_result with empty sensor data')
-
-        return self.mosaic.step_result
-
     def close(self):
         """
         Cleans synchronization.
         """
+        self.carla.wait_tick()
+
         # Configuring carla simulation in async mode.
         settings = self.carla.world.get_settings()
         settings.synchronous_mode = False
@@ -337,29 +933,49 @@ class SimulationSynchronization(object):
         self.carla.close()
         self.mosaic.close()
 
+        if self.overload is not None:
+            self.overload.close()
+
 
 class CarlaLinkServiceServicer(CarlaLink_pb2_grpc.CarlaLinkServiceServicer, object):
     """Provides methods that implement functionality of route guide server."""
 
-    def __init__(self, object):
+    def __init__(self, object, pacer=None):
         self.sync = object
+        self.pacer = pacer  # Optional real-time pacing of the steps (see Pacer).
         self.vehicles = dict()
+        self.updated_actors = set()  # Vehicles added or updated since the last step.
+        # Mosaic simulation reads vehicle positions in bulk from this table (see interest management)
+        # and the freshness of each vehicle (see dead reckoning).
+        self.sync.mosaic.vehicles = self.vehicles
+        self.sync.mosaic.updated_actors = self.updated_actors
         self.spawned_actors = list()
         self.destroyed_actors = list()
         self.traffic_lights = dict()
 
     def SimulationStep(self, request, context):
         logging.debug("SimulationStep call recieved!")
-        # create a deepcopy to delete sensor_data at the end of tick 
-        # to catch sensor_data that gets produced between ticks
-        step_result = copy.deepcopy(self.sync.tick())
-        del self.sync.mosaic.step_result.sensor_data[:]
+        profiler = self.sync.profiler
+        profiler.start_tick()
+
+        step_result = self.sync.tick()
+        profiler.lap('step_copy')
 
         for actor in self.destroyed_actors:
             self.vehicles.pop(actor.id)
 
         del self.destroyed_actors[:]
         del self.spawned_actors[:]
+        self.updated_actors.clear()
+
+        if profiler.enabled:
+            profiler.count('sensor_points', sum(len(data.lidar_points) for data in step_result.sensor_data))
+            profiler.count('message_bytes', step_result.ByteSize())
+            profiler.end_tick()
+
+        # Holds mosaic back until the deadline of the step.
+        if self.pacer is not None:
+            self.pacer.wait()
         logging.debug("SimulationStep ended!")
         return step_result
 
@@ -385,6 +1001,7 @@ class CarlaLinkServiceServicer(CarlaLink_pb2_grpc.CarlaLinkServiceServicer, obje
         # logging.debug('AddVehicle call recieved! id:', request.id)
         self.spawned_actors.append(request)
         self.vehicles.update({request.id: request})
+        self.updated_actors.add(request.id)
         return CarlaLink_pb2.Empty()
 
     def RemoveVehicle(self, request, context):
@@ -395,6 +1012,7 @@ class CarlaLinkServiceServicer(CarlaLink_pb2_grpc.CarlaLinkServiceServicer, obje
     def UpdateVehicle(self, request, context):
         # logging.debug('UpdateVehicle call recieved! id:', request.id)
         self.vehicles.update({request.id: request})
+        self.updated_actors.add(request.id)
         return CarlaLink_pb2.Empty()
 
     def GetTrafficLight(self, request, context):
@@ -419,10 +1037,15 @@ class CarlaLinkServiceServicer(CarlaLink_pb2_grpc.CarlaLinkServiceServicer, obje
         return new_sensor
 
     def RemoveSensor(self, request, context):
-        logging.debug('RemoveSensor call recieved! id:', request.id)
-        if request.id in self.sync.sensors:
-            self.sync.sensors[request.id].destroy()
-        # self.sync.sensors.pop(request.id)
+        logging.debug('RemoveSensor call recieved! id: %s', request.id)
+        self.sync.destroy_sensor(request.id)
+        return CarlaLink_pb2.Empty()
+
+    def SetSensorActive(self, request, context):
+        logging.debug('SetSensorActive call recieved! id: %s', request.id)
+        active = request.attributes.get('active', 'true').lower() not in ('false', '0')
+        if not self.sync.set_sensor_active(request.id, active):
+            logging.warning('SetSensorActive: unknown sensor %s', request.id)
         return CarlaLink_pb2.Empty()
 
 
@@ -430,17 +1053,71 @@ def synchronization_loop(args):
     """
     Entry point for mosaic-carla co-simulation.
     """
+    profiler = TickProfiler(args.profile_out, enabled=args.profile or args.profile_out is not None)
+
+    dead_reckoning = None
+    if args.dead_reckoning:
+        dead_reckoning = DeadReckoning(args.dead_reckoning_horizon,
+                                       args.dead_reckoning_convergence)
+
     mosaic_simulation = MosaicSimulation(args.mosaic_cfg_file, args.step_length, args.mosaic_host,
                                          args.mosaic_port, args.mosaic_gui, args.client_order)
-    carla_simulation = CarlaSimulation(args.carla_host, args.carla_port, args.step_length)
+    carla_simulation = CarlaSimulation(args.carla_host, args.carla_port, args.step_length,
+                                       args.carla_substeps)
+
+    pacer = None
+    if args.real_time_factor > 0:
+        pacer = Pacer(args.step_length, args.real_time_factor, args.max_lag, log_interval=200)
+
+    overload = None
+    if args.adaptive_quality:
+        if args.tick_budget_ms > 0:
+            budget = args.tick_budget_ms / 1000.0
+        else:
+            budget = pacer.period if pacer is not None else args.step_length
+        overload = OverloadController(budget, args.overload_window)
+
+    synchronization = SimulationSynchronization(mosaic_simulation,
+                                                carla_simulation,
+                                                tls_manager=args.tls_manager,
+                                                sync_vehicle_color=args.sync_vehicle_color,
+                                                sync_vehicle_lights=args.sync_vehicle_lights,
+                                                actor_pool_size=args.actor_pool_size,
+                                                max_spawns_per_tick=args.max_spawns_per_tick,
+                                                spawn_budget=args.spawn_budget_ms / 1000.0,
+                                                interest_radius=args.interest_radius,
+                                                interest_hysteresis=args.interest_hysteresis,
+                                                lod_near_radius=args.lod_near_radius,
+                                                lod_mid_radius=args.lod_mid_radius,
+                                                lod_mid_interval=args.lod_mid_interval,
+                                                lod_far_distance=args.lod_far_distance,
+                                                sensor_aggregation=args.sensor_aggregation,
+                                                dead_reckoning=dead_reckoning,
+                                                pipelined=args.pipelined,
+                                                profiler=profiler,
+                                                overload=overload)
+
+    # Per method grpc metrics, recorded by a server interceptor.
+    interceptors = []
+    if args.metrics_port > 0 or args.metrics_interval > 0:
+        rpc_metrics = RpcMetrics()
+        interceptors.append(RpcMetricsInterceptor(rpc_metrics))
+        if args.metrics_port > 0:
+            start_metrics_server(rpc_metrics, args.metrics_port)
+        if args.metrics_interval > 0:
+            start_metrics_logger(rpc_metrics, args.metrics_interval)
+
+    # Recording of the session, to be replayed offline.
+    recorder = None
+    if args.record is not None:
+        recorder = SessionRecorder(args.record)
+        interceptors.append(SessionRecorderInterceptor(recorder))
 
-    synchronization = SimulationSynchronization(mosaic_simulation, carla_simulation, args.tls_manager,
-                                                args.sync_vehicle_color, args.sync_vehicle_lights)
     try:
         logging.info('Starting grpc server on port 50051')
-        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=interceptors)
         CarlaLink_pb2_grpc.add_CarlaLinkServiceServicer_to_server(
-            CarlaLinkServiceServicer(synchronization), server)
+            CarlaLinkServiceServicer(synchronization, pacer), server)
         server.add_insecure_port('[::]:50051')
         server.start()
         logging.info('Waiting for incoming calls...')
@@ -453,6 +1130,12 @@ def synchronization_loop(args):
         logging.info('Cleaning synchronization')
 
         synchronization.close()
+        profiler.close()
+        if pacer is not None:
+            pacer.close()
+        if recorder is not None:
+            logging.info('%d records written to %s', recorder.records, recorder.path)
+            recorder.close()
 
 
 if __name__ == '__main__':
@@ -481,6 +1164,46 @@ if __name__ == '__main__':
                            default=0.05,
                            type=float,
                            help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--carla-substeps',
+                           metavar='K',
+                           default=1,
+                           type=int,
+                           help='number of carla ticks per co-simulation step, carla runs with a '
+                           'fixed delta of step-length / K seconds (default: 1)')
+    argparser.add_argument('--sensor-aggregation',
+                           type=str,
+                           choices=['all', 'last'],
+                           default='all',
+                           help='sensor data of the carla substeps sent to mosaic: all of it or only '
+                           'the last one of each sensor (default: all)')
+    argparser.add_argument('--real-time-factor',
+                           metavar='X',
+                           default=0.0,
+                           type=float,
+                           help='hold mosaic back so that the co-simulation runs at most X times '
+                           'faster than real time (default: 0, not paced)')
+    argparser.add_argument('--max-lag',
+                           metavar='S',
+                           default=1.0,
+                           type=float,
+                           help='maximum delay, in seconds, recovered by running the next steps '
+                           'without waiting, the schedule is restarted afterwards (default: 1.0)')
+    argparser.add_argument('--adaptive-quality',
+                           action='store_true',
+                           help='degrade the lidar data, the updates of far vehicles and the spawns '
+                           'while the ticks exceed their time budget (default: False)')
+    argparser.add_argument('--tick-budget-ms',
+                           metavar='T',
+                           default=0.0,
+                           type=float,
+                           help='tick time budget of --adaptive-quality (default: 0, step length / '
+                           'real-time factor)')
+    argparser.add_argument('--overload-window',
+                           metavar='N',
+                           default=20,
+                           type=int,
+                           help='number of ticks averaged before each quality change of '
+                           '--adaptive-quality (default: 20)')
     argparser.add_argument('--client-order',
                            metavar='TRACI_CLIENT_ORDER',
                            default=1,
@@ -500,6 +1223,104 @@ if __name__ == '__main__':
                            choices=['none', 'mosaic', 'carla'],
                            help="select traffic light manager (default: none)",
                            default='none')
+    argparser.add_argument('--actor-pool-size',
+                           metavar='N',
+                           default=0,
+                           type=int,
+                           help='reuse up to N parked carla vehicles instead of spawning and '
+                           'destroying them, not pre-spawned with --sync-vehicle-color (default: 0, '
+                           'disabled)')
+    argparser.add_argument('--max-spawns-per-tick',
+                           metavar='N',
+                           default=0,
+                           type=int,
+                           help='spawn at most N mosaic vehicles in carla per tick, the rest are '
+                           'deferred to the next ticks (default: 0, no limit)')
+    argparser.add_argument('--spawn-budget-ms',
+                           metavar='T',
+                           default=0.0,
+                           type=float,
+                           help='stop spawning mosaic vehicles in carla after T milliseconds per '
+                           'tick, the rest are deferred to the next ticks (default: 0, no limit)')
+    argparser.add_argument('--interest-radius',
+                           metavar='R',
+                           default=0.0,
+                           type=float,
+                           help='only spawn in carla the mosaic vehicles within R meters of a sensor '
+                           'or a carla controlled vehicle (default: 0, spawn all vehicles)')
+    argparser.add_argument('--interest-hysteresis',
+                           metavar='D',
+                           default=20.0,
+                           type=float,
+                           help='destroy vehicles spawned due to the interest radius only once they '
+                           'are D meters beyond it (default: 20.0)')
+    argparser.add_argument('--lod-near-radius',
+                           metavar='R',
+                           default=0.0,
+                           type=float,
+                           help='update in carla every tick only the mosaic vehicles within R meters '
+                           'of a sensor or a carla controlled vehicle (default: 0, update all '
+                           'vehicles every tick)')
+    argparser.add_argument('--lod-mid-radius',
+                           metavar='R',
+                           default=150.0,
+                           type=float,
+                           help='update the vehicles within R meters every --lod-mid-interval ticks '
+                           '(default: 150.0)')
+    argparser.add_argument('--lod-mid-interval',
+                           metavar='N',
+                           default=5,
+                           type=int,
+                           help='update interval, in ticks, of the mid range vehicles (default: 5)')
+    argparser.add_argument('--lod-far-distance',
+                           metavar='D',
+                           default=2.0,
+                           type=float,
+                           help='update the far vehicles only once they moved D meters (default: 2.0)')
+    argparser.add_argument('--dead-reckoning',
+                           action='store_true',
+                           help='extrapolate the mosaic vehicles without a fresh update at the '
+                           'current step (default: False)')
+    argparser.add_argument('--dead-reckoning-horizon',
+                           metavar='S',
+                           default=0.5,
+                           type=float,
+                           help='maximum extrapolation time, in seconds (default: 0.5)')
+    argparser.add_argument('--dead-reckoning-convergence',
+                           metavar='F',
+                           default=0.5,
+                           type=float,
+                           help='fraction of the prediction error kept at each step once a fresh '
+                           'update arrives, 0 snaps back immediately (default: 0.5)')
+    argparser.add_argument('--pipelined',
+                           action='store_true',
+                           help='run the carla tick in the background while mosaic computes its next '
+                           'step, carla results are sent one step later (default: False)')
+    argparser.add_argument('--profile',
+                           action='store_true',
+                           help='log rolling percentiles of the time spent in each phase of the tick '
+                           '(default: False)')
+    argparser.add_argument('--profile-out',
+                           metavar='FILE',
+                           default=None,
+                           help='write a per tick profile trace (*.csv or *.jsonl), implies --profile')
+    argparser.add_argument('--metrics-port',
+                           metavar='P',
+                           default=0,
+                           type=int,
+                           help='serve per method grpc metrics (prometheus text format) on '
+                           'http://127.0.0.1:P/metrics (default: 0, disabled)')
+    argparser.add_argument('--metrics-interval',
+                           metavar='S',
+                           default=0.0,
+                           type=float,
+                           help='log a summary of the grpc metrics every S seconds (default: 0, '
+                           'disabled)')
+    argparser.add_argument('--record',
+                           metavar='FILE',
+                           default=None,
+                           help='record the mosaic requests and the step results to the given '
+                           'session log, to be replayed with benchmark/replay.py')
     argparser.add_argument('--debug', action='store_true', help='enable debug messages')
     arguments = argparser.parse_args()
 
@@ -18,7 +18,6 @@ import random
 import re
 import shutil
 import tempfile
-import time
 
 import lxml.etree as ET  # pylint: disable=wrong-import-position
 
@@ -55,10 +54,14 @@ import mosaiclib  # pylint: disable=wrong-import-position
 import traci  # pylint: disable=wrong-import-position
 
 from mosaic_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
+from mosaic_integration.mosaic_net import load_net  # pylint: disable=wrong-import-position
 from mosaic_integration.mosaic_simulation import MosaicSimulation  # pylint: disable=wrong-import-position
+from mosaic_integration.pacing import Pacer  # pylint: disable=wrong-import-position
 
 from run_synchronization import SimulationSynchronization  # pylint: disable=wrong-import-position
 
+from mosaic_integration.traffic_light_mapping import TRAFFIC_LIGHT_MAPPING_CACHE_DIR  # pylint: disable=wrong-import-position
+
 from util.netconvert_carla import netconvert_carla
 
 # ==================================================================================================
@@ -105,7 +108,7 @@ def main(args):
     # mosaic simulation
     # ---------------
     net_file = os.path.join(tmpdir, current_map.name + '.net.xml')
-    netconvert_carla(xodr_file, net_file, guess_tls=True)
+    netconvert_carla(xodr_file, net_file, guess_tls=True, tls_mapping_dir=TRAFFIC_LIGHT_MAPPING_CACHE_DIR)
 
     basedir = os.path.dirname(os.path.realpath(__file__))
     cfg_file = os.path.join(tmpdir, current_map.name + '.mosaiccfg')
@@ -113,7 +116,7 @@ def main(args):
     viewsettings_file = os.path.join(basedir, 'examples', 'viewsettings.xml')
     write_mosaiccfg_xml(cfg_file, net_file, vtypes_file, viewsettings_file, args.additional_traci_clients)
 
-    mosaic_net = mosaiclib.net.readNet(net_file)
+    mosaic_net = load_net(net_file, mosaiclib.net.readNet)
     mosaic_simulation = MosaicSimulation(cfg_file,
                                      args.step_length,
                                      host=args.mosaic_host,
@@ -124,9 +127,13 @@ def main(args):
     # ---------------
     # synchronization
     # ---------------
-    synchronization = SimulationSynchronization(mosaic_simulation, carla_simulation, args.tls_manager,
-                                                args.sync_vehicle_color, args.sync_vehicle_lights)
+    synchronization = SimulationSynchronization(mosaic_simulation,
+                                                carla_simulation,
+                                                tls_manager=args.tls_manager,
+                                                sync_vehicle_color=args.sync_vehicle_color,
+                                                sync_vehicle_lights=args.sync_vehicle_lights)
 
+    pacer = None
     try:
         # ----------
         # Blueprints
@@ -170,9 +177,9 @@ def main(args):
             traci.route.add('route_{}'.format(i), [edge.getID()])
             traci.vehicle.add('mosaic_{}'.format(i), 'route_{}'.format(i), typeID=type_id)
 
+        pacer = Pacer(args.step_length, args.real_time_factor, args.max_lag, log_interval=200)
+        pacer.start()
         while True:
-            start = time.time()
-
             synchronization.tick()
 
             # Updates vehicle routes
@@ -190,16 +197,15 @@ def main(args):
                         new_route = [current_edge.getID(), next_edge.getID()]
                         traci.vehicle.setRoute(vehicle_id, new_route)
 
-            end = time.time()
-            elapsed = end - start
-            if elapsed < args.step_length:
-                time.sleep(args.step_length - elapsed)
+            pacer.wait()
 
     except KeyboardInterrupt:
         logging.info('Cancelled by user.')
 
     finally:
         synchronization.close()
+        if pacer is not None:
+            pacer.close()
 
         if os.path.exists(tmpdir):
             shutil.rmtree(tmpdir)
@@ -253,6 +259,18 @@ if __name__ == '__main__':
                            default=0.05,
                            type=float,
                            help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--real-time-factor',
+                           metavar='X',
+                           default=1.0,
+                           type=float,
+                           help='simulated seconds per wall clock second (default: 1.0, 0 runs as '
+                           'fast as possible)')
+    argparser.add_argument('--max-lag',
+                           metavar='S',
+                           default=1.0,
+                           type=float,
+                           help='maximum delay, in seconds, recovered by running the next steps '
+                           'without waiting, the schedule is restarted afterwards (default: 1.0)')
     argparser.add_argument('--additional-traci-clients',
                            metavar='TRACI_CLIENTS',
                            default=0,
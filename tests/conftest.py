@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Test setup: the co-simulation modules run against the carla stand-in (util/carla_mock). """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import os
+import sys
+
+from concurrent import futures
+
+import grpc
+
+BASE_DIR = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+sys.path.insert(0, os.path.join(BASE_DIR, 'util', 'carla_mock'))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'benchmark'))
+
+# The co-simulation modules read their data files (e.g., data/vtypes.json) relative to the
+# repository root.
+os.chdir(BASE_DIR)
+
+import carla  # pylint: disable=import-error,wrong-import-position
+
+import CarlaLink_pb2_grpc  # pylint: disable=wrong-import-position
+
+from run_synchronization import CarlaLinkServiceServicer, SimulationSynchronization  # pylint: disable=wrong-import-position
+from mosaic_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
+from mosaic_integration.mosaic_simulation import MosaicSimulation  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+STEP_LENGTH = 0.05
+
+
+def start_bridge(interceptors=(), latency=None, **options):
+    """
+    Starts a bridge (synchronization of a fresh carla world and grpc server on port 50051) with three
+    carla vehicles on autopilot.
+
+        :param interceptors: grpc server interceptors.
+        :param latency: (optional) function injecting latency in the simulations, called with the
+            mosaic and carla simulations.
+        :param options: SimulationSynchronization options.
+        :return: (synchronization, server, channel to the server)
+    """
+    carla.Client._world = None  # pylint: disable=protected-access
+
+    mosaic_simulation = MosaicSimulation(os.path.join(BASE_DIR, 'example', 'Town01.sumocfg'),
+                                         STEP_LENGTH)
+    carla_simulation = CarlaSimulation('127.0.0.1', 2000, STEP_LENGTH)
+    synchronization = SimulationSynchronization(mosaic_simulation, carla_simulation, **options)
+    if latency is not None:
+        latency(mosaic_simulation, carla_simulation)
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4), interceptors=interceptors)
+    CarlaLink_pb2_grpc.add_CarlaLinkServiceServicer_to_server(
+        CarlaLinkServiceServicer(synchronization), server)
+    server.add_insecure_port('[::]:50051')
+    server.start()
+    channel = grpc.insecure_channel('127.0.0.1:50051',
+                                    options=[('grpc.max_receive_message_length', -1)])
+
+    world = carla_simulation.world
+    blueprint = world.get_blueprint_library().find('vehicle.audi.a2')
+    for i in range(3):
+        vehicle = world.spawn_actor(
+            blueprint, carla.Transform(carla.Location(20.0 * i, -10.0 * i, 0.0),
+                                       carla.Rotation(yaw=30.0 * i)))
+        vehicle.set_autopilot(True)
+
+    return synchronization, server, channel
+
+
+def stop_bridge(synchronization, server, channel):
+    """
+    Stops a bridge started with start_bridge.
+    """
+    channel.close()
+    server.stop(None)
+    synchronization.close()
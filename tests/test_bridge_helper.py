@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Checks the vehicle lights lookup tables of BridgeHelper against the reference functions. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import itertools
+
+import numpy as np
+
+import carla  # pylint: disable=import-error
+
+from mosaic_integration.bridge_helper import BridgeHelper, _compute_carla_lights_state, _compute_mosaic_lights_state
+from mosaic_integration.mosaic_simulation import MosaicVehSignal
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# All the mosaic signals and carla light states.
+MOSAIC_SIGNALS = range(1 << int(MosaicVehSignal.EMERGENCY_YELLOW).bit_length())
+CARLA_LIGHTS = range(1 << max(int(light) for light in carla.VehicleLightState).bit_length())
+
+# Signals and lights read by the reference functions. The other bits are kept unchanged.
+MAPPED_MOSAIC_SIGNALS = [
+    MosaicVehSignal.BLINKER_RIGHT, MosaicVehSignal.BLINKER_LEFT, MosaicVehSignal.BLINKER_EMERGENCY,
+    MosaicVehSignal.BRAKELIGHT, MosaicVehSignal.FRONTLIGHT, MosaicVehSignal.FOGLIGHT,
+    MosaicVehSignal.HIGHBEAM, MosaicVehSignal.BACKDRIVE, MosaicVehSignal.DOOR_OPEN_LEFT,
+    MosaicVehSignal.DOOR_OPEN_RIGHT
+]
+MAPPED_CARLA_LIGHTS = [
+    carla.VehicleLightState.Position, carla.VehicleLightState.LowBeam,
+    carla.VehicleLightState.HighBeam, carla.VehicleLightState.Brake,
+    carla.VehicleLightState.RightBlinker, carla.VehicleLightState.LeftBlinker,
+    carla.VehicleLightState.Reverse, carla.VehicleLightState.Fog
+]
+
+
+def get_combinations(flags):
+    """
+    Returns all the combinations (bitwise or) of the given flags.
+    """
+    values = [0]
+    for flag in flags:
+        values += [value | int(flag) for value in values]
+    return values
+
+
+def get_inputs(first, second):
+    """
+    Returns the (first, second) inputs of a lights state function: every combination of the mapped
+    bits of both arguments, and every value of each argument against a few values of the other one.
+    """
+    inputs = list(itertools.product(first[0], second[0]))
+    inputs += itertools.product(first[1], second[1])
+    inputs += itertools.product(first[2], second[2])
+    return inputs
+
+
+def check_lights_state(scalar, bulk, reference, inputs):
+    currents, values = (list(values) for values in zip(*inputs))
+    expected = [int(reference(current, value)) for current, value in inputs]
+
+    assert [int(scalar(current, value)) for current, value in inputs] == expected
+    assert bulk(currents, values).tolist() == expected
+    assert bulk(np.array(currents), np.array(values)).dtype == np.int64
+
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_carla_lights_state():
+    mapped_lights = get_combinations(MAPPED_CARLA_LIGHTS)
+    mapped_signals = get_combinations(MAPPED_MOSAIC_SIGNALS)
+    inputs = get_inputs((mapped_lights, CARLA_LIGHTS, [0, max(mapped_lights), 0x155, 0x2aa]),
+                        (mapped_signals, [0, max(mapped_signals), 0x1555, 0x2aaa], MOSAIC_SIGNALS))
+
+    check_lights_state(BridgeHelper.get_carla_lights_state, BridgeHelper.get_carla_lights_states,
+                       _compute_carla_lights_state, inputs)
+
+
+def test_mosaic_lights_state():
+    mapped_signals = get_combinations(MAPPED_MOSAIC_SIGNALS)
+    mapped_lights = get_combinations(MAPPED_CARLA_LIGHTS)
+    inputs = get_inputs((mapped_signals, MOSAIC_SIGNALS, [0, max(mapped_signals), 0x1555, 0x2aaa]),
+                        (mapped_lights, [0, max(mapped_lights), 0x155, 0x2aa], CARLA_LIGHTS))
+
+    check_lights_state(BridgeHelper.get_mosaic_lights_state, BridgeHelper.get_mosaic_lights_states,
+                       _compute_mosaic_lights_state, inputs)
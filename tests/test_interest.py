@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Checks that interest management keeps sensor carriers in carla only while they carry sensors. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import random
+
+import CarlaLink_pb2
+import CarlaLink_pb2_grpc
+
+from conftest import STEP_LENGTH, start_bridge, stop_bridge
+from load_generator import CircleTrajectoryModel, LoadGenerator
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_removed_sensor_releases_its_host():
+    # A single mosaic vehicle, far (more than interest_radius + interest_hysteresis) from the carla
+    # vehicles: it is only spawned in carla because of its sensor.
+    synchronization, server, channel = bridge = start_bridge(interest_radius=30.0,
+                                                             interest_hysteresis=20.0)
+    stub = CarlaLink_pb2_grpc.CarlaLinkServiceStub(channel)
+    trajectory_model = CircleTrajectoryModel((200.0, 200.0), 30.0, 1, ['vehicle.audi.a2'],
+                                             random.Random(0))
+    generator = LoadGenerator(stub, trajectory_model, vehicles=1, step_length=STEP_LENGTH,
+                              lidars=1)
+    try:
+        generator.step()
+        host = next(iter(generator.vehicles))
+        assert host not in synchronization.mosaic2carla_ids
+
+        for _ in range(3):
+            generator.step()
+        assert generator.sensor_ids
+        assert host in synchronization.sensor_carrier_ids
+        assert host in synchronization.mosaic2carla_ids
+
+        for sensor in list(synchronization.sensors):
+            stub.RemoveSensor(CarlaLink_pb2.Sensor(id=str(sensor)))
+        for _ in range(3):
+            generator.step()
+        assert host not in synchronization.sensor_carrier_ids
+        assert host not in synchronization.mosaic2carla_ids
+    finally:
+        stop_bridge(*bridge)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Checks the compiled net cache against nets regenerated at every launch. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import os
+
+import lxml.etree as ET  # pylint: disable=import-error
+
+from conftest import BASE_DIR
+from mosaic_integration.mosaic_net import CompiledNet, load_net, read_net
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+NET_FILE = os.path.join(BASE_DIR, 'example', 'net', 'Town01.net.xml')
+
+# Header written by netconvert: generation date and output file.
+NET_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<!-- generated on {date} by Eclipse SUMO netconvert Version 1.8.0
+<configuration>
+    <output>
+        <output-file value="{output}"/>
+    </output>
+</configuration>
+-->
+'''
+
+
+def generate_net(output_dir, date, speed=None):
+    """
+    Writes the example net as netconvert_carla.py does (netconvert header and lxml rewrite) and
+    returns its path.
+
+        :param speed: (optional) speed of the first lane, to change the content of the net.
+    """
+    os.makedirs(str(output_dir), exist_ok=True)
+    output = os.path.join(str(output_dir), 'Town01.net.xml')
+    with open(NET_FILE, encoding='utf-8') as f:
+        body = f.read().split('?>', 1)[1]
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(NET_HEADER.format(date=date, output=output) + body)
+
+    tree = ET.parse(output, ET.XMLParser(remove_blank_text=True))
+    if speed is not None:
+        tree.xpath('//lane')[0].set('speed', speed)
+    tree.write(output, pretty_print=True, encoding='UTF-8', xml_declaration=True)
+    return output
+
+
+class CountingReader(object):
+    """
+    Net reader counting the nets actually read (i.e., the cache misses).
+    """
+    def __init__(self):
+        self.reads = 0
+
+    def __call__(self, net_file):
+        self.reads += 1
+        return read_net(net_file)
+
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_regenerated_net_hits_the_cache(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    reader = CountingReader()
+
+    first = load_net(generate_net(tmp_path / 'first', 'Mon Oct 19 10:00:00 2026'), reader,
+                     cache_dir)
+    second = load_net(generate_net(tmp_path / 'second', 'Mon Oct 19 10:05:00 2026'), reader,
+                      cache_dir)
+
+    assert reader.reads == 1
+    assert isinstance(second, CompiledNet)
+    assert second.getLocationOffset() == tuple(first.getLocationOffset())
+    assert len(second.getEdges()) == len(first.getEdges())
+
+
+def test_changed_net_misses_the_cache(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    reader = CountingReader()
+
+    load_net(generate_net(tmp_path / 'first', 'Mon Oct 19 10:00:00 2026'), reader, cache_dir)
+    load_net(generate_net(tmp_path / 'second', 'Mon Oct 19 10:05:00 2026', speed='1.00'), reader,
+             cache_dir)
+
+    assert reader.reads == 2
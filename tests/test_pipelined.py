@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Checks that the pipelined mode returns the step results of the sequential one, a step later. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import random
+import time
+
+import pytest
+
+import CarlaLink_pb2_grpc
+
+from conftest import STEP_LENGTH, start_bridge, stop_bridge
+from load_generator import CircleTrajectoryModel, LoadGenerator
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+STEPS = 40
+
+
+def run_session(pipelined, steps=STEPS, latency=None):
+    """
+    Runs a co-simulation session (mosaic vehicles carrying lidars and carla vehicles on autopilot)
+    and returns the step results.
+
+        :param latency: (optional) function injecting latency in the simulations (see start_bridge).
+    """
+    bridge = start_bridge(latency=latency, pipelined=pipelined)
+
+    rng = random.Random(0)
+    trajectory_model = CircleTrajectoryModel((200.0, 200.0), 30.0, 2,
+                                             ['vehicle.audi.a2', 'vehicle.audi.tt'], rng)
+    generator = LoadGenerator(CarlaLink_pb2_grpc.CarlaLinkServiceStub(bridge[2]),
+                              trajectory_model,
+                              vehicles=20,
+                              churn=5.0,
+                              step_length=STEP_LENGTH,
+                              lidars=2,
+                              lidar_attributes={'points_per_second': '20000'})
+    try:
+        return [generator.step() for _ in range(steps)]
+    finally:
+        stop_bridge(*bridge)
+
+
+def delay_sensor_data(mosaic_simulation, carla_simulation):
+    """
+    Delays the collection of the sensor data, giving the background tick time to deliver its
+    measurements before.
+    """
+    take_sensor_data = mosaic_simulation.take_sensor_data
+
+    def delayed_take_sensor_data():
+        time.sleep(0.02)
+        return take_sensor_data()
+
+    mosaic_simulation.take_sensor_data = delayed_take_sensor_data
+
+
+def complete_tick_early(mosaic_simulation, carla_simulation):
+    """
+    Completes each background tick (sensor callbacks included) before tick_async returns.
+    """
+    tick_async = carla_simulation.tick_async
+
+    def early_tick_async():
+        tick_async()
+        carla_simulation._pending_tick.exception()  # pylint: disable=protected-access
+
+    carla_simulation.tick_async = early_tick_async
+
+
+def delay_tick(mosaic_simulation, carla_simulation):
+    """
+    Delays each carla tick, so that the sensor callbacks arrive late.
+    """
+    world = carla_simulation.world
+    tick = world.tick
+
+    def delayed_tick(*args, **kwargs):
+        time.sleep(0.02)
+        return tick(*args, **kwargs)
+
+    world.tick = delayed_tick
+
+
+@pytest.fixture(scope='module')
+def sequential_results():
+    return run_session(pipelined=False)
+
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+@pytest.mark.parametrize('latency', [None, delay_sensor_data, complete_tick_early, delay_tick])
+def test_pipelined_results_lag_one_step(sequential_results, latency):
+    sequential = sequential_results
+    pipelined = run_session(pipelined=True, latency=latency)
+
+    # Nothing comes back from carla before the first background tick completes.
+    assert len(pipelined[0].move_actors) == 0
+    assert len(pipelined[0].sensor_data) == 0
+
+    assert sum(len(result.move_actors) for result in sequential) > 0
+    assert sum(len(result.sensor_data) for result in sequential) > 0
+    for step, (expected, result) in enumerate(zip(sequential, pipelined[1:])):
+        assert result.add_actors == expected.add_actors, step
+        assert result.remove_actors == expected.remove_actors, step
+        assert result.move_actors == expected.move_actors, step
+        assert result.sensor_data == expected.sensor_data, step
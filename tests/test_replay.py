@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Checks that a recorded session holds, and replays, the calls of mosaic only. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import collections
+import random
+
+import grpc
+
+import CarlaLink_pb2_grpc
+
+from conftest import STEP_LENGTH, start_bridge, stop_bridge
+from load_generator import CircleTrajectoryModel, LoadGenerator
+from replay import load_session, replay
+from mosaic_integration.session_recorder import SessionRecorder, SessionRecorderInterceptor
+
+# ==================================================================================================
+# -- helpers ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+STEPS = 30
+
+
+class CallCounter(grpc.UnaryUnaryClientInterceptor):
+    """
+    Client interceptor counting the calls of each method, per step (a step ends with its
+    SimulationStep call).
+    """
+    def __init__(self):
+        self.steps = [collections.Counter()]
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = client_call_details.method.rsplit('/', 1)[-1]
+        self.steps[-1][method] += 1
+        if method == 'SimulationStep':
+            self.steps.append(collections.Counter())
+        return continuation(client_call_details, request)
+
+
+def get_stub(channel, counter):
+    return CarlaLink_pb2_grpc.CarlaLinkServiceStub(grpc.intercept_channel(channel, counter))
+
+
+def get_recorded_calls(steps):
+    return [collections.Counter(record.method for record, _ in records) for records in steps]
+
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_replay_sends_the_recorded_calls(tmp_path):
+    path = str(tmp_path / 'session.log')
+
+    # Recording a session with vehicles churning, lidars and carla vehicles (whose AddVehicle calls
+    # are issued by the bridge itself during SimulationStep).
+    recorder = SessionRecorder(path)
+    bridge = start_bridge(interceptors=[SessionRecorderInterceptor(recorder)])
+    mosaic_calls = CallCounter()
+    trajectory_model = CircleTrajectoryModel((200.0, 200.0), 30.0, 2,
+                                             ['vehicle.audi.a2', 'vehicle.audi.tt'],
+                                             random.Random(0))
+    generator = LoadGenerator(get_stub(bridge[2], mosaic_calls),
+                              trajectory_model,
+                              vehicles=10,
+                              churn=5.0,
+                              step_length=STEP_LENGTH,
+                              lidars=2)
+    try:
+        for _ in range(STEPS):
+            generator.step()
+    finally:
+        stop_bridge(*bridge)
+        recorder.close()
+    mosaic_calls.steps.pop()  # No calls after the last step.
+
+    steps, results = load_session(path)
+    assert len(results) == STEPS
+    assert get_recorded_calls(steps) == mosaic_calls.steps
+
+    bridge = start_bridge()
+    replayed_calls = CallCounter()
+    try:
+        report = replay(get_stub(bridge[2], replayed_calls), steps, results)
+    finally:
+        stop_bridge(*bridge)
+    replayed_calls.steps.pop()
+
+    assert report['steps'] == STEPS
+    assert replayed_calls.steps == mosaic_calls.steps
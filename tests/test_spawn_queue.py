@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Checks the order of the spawn queue and the size of its heap under churn. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import random
+
+from mosaic_integration.spawn_queue import SpawnQueue
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def test_heap_stays_bounded_under_churn():
+    queue = SpawnQueue(max_spawns=1)
+    rng = random.Random(0)
+
+    # Actors repeatedly queued, re-prioritized and discarded (e.g., entering and leaving the
+    # interest area), with a few of them always waiting.
+    for actor_id in ('waiting_0', 'waiting_1'):
+        queue.push(actor_id, 1000.0)
+    for i in range(10000):
+        actor_id = 'veh_{}'.format(rng.randrange(50))
+        if rng.random() < 0.5:
+            queue.push(actor_id, rng.uniform(0.0, 100.0))
+        else:
+            queue.discard(actor_id)
+        assert len(queue._heap) <= 2 * len(queue) + 1  # pylint: disable=protected-access
+
+    spawned = []
+    while queue:
+        queue.drain(spawned.append)
+    assert spawned[-2:] == ['waiting_0', 'waiting_1']
+    assert len(spawned) == len(set(spawned))
+    assert queue._heap == []  # pylint: disable=protected-access
+
+
+def test_drain_order():
+    queue = SpawnQueue()
+    queue.push('a', 2.0)
+    queue.push('b', 1.0)
+    queue.push('c', 1.0)
+    queue.push('d', 0.5)
+    queue.push('a', 0.0)  # Re-prioritized.
+    queue.discard('d')
+
+    spawned = []
+    assert queue.drain(spawned.append) == 3
+    assert spawned == ['a', 'b', 'c']
+    assert not queue
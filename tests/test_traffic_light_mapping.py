@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Checks that the offline and runtime traffic light mappings of a map share their cache key. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import carla  # pylint: disable=import-error
+import pytest
+
+from mosaic_integration.traffic_light_mapping import get_mapping_key
+
+# ==================================================================================================
+# -- tests -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+OFFSET = (0.06, 328.61)
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'utf-8-sig'])
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_xodr_file_and_carla_map_keys(tmp_path, encoding, newline):
+    # Runtime key, from the map loaded in carla (see calculate_traffic_light_mapping).
+    carla.Client._world = None  # pylint: disable=protected-access
+    opendrive = carla.Client('127.0.0.1', 2000).get_world().get_map().to_opendrive()
+
+    # The .xodr file as shipped (line endings, byte order mark and trailing whitespace may differ),
+    # read as netconvert_carla.py does.
+    xodr_file = str(tmp_path / 'Town01.xodr')
+    with open(xodr_file, 'w', encoding=encoding, newline=newline) as f:
+        f.write(opendrive.replace('\n', '  \n') + '\n\n')
+    with open(xodr_file, 'r') as f:
+        offline_key = get_mapping_key(str(f.read()), OFFSET)
+
+    assert offline_key == get_mapping_key(opendrive, OFFSET)
+    assert offline_key == get_mapping_key(opendrive.replace('\n', '\r\n'), OFFSET)
+    assert offline_key != get_mapping_key(opendrive, (OFFSET[0], OFFSET[1] + 1.0))
@@ -0,0 +1,966 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Pure python stand-in of the carla module, to run the co-simulation without a carla server (e.g.,
+benchmarks on CPU-only machines).
+
+Only the subset of the carla API used by the co-simulation is implemented. There is no physics nor
+rendering: actors stay where they are placed (but the vehicles on autopilot, which drive straight
+ahead at a constant speed) and sensors (lidar, semantic lidar and radar) return synthetic
+measurements. The latency of the simulated server is configured through mock_settings or the
+following environment variables:
+
+    * CARLA_MOCK_TICK_LATENCY: seconds per world tick (default: 0).
+    * CARLA_MOCK_RPC_LATENCY: seconds per server round trip (default: 0).
+    * CARLA_MOCK_SPAWN_LATENCY: seconds per spawned actor (default: 0).
+    * CARLA_MOCK_TRAFFIC_LIGHTS: number of traffic lights of the map (default: 16).
+    * CARLA_MOCK_SEED: seed of the synthetic sensor data (default: 0).
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import enum
+import fnmatch
+import itertools
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from . import command
+
+# ==================================================================================================
+# -- mock settings ---------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class MockSettings(object):
+    """
+    Simulated server latencies and map contents.
+    """
+    def __init__(self):
+        self.tick_latency = float(os.environ.get('CARLA_MOCK_TICK_LATENCY', 0.0))
+        self.rpc_latency = float(os.environ.get('CARLA_MOCK_RPC_LATENCY', 0.0))
+        self.spawn_latency = float(os.environ.get('CARLA_MOCK_SPAWN_LATENCY', 0.0))
+        self.traffic_lights = int(os.environ.get('CARLA_MOCK_TRAFFIC_LIGHTS', 16))
+        self.seed = int(os.environ.get('CARLA_MOCK_SEED', 0))
+
+
+mock_settings = MockSettings()
+
+# Speed of the vehicles on autopilot, in m/s.
+AUTOPILOT_SPEED = 10.0
+
+
+def _wait(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+# ==================================================================================================
+# -- geometry --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class Vector3D(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+
+    def __add__(self, other):
+        return type(self)(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return type(self)(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, value):
+        return type(self)(self.x * value, self.y * value, self.z * value)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, value):
+        return type(self)(self.x / value, self.y / value, self.z / value)
+
+    def __eq__(self, other):
+        return (isinstance(other, Vector3D) and self.x == other.x and self.y == other.y and
+                self.z == other.z)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def length(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def distance(self, other):
+        return (self - other).length()
+
+    def __repr__(self):
+        return '{}(x={:.6f}, y={:.6f}, z={:.6f})'.format(type(self).__name__, self.x, self.y,
+                                                         self.z)
+
+
+class Location(Vector3D):
+    pass
+
+
+class Rotation(object):
+    def __init__(self, pitch=0.0, yaw=0.0, roll=0.0):
+        self.pitch = float(pitch)
+        self.yaw = float(yaw)
+        self.roll = float(roll)
+
+    def get_forward_vector(self):
+        cp, sp = math.cos(math.radians(self.pitch)), math.sin(math.radians(self.pitch))
+        cy, sy = math.cos(math.radians(self.yaw)), math.sin(math.radians(self.yaw))
+        return Vector3D(cy * cp, sy * cp, sp)
+
+    def __eq__(self, other):
+        return (isinstance(other, Rotation) and self.pitch == other.pitch and
+                self.yaw == other.yaw and self.roll == other.roll)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Rotation(pitch={:.6f}, yaw={:.6f}, roll={:.6f})'.format(
+            self.pitch, self.yaw, self.roll)
+
+
+class Transform(object):
+    def __init__(self, location=None, rotation=None):
+        self.location = location if location is not None else Location()
+        self.rotation = rotation if rotation is not None else Rotation()
+
+    def get_matrix(self):
+        """
+        Returns the 4x4 transformation matrix (same convention as carla).
+        """
+        cy, sy = math.cos(math.radians(self.rotation.yaw)), math.sin(math.radians(self.rotation.yaw))
+        cr, sr = math.cos(math.radians(self.rotation.roll)), math.sin(math.radians(self.rotation.roll))
+        cp, sp = math.cos(math.radians(self.rotation.pitch)), math.sin(
+            math.radians(self.rotation.pitch))
+        return [[cp * cy, cy * sp * sr - sy * cr, -cy * sp * cr - sy * sr, self.location.x],
+                [cp * sy, sy * sp * sr + cy * cr, -sy * sp * cr + cy * sr, self.location.y],
+                [sp, -cp * sr, cp * cr, self.location.z],
+                [0.0, 0.0, 0.0, 1.0]]
+
+    def get_inverse_matrix(self):
+        return np.linalg.inv(np.array(self.get_matrix())).tolist()
+
+    def get_forward_vector(self):
+        return self.rotation.get_forward_vector()
+
+    def transform(self, in_point):
+        """
+        Returns the given local point in world coordinates.
+        """
+        m = self.get_matrix()
+        return Location(m[0][0] * in_point.x + m[0][1] * in_point.y + m[0][2] * in_point.z + m[0][3],
+                        m[1][0] * in_point.x + m[1][1] * in_point.y + m[1][2] * in_point.z + m[1][3],
+                        m[2][0] * in_point.x + m[2][1] * in_point.y + m[2][2] * in_point.z + m[2][3])
+
+    def __eq__(self, other):
+        return (isinstance(other, Transform) and self.location == other.location and
+                self.rotation == other.rotation)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Transform({}, {})'.format(self.location, self.rotation)
+
+
+class BoundingBox(object):
+    def __init__(self, location=None, extent=None):
+        self.location = location if location is not None else Location()
+        self.extent = extent if extent is not None else Vector3D()
+        self.rotation = Rotation()
+
+
+# ==================================================================================================
+# -- enums -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class VehicleLightState(enum.IntFlag):
+    NONE = 0
+    Position = 0x1
+    LowBeam = 0x1 << 1
+    HighBeam = 0x1 << 2
+    Brake = 0x1 << 3
+    RightBlinker = 0x1 << 4
+    LeftBlinker = 0x1 << 5
+    Reverse = 0x1 << 6
+    Fog = 0x1 << 7
+    Interior = 0x1 << 8
+    Special1 = 0x1 << 9
+    Special2 = 0x1 << 10
+    All = 0xFFFFFFFF
+
+
+class TrafficLightState(enum.IntEnum):
+    Red = 0
+    Yellow = 1
+    Green = 2
+    Off = 3
+    Unknown = 4
+
+
+# ==================================================================================================
+# -- blueprints ------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class ActorAttribute(object):
+    def __init__(self, attribute_id, value, recommended_values=None, is_modifiable=True):
+        self.id = attribute_id
+        self.value = str(value)
+        self.recommended_values = list(recommended_values or [])
+        self.is_modifiable = is_modifiable
+
+    def as_str(self):
+        return self.value
+
+    def as_int(self):
+        return int(self.value)
+
+    def as_float(self):
+        return float(self.value)
+
+    def as_bool(self):
+        return self.value.lower() in ('true', '1')
+
+    def __str__(self):
+        return self.value
+
+    def __eq__(self, other):
+        return self.value == str(other)
+
+    __hash__ = None
+
+
+class ActorBlueprint(object):
+    def __init__(self, blueprint_id, tags, attributes):
+        self.id = blueprint_id
+        self.tags = list(tags)
+        self._attributes = {attribute.id: attribute for attribute in attributes}
+
+    def has_tag(self, tag):
+        return tag in self.tags
+
+    def match_tags(self, wildcard):
+        return fnmatch.fnmatch(self.id, wildcard) or any(
+            fnmatch.fnmatch(tag, wildcard) for tag in self.tags)
+
+    def has_attribute(self, attribute_id):
+        return attribute_id in self._attributes
+
+    def get_attribute(self, attribute_id):
+        if attribute_id not in self._attributes:
+            raise IndexError('attribute {} not found in blueprint {}'.format(attribute_id, self.id))
+        return self._attributes[attribute_id]
+
+    def set_attribute(self, attribute_id, value):
+        if attribute_id not in self._attributes:
+            raise IndexError('attribute {} not found in blueprint {}'.format(attribute_id, self.id))
+        self._attributes[attribute_id].value = str(value)
+
+    def __iter__(self):
+        return iter(list(self._attributes.values()))
+
+    def __len__(self):
+        return len(self._attributes)
+
+    def __repr__(self):
+        return 'ActorBlueprint(id={}, tags={})'.format(self.id, self.tags)
+
+
+class BlueprintLibrary(object):
+    def __init__(self, blueprints):
+        self._blueprints = list(blueprints)
+
+    def find(self, blueprint_id):
+        for blueprint in self._blueprints:
+            if blueprint.id == blueprint_id:
+                return blueprint
+        raise IndexError('blueprint {} not found'.format(blueprint_id))
+
+    def filter(self, wildcard):
+        return BlueprintLibrary([b for b in self._blueprints if b.match_tags(wildcard)])
+
+    def __iter__(self):
+        return iter(self._blueprints)
+
+    def __len__(self):
+        return len(self._blueprints)
+
+    def __getitem__(self, index):
+        return self._blueprints[index]
+
+
+# Vehicle blueprints: {id: (number_of_wheels, extent)}
+_VEHICLES = {
+    'vehicle.audi.a2': (4, (1.85, 0.9, 0.78)),
+    'vehicle.audi.etron': (4, (2.43, 1.05, 0.82)),
+    'vehicle.audi.tt': (4, (2.09, 1.0, 0.69)),
+    'vehicle.bh.crossbike': (2, (0.74, 0.43, 0.54)),
+    'vehicle.bmw.grandtourer': (4, (2.31, 1.12, 0.84)),
+    'vehicle.bmw.isetta': (4, (1.1, 0.74, 0.69)),
+    'vehicle.carlamotors.carlacola': (4, (2.6, 1.3, 1.28)),
+    'vehicle.chevrolet.impala': (4, (2.68, 1.01, 0.7)),
+    'vehicle.citroen.c3': (4, (1.99, 0.93, 0.82)),
+    'vehicle.diamondback.century': (2, (0.82, 0.19, 0.77)),
+    'vehicle.dodge_charger.police': (4, (2.49, 1.02, 0.78)),
+    'vehicle.gazelle.omafiets': (2, (0.92, 0.16, 0.55)),
+    'vehicle.harley-davidson.low_rider': (2, (1.18, 0.38, 0.64)),
+    'vehicle.jeep.wrangler_rubicon': (4, (1.93, 0.95, 0.94)),
+    'vehicle.kawasaki.ninja': (2, (1.02, 0.4, 0.57)),
+    'vehicle.lincoln.mkz2017': (4, (2.45, 1.06, 0.76)),
+    'vehicle.mercedes-benz.coupe': (4, (2.51, 1.08, 0.83)),
+    'vehicle.mini.cooperst': (4, (1.9, 0.99, 0.74)),
+    'vehicle.mustang.mustang': (4, (2.36, 0.94, 0.65)),
+    'vehicle.nissan.micra': (4, (1.82, 0.93, 0.75)),
+    'vehicle.nissan.patrol': (4, (2.3, 0.96, 0.93)),
+    'vehicle.seat.leon': (4, (2.1, 0.91, 0.74)),
+    'vehicle.tesla.cybertruck': (4, (3.14, 1.19, 1.05)),
+    'vehicle.tesla.model3': (4, (2.4, 1.08, 0.74)),
+    'vehicle.toyota.prius': (4, (2.26, 1.0, 0.76)),
+    'vehicle.volkswagen.t2': (4, (2.24, 1.03, 1.02)),
+    'vehicle.yamaha.yzf': (2, (1.1, 0.43, 0.62)),
+}
+
+_COLORS = ['255,255,255', '0,0,0', '200,20,20', '20,20,200', '20,160,20', '180,180,180']
+
+
+def _create_blueprints():
+    blueprints = []
+    for blueprint_id, (wheels, _) in sorted(_VEHICLES.items()):
+        blueprints.append(
+            ActorBlueprint(blueprint_id, ['vehicle'] + blueprint_id.split('.')[1:], [
+                ActorAttribute('color', _COLORS[0], _COLORS),
+                ActorAttribute('number_of_wheels', wheels, is_modifiable=False),
+                ActorAttribute('role_name', 'autopilot', ['autopilot', 'scenario', 'ego']),
+                ActorAttribute('sticky_control', 'true'),
+            ]))
+
+    blueprints.append(
+        ActorBlueprint('sensor.lidar.ray_cast', ['sensor', 'lidar', 'ray_cast'], [
+            ActorAttribute('channels', 32),
+            ActorAttribute('range', 10.0),
+            ActorAttribute('points_per_second', 56000),
+            ActorAttribute('rotation_frequency', 10.0),
+            ActorAttribute('upper_fov', 10.0),
+            ActorAttribute('lower_fov', -30.0),
+            ActorAttribute('horizontal_fov', 360.0),
+            ActorAttribute('atmosphere_attenuation_rate', 0.004),
+            ActorAttribute('dropoff_general_rate', 0.45, ['0.45']),
+            ActorAttribute('dropoff_intensity_limit', 0.8, ['0.8']),
+            ActorAttribute('dropoff_zero_intensity', 0.4, ['0.4']),
+            ActorAttribute('noise_stddev', 0.0),
+            ActorAttribute('sensor_tick', 0.0),
+            ActorAttribute('role_name', 'front'),
+        ]))
+    blueprints.append(
+        ActorBlueprint('sensor.lidar.ray_cast_semantic', ['sensor', 'lidar', 'ray_cast_semantic'], [
+            ActorAttribute('channels', 32),
+            ActorAttribute('range', 10.0),
+            ActorAttribute('points_per_second', 56000),
+            ActorAttribute('rotation_frequency', 10.0),
+            ActorAttribute('upper_fov', 10.0),
+            ActorAttribute('lower_fov', -30.0),
+            ActorAttribute('horizontal_fov', 360.0),
+            ActorAttribute('sensor_tick', 0.0),
+            ActorAttribute('role_name', 'front'),
+        ]))
+    blueprints.append(
+        ActorBlueprint('sensor.other.radar', ['sensor', 'other', 'radar'], [
+            ActorAttribute('horizontal_fov', 30.0),
+            ActorAttribute('vertical_fov', 30.0),
+            ActorAttribute('range', 100.0),
+            ActorAttribute('points_per_second', 1500),
+            ActorAttribute('sensor_tick', 0.0),
+            ActorAttribute('role_name', 'front'),
+        ]))
+    return blueprints
+
+
+# ==================================================================================================
+# -- actors ----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class Actor(object):
+    def __init__(self, world, actor_id, type_id, transform, attributes=None, parent=None,
+                 extent=None):
+        self._world = world
+        self.id = actor_id
+        self.type_id = type_id
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.is_alive = True
+        self.bounding_box = BoundingBox(Location(), Vector3D(*(extent or (0.0, 0.0, 0.0))))
+        self.semantic_tags = []
+
+        # Transform relative to the parent, if any. Otherwise, world transform.
+        self._transform = _copy_transform(transform)
+        self._velocity = Vector3D()
+
+    def get_world(self):
+        return self._world
+
+    def get_transform(self):
+        if self.parent is None:
+            return _copy_transform(self._transform)
+
+        parent = self.parent.get_transform()
+        rotation = Rotation(parent.rotation.pitch + self._transform.rotation.pitch,
+                            parent.rotation.yaw + self._transform.rotation.yaw,
+                            parent.rotation.roll + self._transform.rotation.roll)
+        return Transform(parent.transform(self._transform.location), rotation)
+
+    def get_location(self):
+        return self.get_transform().location
+
+    def get_velocity(self):
+        return Vector3D(self._velocity.x, self._velocity.y, self._velocity.z)
+
+    def get_acceleration(self):
+        return Vector3D()
+
+    def get_angular_velocity(self):
+        return Vector3D()
+
+    def set_transform(self, transform):
+        self._transform = _copy_transform(transform)
+
+    def set_location(self, location):
+        self._transform.location = Location(location.x, location.y, location.z)
+
+    def set_simulate_physics(self, enabled=True):
+        pass
+
+    def destroy(self):
+        if not self.is_alive:
+            return False
+        return self._world._destroy_actor(self)  # pylint: disable=protected-access
+
+    def __repr__(self):
+        return 'Actor(id={}, type={})'.format(self.id, self.type_id)
+
+
+class Vehicle(Actor):
+    def __init__(self, *args, **kwargs):
+        super(Vehicle, self).__init__(*args, **kwargs)
+        self._light_state = VehicleLightState.NONE
+        self._autopilot = False
+
+    def get_light_state(self):
+        return self._light_state
+
+    def set_light_state(self, light_state):
+        self._light_state = VehicleLightState(int(light_state))
+
+    def set_autopilot(self, enabled=True, tm_port=8000):
+        self._autopilot = enabled
+
+    def _drive(self, delta):
+        # Autopilot: straight ahead at a constant speed.
+        forward = self._transform.rotation.get_forward_vector()
+        self._velocity = forward * AUTOPILOT_SPEED
+        self._transform.location = self._transform.location + self._velocity * delta
+
+    def apply_control(self, control):
+        pass
+
+
+class TrafficLight(Actor):
+    def __init__(self, *args, **kwargs):
+        super(TrafficLight, self).__init__(*args, **kwargs)
+        self.state = TrafficLightState.Red
+        self._frozen = False
+        self._pole_index = 0
+        self._group = [self]
+
+    def get_state(self):
+        return self.state
+
+    def set_state(self, state):
+        self.state = TrafficLightState(int(state))
+
+    def freeze(self, freeze):
+        self._frozen = bool(freeze)
+
+    def is_frozen(self):
+        return self._frozen
+
+    def get_pole_index(self):
+        return self._pole_index
+
+    def get_group_traffic_lights(self):
+        return list(self._group)
+
+
+class Sensor(Actor):
+    def __init__(self, *args, **kwargs):
+        super(Sensor, self).__init__(*args, **kwargs)
+        self._callback = None
+        self._last_tick = None
+
+    @property
+    def is_listening(self):
+        return self._callback is not None
+
+    def listen(self, callback):
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    def destroy(self):
+        self.stop()
+        return super(Sensor, self).destroy()
+
+    def _on_tick(self, snapshot):
+        """
+        Produces the sensor data of the given frame, honoring sensor_tick.
+        """
+        if self._callback is None:
+            return
+
+        sensor_tick = float(self.attributes.get('sensor_tick', 0.0))
+        elapsed = snapshot.timestamp.elapsed_seconds
+        if self._last_tick is not None and elapsed - self._last_tick < sensor_tick - 1e-9:
+            return
+        self._last_tick = elapsed
+
+        self._callback(self._measure(snapshot))
+
+    def _measure(self, snapshot):
+        raise NotImplementedError
+
+
+class _LidarSensor(Sensor):
+    def _sweep(self, snapshot, rng):
+        """
+        Returns the synthetic points (N x 3, sensor space) covering the angle swept during the last
+        frame.
+        """
+        attributes = self.attributes
+        points_per_second = int(float(attributes.get('points_per_second', 56000)))
+        channels = max(int(float(attributes.get('channels', 32))), 1)
+        max_range = float(attributes.get('range', 10.0))
+        upper_fov = float(attributes.get('upper_fov', 10.0))
+        lower_fov = float(attributes.get('lower_fov', -30.0))
+        rotation_frequency = float(attributes.get('rotation_frequency', 10.0))
+
+        delta = snapshot.timestamp.delta_seconds
+        count = max(int(points_per_second * delta), 0)
+
+        start = (360.0 * rotation_frequency * (snapshot.timestamp.elapsed_seconds - delta)) % 360.0
+        sweep = min(360.0 * rotation_frequency * delta, 360.0)
+        azimuth = np.radians(start + sweep * rng.random(count))
+        elevation = np.radians(np.linspace(lower_fov, upper_fov, channels)[rng.integers(
+            0, channels, count)])
+        distance = rng.uniform(0.5, max_range, count)
+
+        points = np.empty((count, 3), dtype=np.float32)
+        points[:, 0] = distance * np.cos(elevation) * np.cos(azimuth)
+        points[:, 1] = distance * np.cos(elevation) * np.sin(azimuth)
+        points[:, 2] = distance * np.sin(elevation)
+        return points
+
+    def _measure(self, snapshot):
+        channels = max(int(float(self.attributes.get('channels', 32))), 1)
+        dropoff_rate = float(self.attributes.get('dropoff_general_rate', 0.45))
+
+        rng = np.random.default_rng((mock_settings.seed, self.id, snapshot.frame))
+        xyz = self._sweep(snapshot, rng)
+
+        points = np.empty((len(xyz), 4), dtype=np.float32)
+        points[:, :3] = xyz
+        points[:, 3] = rng.random(len(xyz)) * (rng.random(len(xyz)) >= dropoff_rate)
+
+        return LidarMeasurement(snapshot, self.get_transform(), points, channels)
+
+
+# Semantic lidar detection layout (see carla.SemanticLidarDetection).
+SEMANTIC_LIDAR_DTYPE = np.dtype([('x', 'f4'), ('y', 'f4'), ('z', 'f4'), ('cos_inc_angle', 'f4'),
+                                 ('object_idx', 'u4'), ('object_tag', 'u4')])
+
+# Tags of the synthetic semantic lidar hits (i.e., buildings, roads, sidewalks and vegetation) other
+# than vehicles (10).
+_STATIC_TAGS = (1, 7, 8, 9)
+
+
+class _SemanticLidarSensor(_LidarSensor):
+    def _measure(self, snapshot):
+        channels = max(int(float(self.attributes.get('channels', 32))), 1)
+
+        rng = np.random.default_rng((mock_settings.seed, self.id, snapshot.frame))
+        xyz = self._sweep(snapshot, rng)
+
+        # A tenth of the points hit the vehicles of the world, if any.
+        vehicle_ids = [actor.id for actor in self._world.get_actors() if isinstance(actor, Vehicle)]
+        hits = rng.random(len(xyz)) < 0.1 if vehicle_ids else np.zeros(len(xyz), dtype=bool)
+
+        points = np.zeros(len(xyz), dtype=SEMANTIC_LIDAR_DTYPE)
+        points['x'], points['y'], points['z'] = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+        points['cos_inc_angle'] = rng.random(len(xyz))
+        points['object_tag'] = np.array(_STATIC_TAGS)[rng.integers(0, len(_STATIC_TAGS), len(xyz))]
+        points['object_tag'][hits] = 10
+        if vehicle_ids:
+            points['object_idx'][hits] = np.array(vehicle_ids)[rng.integers(
+                0, len(vehicle_ids), int(hits.sum()))]
+
+        return LidarMeasurement(snapshot, self.get_transform(), points, channels)
+
+
+class _RadarSensor(Sensor):
+    def _measure(self, snapshot):
+        attributes = self.attributes
+        points_per_second = int(float(attributes.get('points_per_second', 1500)))
+        horizontal_fov = float(attributes.get('horizontal_fov', 30.0))
+        vertical_fov = float(attributes.get('vertical_fov', 30.0))
+        max_range = float(attributes.get('range', 100.0))
+
+        count = max(int(points_per_second * snapshot.timestamp.delta_seconds), 0)
+        rng = np.random.default_rng((mock_settings.seed, self.id, snapshot.frame))
+
+        # Detection layout: velocity, azimuth, altitude and depth (see carla.RadarDetection).
+        detections = np.empty((count, 4), dtype=np.float32)
+        detections[:, 0] = rng.normal(0.0, 5.0, count)
+        detections[:, 1] = np.radians(rng.uniform(-horizontal_fov / 2, horizontal_fov / 2, count))
+        detections[:, 2] = np.radians(rng.uniform(-vertical_fov / 2, vertical_fov / 2, count))
+        detections[:, 3] = rng.uniform(0.5, max_range, count)
+
+        return RadarMeasurement(snapshot, self.get_transform(), detections)
+
+
+class LidarMeasurement(object):
+    def __init__(self, snapshot, transform, points, channels):
+        self.frame = snapshot.frame
+        self.frame_number = snapshot.frame
+        self.timestamp = snapshot.timestamp.elapsed_seconds
+        self.transform = transform
+        self.channels = channels
+        self.horizontal_angle = 0.0
+        self.raw_data = points.tobytes()
+        self._points = points
+
+    def get_point_count(self, channel):
+        return len(self._points) // self.channels
+
+    def __len__(self):
+        return len(self._points)
+
+    def __iter__(self):
+        return iter(self._points)
+
+
+class RadarMeasurement(object):
+    def __init__(self, snapshot, transform, detections):
+        self.frame = snapshot.frame
+        self.frame_number = snapshot.frame
+        self.timestamp = snapshot.timestamp.elapsed_seconds
+        self.transform = transform
+        self.raw_data = detections.tobytes()
+        self._detections = detections
+
+    def get_detection_count(self):
+        return len(self._detections)
+
+    def __len__(self):
+        return len(self._detections)
+
+    def __iter__(self):
+        return iter(self._detections)
+
+
+class ActorList(object):
+    def __init__(self, actors):
+        self._actors = list(actors)
+
+    def filter(self, wildcard):
+        return ActorList([a for a in self._actors if fnmatch.fnmatch(a.type_id, wildcard)])
+
+    def find(self, actor_id):
+        for actor in self._actors:
+            if actor.id == actor_id:
+                return actor
+        return None
+
+    def __iter__(self):
+        return iter(self._actors)
+
+    def __len__(self):
+        return len(self._actors)
+
+    def __getitem__(self, index):
+        return self._actors[index]
+
+
+def _copy_transform(transform):
+    location, rotation = transform.location, transform.rotation
+    return Transform(Location(location.x, location.y, location.z),
+                     Rotation(rotation.pitch, rotation.yaw, rotation.roll))
+
+
+# ==================================================================================================
+# -- map -------------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class Landmark(object):
+    def __init__(self, landmark_id, name, landmark_type, transform):
+        self.id = landmark_id
+        self.name = name
+        self.type = landmark_type
+        self.transform = transform
+
+
+class Map(object):
+    def __init__(self, name, landmarks):
+        self.name = name
+        self._landmarks = landmarks
+
+    def get_all_landmarks(self):
+        return list(self._landmarks)
+
+    def get_all_landmarks_of_type(self, landmark_type):
+        return [landmark for landmark in self._landmarks if landmark.type == landmark_type]
+
+    def get_spawn_points(self):
+        return [Transform(Location(10.0 * i, 0.0, 0.5)) for i in range(100)]
+
+    def to_opendrive(self):
+        return ('<?xml version="1.0" standalone="yes"?>\n<OpenDRIVE>\n'
+                '    <header revMajor="1" revMinor="4" name="{}"/>\n</OpenDRIVE>\n'.format(self.name))
+
+    def save_to_disk(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_opendrive())
+
+
+# ==================================================================================================
+# -- world -----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class WorldSettings(object):
+    def __init__(self, synchronous_mode=False, no_rendering_mode=False, fixed_delta_seconds=None):
+        self.synchronous_mode = synchronous_mode
+        self.no_rendering_mode = no_rendering_mode
+        self.fixed_delta_seconds = fixed_delta_seconds
+
+
+class Timestamp(object):
+    def __init__(self, frame, elapsed_seconds, delta_seconds, platform_timestamp):
+        self.frame = frame
+        self.elapsed_seconds = elapsed_seconds
+        self.delta_seconds = delta_seconds
+        self.platform_timestamp = platform_timestamp
+
+
+class WorldSnapshot(object):
+    def __init__(self, frame, timestamp):
+        self.id = 0
+        self.frame = frame
+        self.timestamp = timestamp
+
+
+class World(object):
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._actor_ids = itertools.count(1)
+        self._actors = {}  # {actor_id: actor}
+        self._settings = WorldSettings()
+        self._blueprint_library = BlueprintLibrary(_create_blueprints())
+        self._snapshot = WorldSnapshot(0, Timestamp(0, 0.0, 0.0, time.time()))
+
+        # Traffic lights, in groups of (up to) four poles.
+        landmarks = []
+        group = []
+        for i in range(mock_settings.traffic_lights):
+            transform = Transform(Location(50.0 * (i // 4), 10.0 * (i % 4), 0.0))
+            landmark = Landmark(str(1000 + i), 'Signal_3Light_Post01', '1000001', transform)
+            traffic_light = TrafficLight(self, next(self._actor_ids), 'traffic.traffic_light',
+                                         transform)
+            traffic_light._pole_index = i % 4  # pylint: disable=protected-access
+            if i % 4 == 0:
+                group = []
+            group.append(traffic_light)
+            traffic_light._group = group  # pylint: disable=protected-access
+
+            self._actors[traffic_light.id] = traffic_light
+            landmarks.append((landmark, traffic_light))
+
+        self._landmark_tls = {landmark.id: tl for landmark, tl in landmarks}
+        self._map = Map('Carla/Maps/MockTown', [landmark for landmark, _ in landmarks])
+
+    @property
+    def id(self):
+        return 0
+
+    def get_map(self):
+        return self._map
+
+    def get_blueprint_library(self):
+        return self._blueprint_library
+
+    def get_settings(self):
+        _wait(mock_settings.rpc_latency)
+        settings = self._settings
+        return WorldSettings(settings.synchronous_mode, settings.no_rendering_mode,
+                             settings.fixed_delta_seconds)
+
+    def apply_settings(self, settings):
+        _wait(mock_settings.rpc_latency)
+        self._settings = WorldSettings(settings.synchronous_mode, settings.no_rendering_mode,
+                                       settings.fixed_delta_seconds)
+        return self._snapshot.frame
+
+    def get_snapshot(self):
+        return self._snapshot
+
+    def get_traffic_light(self, landmark):
+        return self._landmark_tls.get(landmark.id)
+
+    def get_actor(self, actor_id):
+        with self._lock:
+            return self._actors.get(actor_id)
+
+    def get_actors(self, actor_ids=None):
+        _wait(mock_settings.rpc_latency)
+        with self._lock:
+            if actor_ids is None:
+                return ActorList(self._actors.values())
+            return ActorList(self._actors[i] for i in actor_ids if i in self._actors)
+
+    def try_spawn_actor(self, blueprint, transform, attach_to=None):
+        _wait(mock_settings.spawn_latency)
+
+        attributes = {attribute.id: attribute.as_str() for attribute in blueprint}
+        with self._lock:
+            actor_id = next(self._actor_ids)
+            if blueprint.id.startswith('vehicle.'):
+                extent = _VEHICLES.get(blueprint.id, (4, (2.0, 1.0, 0.75)))[1]
+                actor = Vehicle(self, actor_id, blueprint.id, transform, attributes, attach_to,
+                                extent)
+            elif blueprint.id == 'sensor.lidar.ray_cast_semantic':
+                actor = _SemanticLidarSensor(self, actor_id, blueprint.id, transform, attributes,
+                                             attach_to)
+            elif blueprint.id.startswith('sensor.lidar.'):
+                actor = _LidarSensor(self, actor_id, blueprint.id, transform, attributes, attach_to)
+            elif blueprint.id == 'sensor.other.radar':
+                actor = _RadarSensor(self, actor_id, blueprint.id, transform, attributes, attach_to)
+            else:
+                actor = Actor(self, actor_id, blueprint.id, transform, attributes, attach_to)
+            self._actors[actor_id] = actor
+        return actor
+
+    def spawn_actor(self, blueprint, transform, attach_to=None, attachment_type=None):
+        _wait(mock_settings.rpc_latency)
+        actor = self.try_spawn_actor(blueprint, transform, attach_to)
+        if actor is None:
+            raise RuntimeError('Spawn failed because of collision at spawn position')
+        return actor
+
+    def _destroy_actor(self, actor):
+        with self._lock:
+            if self._actors.pop(actor.id, None) is None:
+                return False
+            actor.is_alive = False
+
+            # Attached actors are destroyed with their parent.
+            children = [a for a in self._actors.values() if a.parent is actor]
+        for child in children:
+            child.destroy()
+        return True
+
+    def tick(self, seconds=10.0):
+        """
+        Advances the simulation one frame and produces the sensor data of the new frame.
+        """
+        _wait(mock_settings.tick_latency)
+
+        delta = self._settings.fixed_delta_seconds or 0.05
+        previous = self._snapshot.timestamp
+        frame = self._snapshot.frame + 1
+        self._snapshot = WorldSnapshot(
+            frame, Timestamp(frame, previous.elapsed_seconds + delta, delta, time.time()))
+
+        with self._lock:
+            for actor in self._actors.values():
+                if isinstance(actor, Vehicle) and actor._autopilot:  # pylint: disable=protected-access
+                    actor._drive(delta)  # pylint: disable=protected-access
+            sensors = [actor for actor in self._actors.values() if isinstance(actor, Sensor)]
+        for sensor in sensors:
+            sensor._on_tick(self._snapshot)  # pylint: disable=protected-access
+
+        return frame
+
+    def wait_for_tick(self, seconds=10.0):
+        return self._snapshot
+
+
+# ==================================================================================================
+# -- client ----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class Client(object):
+    _world = None
+
+    def __init__(self, host='127.0.0.1', port=2000, worker_threads=0):
+        self.host = host
+        self.port = port
+        self._timeout = 5.0
+
+    def set_timeout(self, seconds):
+        self._timeout = seconds
+
+    def get_client_version(self):
+        return '0.9.13-mock'
+
+    def get_server_version(self):
+        return '0.9.13-mock'
+
+    def get_world(self):
+        # All the clients share the same (in process) server.
+        if Client._world is None:
+            Client._world = World()
+        return Client._world
+
+    def apply_batch(self, commands):
+        world = self.get_world()
+        for cmd in commands:
+            cmd.apply(world, command.FutureActor)
+
+    def apply_batch_sync(self, commands, do_tick=False):
+        _wait(mock_settings.rpc_latency)
+
+        world = self.get_world()
+        responses = []
+        for cmd in commands:
+            error, actor_id = cmd.apply(world, command.FutureActor)
+            responses.append(command.Response(actor_id, error))
+
+        if do_tick:
+            world.tick()
+        return responses
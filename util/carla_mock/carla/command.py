@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" Pure python stand-in of carla.command (see carla_mock). """
+
+# ==================================================================================================
+# -- commands --------------------------------------------------------------------------------------
+# ==================================================================================================
+
+# Placeholder of the actor spawned by the parent SpawnActor command.
+FutureActor = 0
+
+
+class Response(object):
+    """
+    Result of a command applied with Client.apply_batch_sync.
+    """
+    def __init__(self, actor_id=0, error=''):
+        self.actor_id = actor_id
+        self.error = error
+
+    def has_error(self):
+        return bool(self.error)
+
+    def __repr__(self):
+        return 'Response(actor_id={}, error={!r})'.format(self.actor_id, self.error)
+
+
+class _Command(object):
+    def __init__(self, actor_id=FutureActor):
+        self.actor_id = actor_id.id if hasattr(actor_id, 'id') else actor_id
+
+    def _get_actor_id(self, future_actor_id):
+        return future_actor_id if self.actor_id == FutureActor else self.actor_id
+
+    def apply(self, world, actor_id):
+        """
+        Applies the command to the given world (actor_id replaces FutureActor, if set).
+
+            :return: (error message, empty on success; id of the affected actor)
+        """
+        raise NotImplementedError
+
+
+class SpawnActor(_Command):
+    def __init__(self, blueprint, transform, parent=None):
+        super(SpawnActor, self).__init__()
+        self.blueprint = blueprint
+        self.transform = transform
+        self.parent = parent
+        self.commands = []
+
+    def then(self, command):
+        self.commands.append(command)
+        return self
+
+    def apply(self, world, actor_id):
+        parent = world.get_actor(self.parent.id if hasattr(self.parent, 'id') else self.parent)
+        actor = world.try_spawn_actor(self.blueprint, self.transform, attach_to=parent)
+        if actor is None:
+            return 'Spawn failed because of collision at spawn position', 0
+
+        for command in self.commands:
+            command.apply(world, actor.id)
+        return '', actor.id
+
+
+class DestroyActor(_Command):
+    def apply(self, world, actor_id):
+        actor = world.get_actor(self._get_actor_id(actor_id))
+        if actor is None or not actor.destroy():
+            return 'unable to destroy actor: not found', 0
+        return '', actor.id
+
+
+class ApplyTransform(_Command):
+    def __init__(self, actor_id, transform):
+        super(ApplyTransform, self).__init__(actor_id)
+        self.transform = transform
+
+    def apply(self, world, actor_id):
+        actor = world.get_actor(self._get_actor_id(actor_id))
+        if actor is None:
+            return 'unable to set transform: actor not found', 0
+        actor.set_transform(self.transform)
+        return '', actor.id
+
+
+class SetSimulatePhysics(_Command):
+    def __init__(self, actor_id, enabled):
+        super(SetSimulatePhysics, self).__init__(actor_id)
+        self.enabled = enabled
+
+    def apply(self, world, actor_id):
+        actor = world.get_actor(self._get_actor_id(actor_id))
+        if actor is None:
+            return 'unable to set simulate physics: actor not found', 0
+        actor.set_simulate_physics(self.enabled)
+        return '', actor.id
+
+
+class SetVehicleLightState(_Command):
+    def __init__(self, actor_id, light_state):
+        super(SetVehicleLightState, self).__init__(actor_id)
+        self.light_state = light_state
+
+    def apply(self, world, actor_id):
+        actor = world.get_actor(self._get_actor_id(actor_id))
+        if actor is None:
+            return 'unable to set light state: actor not found', 0
+        actor.set_light_state(self.light_state)
+        return '', actor.id
+
+
+class SetAutopilot(_Command):
+    def __init__(self, actor_id, enabled, tm_port=8000):
+        super(SetAutopilot, self).__init__(actor_id)
+        self.enabled = enabled
+        self.tm_port = tm_port
+
+    def apply(self, world, actor_id):
+        actor = world.get_actor(self._get_actor_id(actor_id))
+        if actor is None:
+            return 'unable to set autopilot: actor not found', 0
+        return '', actor.id
@@ -7,7 +7,8 @@
 # For a copy, see <https://opensource.org/licenses/MIT>.
 """
 Script to generate mosaic nets based on opendrive files. Internally, it uses netconvert to generate
-the net and inserts, manually, the traffic light landmarks retrieved from the opendrive.
+the net and inserts, manually, the traffic light landmarks retrieved from the opendrive. Optionally,
+it also precomputes the traffic light mapping used by the co-simulation bridge.
 """
 
 # ==================================================================================================
@@ -49,6 +50,9 @@ if 'MOSAIC_HOME' in os.environ:
 else:
     sys.exit("please declare environment variable 'MOSAIC_HOME'")
 
+# Makes mosaic_integration available when running this script from the util folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
 # ==================================================================================================
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
@@ -56,6 +60,8 @@ else:
 import carla
 import mosaiclib
 
+from mosaic_integration.traffic_light_mapping import get_mapping_key, save_cached_groups  # pylint: disable=wrong-import-position
+
 # ==================================================================================================
 # -- topology --------------------------------------------------------------------------------------
 # ==================================================================================================
@@ -197,8 +203,7 @@ def build_topology(mosaic_net):
     paths = {}
 
     for from_edge in mosaic_net.getEdges():
-        for to_edge in mosaic_net.getEdges():
-            connections = from_edge.getConnections(to_edge)
+        for connections in from_edge.getOutgoing().values():
             for connection in connections:
                 from_ = connection.getFromLane()
                 to_ = connection.getToLane()
@@ -357,12 +362,68 @@ class MosaicTrafficLight(object):
         return xml_tag
 
 
+# ==================================================================================================
+# -- traffic light mapping -------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def build_traffic_light_groups(carla_map, opendrive, offset):
+    """
+    Builds the carla traffic light groups without a running carla server.
+
+    Carla groups the traffic lights by opendrive controller and assigns the pole index following the
+    order of the controller signals. Traffic lights without controller form a group on their own. As
+    there are no traffic light actors, the position of each traffic light is approximated by the
+    position of its landmark.
+
+        :param carla_map: carla map (carla.Map) built from the opendrive.
+        :param opendrive: opendrive content.
+        :param offset: mosaic net offset.
+        :returns: traffic light groups (see mosaic_integration.traffic_light_mapping).
+    """
+    landmarks = {}
+    for landmark in carla_map.get_all_landmarks_of_type('1000001'):
+        if landmark.id != '':
+            landmarks[landmark.id] = landmark
+
+    def to_group_tl(landmark_id, pole_index):
+        location = landmarks[landmark_id].transform.location
+        return {
+            'landmark_id': landmark_id,
+            'pole_index': pole_index,
+            'pos_x': location.x + offset[0],
+            'pos_y': location.y - offset[1]
+        }
+
+    groups = []
+    grouped_ids = set()
+
+    root = ET.fromstring(opendrive.encode('utf-8'))
+    for controller in root.findall('controller'):
+        group = []
+        for control in controller.findall('control'):
+            landmark_id = control.get('signalId')
+            if landmark_id not in landmarks or landmark_id in grouped_ids:
+                continue
+
+            group.append(to_group_tl(landmark_id, len(group)))
+            grouped_ids.add(landmark_id)
+
+        if group:
+            groups.append(group)
+
+    for landmark_id in sorted(set(landmarks) - grouped_ids):
+        groups.append([to_group_tl(landmark_id, 0)])
+
+    return groups
+
+
 # ==================================================================================================
 # -- main ------------------------------------------------------------------------------------------
 # ==================================================================================================
 
 
-def _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls=False):
+def _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls=False, tls_mapping_dir=None):
     """
     Implements netconvert carla.
     """
@@ -403,7 +464,8 @@ def _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls=False):
     # Carla map
     # ---------
     with open(xodr_file, 'r') as f:
-        carla_map = carla.Map('netconvert', str(f.read()))
+        opendrive = str(f.read())
+        carla_map = carla.Map('netconvert', opendrive)
 
     # ---------
     # Landmarks
@@ -506,19 +568,33 @@ def _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls=False):
 
     tree.write(output, pretty_print=True, encoding='UTF-8', xml_declaration=True)
 
+    # -----------------------
+    # Traffic light mapping
+    # -----------------------
+    if tls_mapping_dir is not None:
+        offset = mosaic_net.getLocationOffset()
+        groups = build_traffic_light_groups(carla_map, opendrive, offset)
+
+        cache_file = save_cached_groups(get_mapping_key(opendrive, offset), groups, tls_mapping_dir,
+                                        offline=True)
+        logging.info('Offline traffic light mapping written to %s', cache_file)
 
-def netconvert_carla(xodr_file, output, guess_tls=False):
+
+def netconvert_carla(xodr_file, output, guess_tls=False, tls_mapping_dir=None):
     """
     Generates mosaic net.
 
         :param xodr_file: opendrive file (*.xodr)
         :param output: output file (*.net.xml)
         :param guess_tls: guess traffic lights at intersections.
+        :param tls_mapping_dir: if given, the traffic light mapping used by the bridge is also
+            precomputed and stored in this cache directory (e.g., data/cache). The bridge checks it
+            against the carla traffic lights before use.
         :returns: path to the generated mosaic net.
     """
     try:
         tmpdir = tempfile.mkdtemp()
-        _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls)
+        _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls, tls_mapping_dir)
 
     finally:
         if os.path.exists(tmpdir):
@@ -536,6 +612,12 @@ if __name__ == '__main__':
     argparser.add_argument('--guess-tls',
                            action='store_true',
                            help='guess traffic lights at intersections (default: False)')
+    argparser.add_argument('--tls-mapping-dir',
+                           metavar='DIR',
+                           default=None,
+                           type=str,
+                           help='precompute the traffic light mapping of the bridge into DIR, '
+                           'usually <repository>/data/cache (default: None)')
     args = argparser.parse_args()
 
-    netconvert_carla(args.xodr_file, args.output, args.guess_tls)
+    netconvert_carla(args.xodr_file, args.output, args.guess_tls, args.tls_mapping_dir)